@@ -1,3 +1,260 @@
+import cProfile
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from math import exp, log10
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ROTOR_WIRINGS = {
+    'Beta': ('LEYJVCNIXWPBQMDRTAKZGFUHOS', ''),
+    'Gamma': ('FSOKANUERHMBTIYCWLQPZXVGJD', ''),
+    'I': ('EKMFLGDQVZNTOWYHXUSPAIBRCJ', 'Q'),
+    'II': ('AJDKSIRUXBLHWTMCQGZNPYFVOE', 'E'),
+    'III': ('BDFHJLCPRTXVZNYEIWGAKMUSQO', 'V'),
+    'IV': ('ESOVPZJAYQUIRHXLNFTGKDCMWB', 'J'),
+    'V': ('VZBRGITYUPSDNHLXAWMJQOFECK', 'Z'),
+}
+
+REFLECTOR_WIRINGS = {
+    'A': 'EJMZALYXVBWFCRQUONTSPIKHGD',
+    'B': 'YRUHQSLDPXNGOKMIEBFZCWVJAT',
+    'C': 'FVPJIAOYEDRZXWGCTKUQSBNMHL',
+}
+
+ROTOR_NAMES = tuple(ROTOR_WIRINGS)
+REFLECTOR_NAMES = tuple(REFLECTOR_WIRINGS)
+
+# Byte translations between ASCII letters and letter indices
+UPPERCASE = bytes(range(65, 91))
+LETTER_INDICES = bytes.maketrans(UPPERCASE, bytes(range(26)))
+INDEX_LETTERS = bytes.maketrans(bytes(range(26)), UPPERCASE)
+NON_UPPERCASE = bytes(sorted(set(range(256)) - set(UPPERCASE)))
+LETTER_RUNS = re.compile(b'[A-Z]+')
+NON_LETTER = re.compile(b'[^A-Z]')
+
+# Plain English used to build the n-gram tables for ranking decodings
+ENGLISH_SAMPLE = (
+    'the weather report for the northern sector this morning is clear with light winds from the west and '
+    'good visibility along the coast. all units are to remain at their present positions until further '
+    'orders are received from headquarters. the supply convoy will arrive at the harbour before noon and '
+    'the commanding officer requests that the unloading begins at once so that the ships can leave again '
+    'with the evening tide. there is no change in the situation at the front and the enemy has not been '
+    'seen moving in any strength during the night. our patrols went out as far as the river and returned '
+    'without contact. the bridge to the south of the village is still standing but it is not safe for heavy '
+    'vehicles and must be repaired before the next attack can be made. the engineers have been told and '
+    'will start work as soon as the materials are brought up from the rear. there is a shortage of fuel '
+    'and every effort must be made to save it until the new supplies have come in. messages from the '
+    'forward stations are to be sent every four hours and more often if there is anything of importance '
+    'to report. the aircraft which were expected yesterday did not arrive because of the storm and they '
+    'will now come this afternoon if the weather holds. the men are in good spirits and the food is '
+    'better than it was last week. the doctor reports that there are only a few cases of sickness and '
+    'that none of them is serious. the general will visit the division on thursday and wishes to see the '
+    'new positions on the hill and the defences that have been built along the road. it is important '
+    'that everything should be ready by then and that the troops should be shown to him in the best '
+    'possible order. the question of leave has been discussed and it has been decided that a small number '
+    'of men from each company may go home for one week as soon as the present operation is over. the '
+    'names of those chosen must be sent in by the end of the month. there have been complaints about the '
+    'mail which has been very late and the post office has promised to look into the matter. a number of '
+    'prisoners were taken in the last action and they have been sent back for questioning. they say that '
+    'their own supplies are running low and that many of their officers have been moved to other parts '
+    'of the line. this information should be treated with care until it can be confirmed from other '
+    'sources. the signal station on the island reports that the line to the mainland was broken during '
+    'the night but that it has now been mended and is working again. the new codes will come into force '
+    'at midnight on the first of next month and all the old books are to be destroyed before that time. '
+    'the officer in charge of each station is responsible for seeing that this is done and must report '
+    'when it has been completed. the harbour master asks that no ship should enter or leave the port '
+    'without his permission and that all lights should be kept out after dark. the mines in the outer '
+    'channel have been cleared and the passage is open for small craft but larger vessels must wait '
+    'until the work is finished. the hospital train will leave the station at six in the evening and the '
+    'wounded who are fit to travel will be taken on board before then. the cook has asked for more flour '
+    'and sugar and these will be sent with the next load from the depot. the roads in the hills are very '
+    'bad after the rain and the lorries can only move slowly. it has been reported that the enemy is '
+    'building a new airfield near the town and the reconnaissance flight will go out tomorrow to find out '
+    'whether this is true. the results will be sent to all commanders as soon as the photographs have '
+    'been studied. the situation in the north is quiet and there is nothing further to report at this '
+    'time. the next report will follow at the usual hour unless something happens which makes it '
+    'necessary to send one earlier. please acknowledge receipt of this message and confirm that the '
+    'orders given in it have been understood by all the officers concerned.'
+)
+
+
+class LRUCache:
+    """
+    A class to represent a bounded least recently used cache, safe to share
+    between threads. Values are built outside the lock, so a slow factory
+    does not hold up lookups of other keys.
+
+    ...
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of entries held in the cache
+    maxbytes : int
+        Maximum total size in bytes of the entries held in the cache
+    nbytes : int
+        Current total size in bytes of the entries held in the cache
+    hits : int
+        Number of lookups answered from the cache
+    misses : int
+        Number of lookups that had to build a new entry
+    lock : threading.Lock
+        Lock held while the entries and statistics are read or changed
+
+    Methods
+    -------
+    get(key, factory):
+        Returns the cached value for key, building it with factory if missing.
+
+    info():
+        Returns the cache statistics.
+
+    clear():
+        Removes all entries and resets the statistics.
+
+    """
+
+    def __init__(self, maxsize=128, maxbytes=None, sizeof=None):
+        """
+        Constructs attributes for the LRUCache object.
+
+        Parameters
+        ----------
+        maxsize : int (default=128)
+            Maximum number of entries held in the cache, None for no limit.
+        maxbytes : int (default=None)
+            Maximum total size in bytes of the entries held in the cache, None
+            for no limit. The most recently added entry is always kept.
+        sizeof : callable (default=None)
+            Returns the size in bytes of a cached value. Required when
+            maxbytes is set.
+
+        """
+
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, factory):
+        """
+        Returns the cached value for key, building it with factory if missing.
+
+        Parameters
+        ----------
+        key : hashable
+            Cache key.
+        factory : callable
+            Called with no arguments to build the value on a cache miss.
+
+        Returns
+        -------
+        Cached value.
+
+        """
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        value = factory()
+        with self.lock:
+            # Another thread may have built the same entry in the meantime
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.entries[key] = value
+            if self.sizeof is not None:
+                self.nbytes += self.sizeof(value)
+            while len(self.entries) > 1 and (
+                    (self.maxsize is not None and len(self.entries) > self.maxsize)
+                    or (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+                _, evicted = self.entries.popitem(last=False)
+                if self.sizeof is not None:
+                    self.nbytes -= self.sizeof(evicted)
+        return value
+
+    def info(self):
+        """
+        Returns the cache statistics.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Dictionary with hits, misses, current size, maxsize, nbytes and
+        maxbytes.
+
+        """
+
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries),
+                'maxsize': self.maxsize, 'nbytes': self.nbytes, 'maxbytes': self.maxbytes}
+
+    def clear(self):
+        """
+        Removes all entries and resets the statistics.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Compiled rotor and reflector wirings shared by every Enigma Machine
+WIRING_CACHE = LRUCache(maxsize=512)
+
+# Rotor and reflector wirings as NumPy arrays, see batch_tables
+BATCH_TABLES = {}
+
+# Compiled keystream tables, roughly 0.5MB each
+KEYSTREAM_CACHE = LRUCache(maxsize=None, maxbytes=64 * 2 ** 20, sizeof=lambda table: table.nbytes)
+
+# Middle rotor, left rotor and reflector permutations, see compile_composite
+COMPOSITE_CACHE = LRUCache(maxsize=64)
+
+# English n-gram scorers built from ENGLISH_SAMPLE, see english_scorer
+ENGLISH_SCORERS = {}
+
+# Event telling the worker processes of a search pool to stop, see search_pool
+SEARCH_STOP = None
+
+
 class PlugLead:
     """
     A class to represent an Enigma Machine pluglead.
@@ -63,6 +320,8 @@ class Plugboard:
     ----------
     plugleads : list
         List of added plugleads
+    wiring : list
+        Numerical plugboard encoding for each letter (where 'A'=0 and 'Z'=25)
 
     Methods
     -------
@@ -84,6 +343,9 @@ class Plugboard:
     show_pairs():
         Returns all current pluglead pairs in the plugboard.
 
+    update_wiring():
+        Rebuilds the numerical plugboard encoding from the plugleads.
+
     """
 
     def __init__(self, pair_list=None):
@@ -98,6 +360,7 @@ class Plugboard:
         """
 
         self.plugleads = []
+        self.wiring = list(range(26))
         if pair_list is not None:
             self.add_many(pair_list)
 
@@ -142,6 +405,7 @@ class Plugboard:
 
         self.check_conflicts(PlugLead)
         self.plugleads.append(PlugLead)
+        self.update_wiring()
 
     def add_many(self, pair_list):
         """
@@ -162,6 +426,7 @@ class Plugboard:
             plug = PlugLead(pair)
             self.check_conflicts(plug)
             self.plugleads.append(plug)
+        self.update_wiring()
 
     def remove(self, pair):
         """
@@ -181,6 +446,7 @@ class Plugboard:
         for plug in self.plugleads:
             if plug.pair == pair:
                 self.plugleads.remove(plug)
+        self.update_wiring()
 
     def encode(self, letter):
         """
@@ -221,6 +487,25 @@ class Plugboard:
             all_pairs.append(plug.pair)
         return all_pairs
 
+    def update_wiring(self):
+        """
+        Rebuilds the numerical plugboard encoding from the plugleads.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.wiring = list(range(26))
+        for plug in self.plugleads:
+            a, b = ord(plug.pair[0]) - 65, ord(plug.pair[1]) - 65
+            self.wiring[a], self.wiring[b] = b, a
+
 
 class Rotor:
     """
@@ -236,15 +521,28 @@ class Rotor:
         Starting position of rotor (A - Z)
     ring_setting : int
         Ring setting of rotor (0 - 25)
-    pins : list
-        Rotor pins
     notch : str
         Rotor notch position
+    notch_index : int
+        Numerical rotor notch position (-1 if rotor has no notch)
+    offset : int
+        Current numerical position of rotor (where 'A'=0 and 'Z'=25)
+    forward : tuple
+        Right to left wirings for each offset, ring setting included.
+        forward[offset][index_in] gives index_out.
+    backward : tuple
+        Left to right wirings for each offset, ring setting included.
+        backward[offset][index_in] gives index_out.
+    pins : list
+        Rotor pins at the current offset (read only)
     mapping : list
-        Rotor mappings
+        Rotor mappings at the current offset (read only)
 
     Methods
     -------
+    configure(rotor_name, position, ring_setting):
+        Sets the rotor wiring, starting position and ring setting in place.
+
     encode_right_to_left(index_in):
         Encodes a numerical representation of a letter (where 'A'=0 and 'Z'=25)
         right to left through the rotor.
@@ -254,7 +552,7 @@ class Rotor:
         left to right through the rotor.
 
     rotate():
-        Rotates the pins and mappings of the rotor by one position.
+        Rotates the rotor by one position.
 
     check_notch():
         Checks if rotor is in notch position.
@@ -276,46 +574,46 @@ class Rotor:
 
         """
 
+        self.configure(rotor_name, position, ring_setting)
+
+    def configure(self, rotor_name, position='A', ring_setting=0):
+        """
+        Sets the rotor wiring, starting position and ring setting in place.
+
+        Parameters
+        ----------
+        rotor_name : str
+            Name of rotor
+        position : str (default='A')
+            Starting position of rotor (A - Z)
+        ring_setting : int (default=0)
+            Ring setting of rotor (0 - 25)
+
+        Returns
+        -------
+        None
+
+        """
+
+        check_position(position)
+        self.forward, self.backward, self.notch = compile_rotor(rotor_name, ring_setting)
+        self.notch_index = ord(self.notch) - 65 if self.notch else -1
         self.rotor_name = rotor_name
         self.position = position
         self.ring_setting = ring_setting
-        self.pins = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
-
-        if rotor_name == 'Beta':
-            self.notch = ''
-            self.mapping = list('LEYJVCNIXWPBQMDRTAKZGFUHOS')
-        elif rotor_name == 'Gamma':
-            self.notch = ''
-            self.mapping = list('FSOKANUERHMBTIYCWLQPZXVGJD')
-        elif rotor_name == 'I':
-            self.notch = 'Q'
-            self.mapping = list('EKMFLGDQVZNTOWYHXUSPAIBRCJ')
-        elif rotor_name == 'II':
-            self.notch = 'E'
-            self.mapping = list('AJDKSIRUXBLHWTMCQGZNPYFVOE')
-        elif rotor_name == 'III':
-            self.notch = 'V'
-            self.mapping = list('BDFHJLCPRTXVZNYEIWGAKMUSQO')
-        elif rotor_name == 'IV':
-            self.notch = 'J'
-            self.mapping = list('ESOVPZJAYQUIRHXLNFTGKDCMWB')
-        elif rotor_name == 'V':
-            self.notch = 'Z'
-            self.mapping = list('VZBRGITYUPSDNHLXAWMJQOFECK')
-        else:
-            raise ValueError('Invalid rotor name. Valid rotor names are Beta, Gamma, I II, III, IV, V')
 
-            # Adjust mapping according to ring setting
-        if ring_setting > 1:
-            self.mapping = [chr((ord(c) + self.ring_setting - 1) % 65 % 26 + 65) for c in self.mapping]
-            for _ in range(self.ring_setting - 1):
-                self.mapping = list(self.mapping[-1]) + self.mapping[0:-1]
+        # Adjust offset according to position
+        self.offset = ord(position) - 65
+
+    @property
+    def pins(self):
+        """Rotor pins at the current offset."""
+        return [chr(65 + (i + self.offset) % 26) for i in range(26)]
 
-        # Adjust pins and mapping according to position
-        if position != 'A':
-            idx = ord(position) - 65
-            self.pins = list(self.pins[idx:]) + list(self.pins[:idx])
-            self.mapping = list(self.mapping[idx:]) + list(self.mapping[:idx])
+    @property
+    def mapping(self):
+        """Rotor mappings at the current offset."""
+        return [chr(65 + self.forward[0][(i + self.offset) % 26]) for i in range(26)]
 
     def encode_right_to_left(self, index_in):
         """
@@ -333,8 +631,8 @@ class Rotor:
 
         """
 
-        char_out = self.mapping[index_in]
-        index_out = self.pins.index(char_out)
+        index_out = self.forward[self.offset][index_in]
+        char_out = chr(65 + (index_out + self.offset) % 26)
         return char_out, index_out
 
     def encode_left_to_right(self, index_in):
@@ -353,14 +651,13 @@ class Rotor:
 
         """
 
-        char_pins = self.pins[index_in]
-        index_out = self.mapping.index(char_pins)
-        char_out = self.pins[index_out]
+        index_out = self.backward[self.offset][index_in]
+        char_out = chr(65 + (index_out + self.offset) % 26)
         return char_out, index_out
 
     def rotate(self):
         """
-        Rotates the pins and mappings of the rotor by one position.
+        Rotates the rotor by one position.
 
         Parameters
         ----------
@@ -372,8 +669,7 @@ class Rotor:
 
         """
 
-        self.pins = self.pins[1:] + list(self.pins[0])
-        self.mapping = self.mapping[1:] + list(self.mapping[0])
+        self.offset = (self.offset + 1) % 26
 
     def check_notch(self):
         """
@@ -389,7 +685,7 @@ class Rotor:
 
         """
 
-        return self.pins[0] == self.notch
+        return self.offset == self.notch_index
 
 
 class Reflector(Rotor):
@@ -403,14 +699,16 @@ class Reflector(Rotor):
     ----------
     reflector_name : str
         Name of rotor
-    position : str
-        Starting position of rotor (A - Z)
-    ring_setting : int
-        Ring setting of rotor (0 - 25)
+    offset : int
+        Reflector offset (always 0)
+    forward : tuple
+        Reflector wirings, see Rotor.forward
+    backward : tuple
+        Reflector wirings, see Rotor.backward
     mapping : list
-        Reflector mappings
+        Reflector mappings (read only)
     pins : list
-        Reflector pins
+        Reflector pins (read only)
 
     Methods
     -------
@@ -419,144 +717,761 @@ class Reflector(Rotor):
     """
 
     def __init__(self, reflector_name):
+        self.notch = ''
+        self.notch_index = -1
+        self.offset = 0
+        self.configure(reflector_name)
+
+    def configure(self, reflector_name):
+        """
+        Sets the reflector wiring in place.
+
+        Parameters
+        ----------
+        reflector_name : str
+            Name of reflector
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.forward, self.backward = compile_reflector(reflector_name)
         self.reflector_name = reflector_name
-        self.mapping = []
-        self.pins = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
-
-        if reflector_name == 'A':
-            self.mapping = list('EJMZALYXVBWFCRQUONTSPIKHGD')
-        elif reflector_name == 'B':
-            self.mapping = list('YRUHQSLDPXNGOKMIEBFZCWVJAT')
-        elif reflector_name == 'C':
-            self.mapping = list('FVPJIAOYEDRZXWGCTKUQSBNMHL')
-        else:
-            raise ValueError('Invalid reflector name. Valid reflector names are A, B, C')
 
 
-class Enigma:
+def check_position(position):
     """
-    A class to represent an Enigma Machine and it's components.
+    Checks that a rotor position is a letter A - Z.
 
-    ...
+    Parameters
+    ----------
+    position : str
+        Rotor position.
 
-    Attributes
+    Returns
+    -------
+    None
+
+    """
+
+    if not (isinstance(position, str) and len(position) == 1 and 'A' <= position <= 'Z'):
+        raise ValueError('Invalid rotor position {!r}. Positions must be letters A - Z'.format(position))
+
+
+def check_ring_setting(ring_setting):
+    """
+    Checks that a ring setting is an integer 0 - 26, where 0 and 1 both leave
+    the wiring unshifted.
+
+    Parameters
     ----------
-    plugboard : PlugBoard
-        PlugBoard used in Enigma Machine.
-    rotors : list
-        List of Rotors used in Enigma Machine.
-    reflector : Reflector
-        Reflector used in Enigma Machine.
+    ring_setting : int
+        Ring setting.
 
-    Methods
+    Returns
     -------
-    add_plugboard(plugboard):
-        Adds a plugboard to the Enigma Machine.
+    None
 
-    drop_plugboard():
-        Drops the plugboard from the Enigma Machine.
+    """
 
-    add_rotors(rotor_names, positions, ring_settings):
-        Adds multiple rotors to the Enigma Machine.
+    if not isinstance(ring_setting, int) or isinstance(ring_setting, bool) or not 0 <= ring_setting <= 26:
+        raise ValueError('Invalid ring setting {!r}. Ring settings must be integers 0 - 26'.format(ring_setting))
 
-    drop_rotors():
-        Drops all rotors from the Enigma Machine.
 
-    add_reflector(reflector):
-        Adds a rotor to the Enigma Machine.
+def compile_wiring(wiring, shift):
+    """
+    Compiles a rotor wiring into forward and backward lookup tables for every
+    rotor offset.
 
-    drop_reflector():
-        Drops the reflector from the Enigma Machine.
+    Parameters
+    ----------
+    wiring : str
+        Rotor wiring, e.g. 'EKMFLGDQVZNTOWYHXUSPAIBRCJ'.
+    shift : int
+        Ring setting shift to apply to the wiring (0 - 25).
 
-    validate_machine_config():
-        Checks that Enigma Machine has necessary and valid components.
+    Returns
+    -------
+    Tuple of forward and backward tables, each a tuple of 26 tuples indexed
+    by [offset][index_in].
 
-    validate_message(message):
-        Checks that message is valid before encoding.
+    """
 
-    rotate_rotors():
-        Rotates Enigma Machine rotors.
+    base = [(ord(wiring[(i - shift) % 26]) - 65 + shift) % 26 for i in range(26)]
+    inverse = [0] * 26
+    for i, j in enumerate(base):
+        inverse[j] = i
 
-    encode_letter(char):
-        Encodes a letter by running it through the Enigma Machine.
+    forward = tuple(tuple((base[(i + o) % 26] - o) % 26 for i in range(26)) for o in range(26))
+    backward = tuple(tuple((inverse[(i + o) % 26] - o) % 26 for i in range(26)) for o in range(26))
+    return forward, backward
 
-    encode_message(message):
-        Encodes enigma message by running each letter through the Enigma Machine.
 
-    show_plugboard():
-        Shows plugboard settings in Enigma Machine.
+def compile_rotor(rotor_name, ring_setting):
+    """
+    Returns the compiled wiring tables for a rotor, shared through the
+    wiring cache.
 
-    show_rotors(starting_config):
-        Shows rotor settings in Enigma Machine.
+    Parameters
+    ----------
+    rotor_name : str
+        Name of rotor
+    ring_setting : int
+        Ring setting of rotor (0 - 26, where 0 and 1 both leave the wiring
+        unshifted)
 
-    show_reflector():
-        Shows reflector settings in Enigma Machine.
+    Returns
+    -------
+    Tuple of forward table, backward table and notch.
 
-    show_config(starting_config):
-        Shows Enigma Machine configuration.
+    """
 
-    solve_enigma(encoded_message, crib, plugboard, rotors, positions, reflector, max_iterations)
-        Solves a 3 rotor Enigma Machine given a message, a crib and initial Enigma settings (optional).
-        Does not solve the plugboard.
+    if rotor_name not in ROTOR_WIRINGS:
+        raise ValueError('Invalid rotor name. Valid rotor names are Beta, Gamma, I II, III, IV, V')
+    check_ring_setting(ring_setting)
+
+    def build():
+        wiring, notch = ROTOR_WIRINGS[rotor_name]
+        shift = ring_setting - 1 if ring_setting > 1 else 0
+        return compile_wiring(wiring, shift) + (notch,)
 
+    return WIRING_CACHE.get(('rotor', rotor_name, ring_setting), build)
+
+
+def compile_reflector(reflector_name):
     """
+    Returns the compiled wiring tables for a reflector, shared through the
+    wiring cache.
 
-    def __init__(self):
-        """
-        Constructs attributes for the Enigma object.
+    Parameters
+    ----------
+    reflector_name : str
+        Name of reflector
 
-        Parameters
-        ----------
-        None
+    Returns
+    -------
+    Tuple of forward and backward tables.
 
-        """
+    """
 
-        self.plugboard = None
-        self.rotors = []
-        self.reflector = None
+    if reflector_name not in REFLECTOR_WIRINGS:
+        raise ValueError('Invalid reflector name. Valid reflector names are A, B, C')
 
-    def add_plugboard(self, plugboard):
+    return WIRING_CACHE.get(('reflector', reflector_name),
+                            lambda: compile_wiring(REFLECTOR_WIRINGS[reflector_name], 0))
+
+
+def wiring_cache_info():
+    """
+    Returns hit and miss statistics for the shared wiring cache.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    Dictionary with hits, misses, current size and maxsize.
+
+    """
+
+    return WIRING_CACHE.info()
+
+
+def step_offsets(offsets, notches, n):
+    """
+    Returns the rotor offsets after n keypresses without stepping through
+    them one at a time. Handles turnovers and the middle rotor double step.
+
+    Parameters
+    ----------
+    offsets : tuple
+        Right, middle and left rotor offsets.
+    notches : tuple
+        Right and middle rotor notch indices (-1 if rotor has no notch).
+    n : int
+        Number of keypresses.
+
+    Returns
+    -------
+    Tuple of right, middle and left rotor offsets.
+
+    """
+
+    o0, o1, o2 = offsets
+    n0, n1 = notches[0], notches[1]
+    if n <= 0:
+        return o0, o1, o2
+
+    # Middle rotor starting in notch position double steps on the first keypress
+    if o1 == n1:
+        o0, o1, o2 = (o0 + 1) % 26, (o1 + 1) % 26, (o2 + 1) % 26
+        n -= 1
+
+    # Right rotor turnovers happen every 26 keypresses from the first one
+    first = (n0 - o0) % 26
+    if n0 < 0 or first >= n:
+        carries = 0
+    else:
+        carries = (n - 1 - first) // 26 + 1
+
+    # Each time a turnover lands the middle rotor in its notch position it
+    # double steps on the following keypress, then needs 25 more turnovers
+    # to get back to the notch
+    double_steps = 0
+    distance = (n1 - o1) % 26
+    if n1 >= 0 and carries >= distance:
+        double_steps = 1 + (carries - distance) // 25
+        if (carries - distance) % 25 == 0 and first + (carries - 1) * 26 == n - 1:
+            double_steps -= 1
+
+    return (o0 + n) % 26, (o1 + carries + double_steps) % 26, (o2 + double_steps) % 26
+
+
+class CompositeTable:
+    """
+    A class to represent the middle rotor, left rotor and reflector combined
+    into a single permutation for each pair of middle and left rotor wiring
+    offsets. Those rotors only move at turnovers, so a machine can look up
+    the combined permutation once per turnover instead of passing every
+    letter through them. Rows are filled in the first time they are needed
+    and shared by every machine with the same rotors and reflector, whatever
+    the ring settings.
+
+    ...
+
+    Attributes
+    ----------
+    middle_forward : tuple
+        Forward tables of middle rotor by wiring offset
+    middle_backward : tuple
+        Backward tables of middle rotor by wiring offset
+    left_forward : tuple
+        Forward tables of left rotor by wiring offset
+    left_backward : tuple
+        Backward tables of left rotor by wiring offset
+    reflect : tuple
+        Reflector, including any static rotors
+    rows : list
+        Combined permutations indexed by 26 * left offset + middle offset,
+        None until needed
+
+    Methods
+    -------
+    row(middle_offset, left_offset):
+        Returns the combined permutation for the wiring offsets.
+
+    """
+
+    def __init__(self, middle_name, left_name, reflect):
         """
-        Adds a plugboard to the Enigma Machine.
+        Constructs attributes for the CompositeTable object.
 
         Parameters
         ----------
-        Plugboard : list
-            List of plugboard pairs to add to the Enigma Machine.
-
-        Returns
-        -------
-        None
+        middle_name : str
+            Name of middle rotor
+        left_name : str
+            Name of left rotor
+        reflect : tuple
+            Reflector, including any static rotors, as 26 ints
 
         """
 
-        if self.plugboard is None:
-            self.plugboard = Plugboard(plugboard)
-        else:
-            raise ValueError('Enigma Machine can only have 1 plugboard')
+        self.middle_forward, self.middle_backward, _ = compile_rotor(middle_name, 1)
+        self.left_forward, self.left_backward, _ = compile_rotor(left_name, 1)
+        self.reflect = tuple(reflect)
+        self.rows = [None] * 676
 
-    def drop_plugboard(self):
+    def row(self, middle_offset, left_offset):
         """
-        Drops the plugboard from the Enigma Machine.
+        Returns the combined permutation for the wiring offsets.
 
         Parameters
         ----------
-        None
+        middle_offset : int
+            Middle rotor offset less its ring setting shift
+        left_offset : int
+            Left rotor offset less its ring setting shift
 
         Returns
         -------
-        None
+        Tuple of 26 ints.
 
         """
 
-        self.plugboard = None
+        k = 26 * left_offset + middle_offset
+        row = self.rows[k]
+        if row is None:
+            fwd1, fwd2 = self.middle_forward[middle_offset], self.left_forward[left_offset]
+            bwd1, bwd2 = self.middle_backward[middle_offset], self.left_backward[left_offset]
+            reflect = self.reflect
+            row = self.rows[k] = tuple(bwd1[bwd2[reflect[fwd2[fwd1[idx]]]]] for idx in range(26))
 
-    def add_rotors(self, rotor_names, positions=None, ring_settings=None):
-        """
-        Adds multiple rotors to the Enigma Machine.
+        return row
 
-        Parameters
-        ----------
+
+def compile_composite(middle_name, left_name, reflect):
+    """
+    Returns the CompositeTable for a middle rotor, left rotor and reflector,
+    shared through the composite cache.
+
+    Parameters
+    ----------
+    middle_name : str
+        Name of middle rotor
+    left_name : str
+        Name of left rotor
+    reflect : list
+        Reflector, including any static rotors, as 26 ints
+
+    Returns
+    -------
+    CompositeTable.
+
+    """
+
+    reflect = tuple(reflect)
+    return COMPOSITE_CACHE.get((middle_name, left_name, reflect),
+                               lambda: CompositeTable(middle_name, left_name, reflect))
+
+
+class KeystreamTable:
+    """
+    A class to represent the compiled keystream of an Enigma Machine for a
+    fixed rotor order, ring settings and reflector.
+
+    The three rightmost rotors step through at most 26^3 states, which covers
+    the whole stepping cycle from any starting position. Each state is
+    numbered 676 * left + 26 * middle + right offset, and the table holds the
+    scrambler permutation (rotors and reflector, without the plugboard) that
+    is applied to a letter entered in that state.
+
+    ...
+
+    Attributes
+    ----------
+    key : tuple
+        Machine configuration the table was compiled for
+    permutations : bytes
+        permutations[26 * state + index_in] gives index_out
+    successor : array
+        successor[state] gives the state after the next keypress
+    nbytes : int
+        Memory used by the table in bytes
+
+    Methods
+    -------
+    state_of(offsets):
+        Returns the state number for the right, middle and left rotor offsets.
+
+    offsets_of(state):
+        Returns the right, middle and left rotor offsets for a state number.
+
+    trajectories(length):
+        Returns state sequences that cover every starting state.
+
+    """
+
+    def __init__(self, rotor_names, ring_settings, reflector_name, static_positions=()):
+        """
+        Compiles the keystream table.
+
+        Parameters
+        ----------
+        rotor_names : list
+            List of rotor names. First item in list is the leftmost rotor.
+        ring_settings : list
+            List of ring settings. First item in list is the leftmost rotor.
+        reflector_name : str
+            Name of reflector
+        static_positions : list (default=())
+            Positions of the rotors left of the three stepping rotors, which
+            never rotate. First item in list is the leftmost rotor.
+
+        """
+
+        self.key = (tuple(rotor_names), tuple(ring_settings), reflector_name, tuple(static_positions))
+
+        rotors = [Rotor(name, 'A', ring_setting) for name, ring_setting
+                  in zip(rotor_names[::-1], ring_settings[::-1])]
+        for rotor, position in zip(rotors[3:], static_positions[::-1]):
+            rotor.offset = ord(position) - 65
+        right, middle, left = rotors[0], rotors[1], rotors[2]
+        reflector = Reflector(reflector_name).forward[0]
+
+        # Rotors beyond the third and the reflector form a fixed permutation
+        reflect = list(range(26))
+        for i in range(26):
+            idx = i
+            for rotor in rotors[3:]:
+                idx = rotor.forward[rotor.offset][idx]
+            idx = reflector[idx]
+            for rotor in reversed(rotors[3:]):
+                idx = rotor.backward[rotor.offset][idx]
+            reflect[i] = idx
+
+        # Compose the permutations with bytes.translate, which needs lookup
+        # tables padded to 256 entries
+        def table(wiring):
+            return bytes(wiring) + bytes(230)
+
+        reflect = table(reflect)
+        right_forward = [bytes(wiring) for wiring in right.forward]
+        right_backward = [table(wiring) for wiring in right.backward]
+        permutations = []
+        for o2 in range(26):
+            fwd2, bwd2 = table(left.forward[o2]), table(left.backward[o2])
+            for o1 in range(26):
+                inner = bytes(middle.forward[o1]).translate(fwd2).translate(reflect).translate(bwd2)
+                inner = table(inner.translate(table(middle.backward[o1])))
+                permutations += [fwd0.translate(inner).translate(bwd0)
+                                 for fwd0, bwd0 in zip(right_forward, right_backward)]
+        self.permutations = b''.join(permutations)
+
+        n0, n1 = right.notch_index, middle.notch_index
+        successor = array('H', bytes(2 * 26 ** 3))
+        for state in range(26 ** 3):
+            o2, o1, o0 = state // 676, state // 26 % 26, state % 26
+            if o1 == n1:
+                o1 = (o1 + 1) % 26
+                o2 = (o2 + 1) % 26
+            elif o0 == n0:
+                o1 = (o1 + 1) % 26
+            o0 = (o0 + 1) % 26
+            successor[state] = o2 * 676 + o1 * 26 + o0
+        self.successor = successor
+
+        self.nbytes = len(self.permutations) + len(self.successor) * self.successor.itemsize
+
+    @staticmethod
+    def state_of(offsets):
+        """
+        Returns the state number for the right, middle and left rotor offsets.
+
+        Parameters
+        ----------
+        offsets : tuple
+            Right, middle and left rotor offsets.
+
+        Returns
+        -------
+        State number.
+
+        """
+
+        return offsets[2] * 676 + offsets[1] * 26 + offsets[0]
+
+    @staticmethod
+    def offsets_of(state):
+        """
+        Returns the right, middle and left rotor offsets for a state number.
+
+        Parameters
+        ----------
+        state : int
+            State number.
+
+        Returns
+        -------
+        Tuple of right, middle and left rotor offsets.
+
+        """
+
+        return state % 26, state // 26 % 26, state // 676
+
+
+    def trajectories(self, length):
+        """
+        Returns state sequences that cover every starting state. Each
+        sequence starts with n_starts states, and the state after k keypresses
+        from sequence[i] is sequence[i + k] for every i < n_starts and
+        k <= length. Stepping cycles are unrolled once, so starting states on
+        the same cycle share one sequence; the few states that lead into a
+        cycle get a short sequence of their own.
+
+        Parameters
+        ----------
+        length : int
+            Number of keypresses to cover after each starting state.
+
+        Returns
+        -------
+        List of (sequence, n_starts) tuples.
+
+        """
+
+        successor = self.successor
+        colour = bytearray(len(successor))
+        cycles, tails = [], []
+        for state in range(len(successor)):
+            path = []
+            while colour[state] == 0:
+                colour[state] = 1
+                path.append(state)
+                state = successor[state]
+            if colour[state] == 1:
+                start = path.index(state)
+                cycles.append(path[start:])
+                tails += path[:start]
+            else:
+                tails += path
+            for state in path:
+                colour[state] = 2
+
+        sequences = []
+        for cycle in cycles:
+            sequence = cycle * (length // len(cycle) + 2)
+            sequences.append((sequence[:len(cycle) + length], len(cycle)))
+        for state in tails:
+            sequence = [state]
+            for _ in range(length):
+                sequence.append(successor[sequence[-1]])
+            sequences.append((sequence, 1))
+        return sequences
+
+
+def compile_keystream(rotor_names, ring_settings, reflector_name, static_positions=()):
+    """
+    Returns the keystream table for a machine configuration, shared through
+    the keystream cache.
+
+    Parameters
+    ----------
+    rotor_names : list
+        List of rotor names. First item in list is the leftmost rotor.
+    ring_settings : list
+        List of ring settings. First item in list is the leftmost rotor.
+    reflector_name : str
+        Name of reflector
+    static_positions : list (default=())
+        Positions of the rotors left of the three stepping rotors.
+
+    Returns
+    -------
+    KeystreamTable.
+
+    """
+
+    key = (tuple(rotor_names), tuple(ring_settings), reflector_name, tuple(static_positions))
+    return KEYSTREAM_CACHE.get(key, lambda: KeystreamTable(rotor_names, ring_settings,
+                                                           reflector_name, static_positions))
+
+
+def keystream_cache_info():
+    """
+    Returns hit and miss statistics for the shared keystream cache.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    Dictionary with cache statistics, see LRUCache.info.
+
+    """
+
+    return KEYSTREAM_CACHE.info()
+
+
+class Enigma:
+    """
+    A class to represent an Enigma Machine and it's components.
+
+    ...
+
+    Attributes
+    ----------
+    plugboard : PlugBoard
+        PlugBoard used in Enigma Machine.
+    rotors : list
+        List of Rotors used in Enigma Machine.
+    reflector : Reflector
+        Reflector used in Enigma Machine.
+    keystream : bool
+        Whether messages are encoded through cached keystream tables.
+
+    Methods
+    -------
+    add_plugboard(plugboard):
+        Adds a plugboard to the Enigma Machine.
+
+    drop_plugboard():
+        Drops the plugboard from the Enigma Machine.
+
+    add_rotors(rotor_names, positions, ring_settings):
+        Adds multiple rotors to the Enigma Machine.
+
+    drop_rotors():
+        Drops all rotors from the Enigma Machine.
+
+    add_reflector(reflector):
+        Adds a rotor to the Enigma Machine.
+
+    drop_reflector():
+        Drops the reflector from the Enigma Machine.
+
+    set_plugboard(plugboard):
+        Replaces the plugboard pairs in place.
+
+    set_rotors(rotor_names, positions, ring_settings):
+        Replaces the rotor order, positions and ring settings in place.
+
+    set_positions(positions):
+        Sets the rotor starting positions in place.
+
+    set_ring_settings(ring_settings):
+        Sets the rotor ring settings in place.
+
+    set_reflector(reflector):
+        Replaces the reflector in place.
+
+    set_config(config):
+        Reconfigures the machine in place from a show_config dictionary.
+
+    reset():
+        Returns the rotors to their starting positions.
+
+    advance(n):
+        Moves the rotors forward by n keypresses.
+
+    get_state():
+        Returns a snapshot of the full machine state as a tuple of ints.
+
+    set_state(state):
+        Restores a machine state snapshot taken with get_state.
+
+    validate_machine_config():
+        Checks that Enigma Machine has necessary and valid components.
+
+    validate_message(message):
+        Checks that message is valid before encoding.
+
+    rotate_rotors():
+        Rotates Enigma Machine rotors.
+
+    encode_char(char):
+        Encodes a char by running it through the Enigma Machine.
+
+    keystream_table():
+        Returns the compiled keystream table for the current configuration.
+
+    reflector_table():
+        Returns the reflector and static rotors as a single numerical lookup.
+
+    composite_table():
+        Returns the combined middle rotor, left rotor and reflector table.
+
+    encode_indices(indices):
+        Encodes numerical representations of letters through the Enigma Machine.
+
+    find_crib(indices, crib, starts):
+        Finds the first start position where the crib decodes.
+
+    encode_message(message):
+        Encodes enigma message by running each letter through the Enigma Machine.
+
+    encode_ascii(data):
+        Encodes a message of ASCII uppercase letters given as bytes.
+
+    encode_into(src, dst):
+        Encodes a message into a writable buffer.
+
+    encode_stream(chunks, piece_size):
+        Encodes a message arriving in chunks, yielding each chunk encoded.
+
+    encode_file(src_path, dst_path, non_letters, block_size):
+        Encodes a file through memory maps, in place or to a new file.
+
+    encode_blocks(source, target, block_size):
+        Encodes the letters of a buffer block by block, copying other bytes.
+
+    decode_range(message, start, end):
+        Encodes a slice of a message without encoding the letters before it.
+
+    show_plugboard():
+        Shows plugboard settings in Enigma Machine.
+
+    show_rotors(starting_config):
+        Shows rotor settings in Enigma Machine.
+
+    show_reflector():
+        Shows reflector settings in Enigma Machine.
+
+    show_config(starting_config):
+        Shows Enigma Machine configuration.
+
+    solve_enigma(encoded_message, crib, plugboard, rotors, positions, reflector, max_iterations)
+        Solves a 3 rotor Enigma Machine given a message, a crib and initial Enigma settings (optional).
+        Does not solve the plugboard.
+
+    """
+
+    def __init__(self, keystream=False):
+        """
+        Constructs attributes for the Enigma object.
+
+        Parameters
+        ----------
+        keystream : bool (default=False)
+            Encode messages through keystream tables compiled for the whole
+            rotor cycle. The first message for a configuration pays for the
+            compilation; later ones only do table lookups.
+
+        """
+
+        self.plugboard = None
+        self.rotors = []
+        self.reflector = None
+        self.keystream = keystream
+        self.composite_key = None
+        self.composite_row = None
+
+    def add_plugboard(self, plugboard):
+        """
+        Adds a plugboard to the Enigma Machine.
+
+        Parameters
+        ----------
+        Plugboard : list
+            List of plugboard pairs to add to the Enigma Machine.
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self.plugboard is None:
+            self.plugboard = Plugboard(plugboard)
+        else:
+            raise ValueError('Enigma Machine can only have 1 plugboard')
+
+    def drop_plugboard(self):
+        """
+        Drops the plugboard from the Enigma Machine.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.plugboard = None
+
+    def add_rotors(self, rotor_names, positions=None, ring_settings=None):
+        """
+        Adds multiple rotors to the Enigma Machine.
+
+        Parameters
+        ----------
         rotor_names : list
             List of rotor names to add to the Enigma Machine. First item in list
             is the leftmost rotor.
@@ -584,9 +1499,8 @@ class Enigma:
         elif len(rotor_names) < 3 or len(rotor_names) > 4:
             raise ValueError('Enigma machine can only have 3 or 4 rotors')
         else:
-            for i in range(len(rotor_names)):
-                self.rotors.append(Rotor(rotor_names[::-1][i], positions[::-1][i], \
-                ring_settings[::-1][i]))
+            self.rotors += [Rotor(rotor_names[::-1][i], positions[::-1][i], ring_settings[::-1][i])
+                            for i in range(len(rotor_names))]
 
     def drop_rotors(self):
         """
@@ -639,13 +1553,14 @@ class Enigma:
 
         self.reflector = None
 
-    def validate_machine_config(self):
+    def set_plugboard(self, plugboard):
         """
-        Checks that Enigma Machine has necessary and valid components.
+        Replaces the plugboard pairs in place.
 
         Parameters
         ----------
-        None
+        plugboard : list
+            List of plugboard pairs, or None to remove the plugboard.
 
         Returns
         -------
@@ -653,16 +1568,30 @@ class Enigma:
 
         """
 
-        if len(self.rotors) < 3 or self.reflector is None:
-            raise ValueError('Invalid configuration. Enigma Machine must have at least 3 rotors and 1 reflector')
+        if plugboard is None:
+            self.plugboard = None
+            return
 
-    def validate_message(self, message):
+        # Build the new pairs first so invalid pairs leave the plugboard unchanged
+        new_plugboard = Plugboard(plugboard)
+        if self.plugboard is None:
+            self.plugboard = new_plugboard
+        else:
+            self.plugboard.plugleads = new_plugboard.plugleads
+            self.plugboard.wiring = new_plugboard.wiring
+
+    def set_rotors(self, rotor_names, positions=None, ring_settings=None):
         """
-        Checks that message is valid before encoding.
+        Replaces the rotor order, positions and ring settings in place.
 
         Parameters
         ----------
-        message : str
+        rotor_names : list
+            List of rotor names. First item in list is the leftmost rotor.
+        positions : list (default=None)
+            List of rotor positions. First item in list is the leftmost rotor.
+        ring_settings : list (default=None)
+            List of ring settings. First item in list is the leftmost rotor.
 
         Returns
         -------
@@ -670,17 +1599,38 @@ class Enigma:
 
         """
 
-        for char in message:
-            if ord(char) < 65 or ord(char) > 90:
-                raise ValueError('Invalid message. Enigma Machine only supports messages composed of uppercase letters')
+        if positions is None:
+            positions = ['A'] * len(rotor_names)
+        if ring_settings is None:
+            ring_settings = [1] * len(rotor_names)
 
-    def rotate_rotors(self):
+        # Validate every setting before changing any rotor
+        if not len(rotor_names) == len(positions) == len(ring_settings):
+            raise ValueError('Rotor settings must have consistent lengths')
+        if len(rotor_names) < 3 or len(rotor_names) > 4:
+            raise ValueError('Enigma machine can only have 3 or 4 rotors')
+        for position in positions:
+            check_position(position)
+        for name, ring_setting in zip(rotor_names, ring_settings):
+            compile_rotor(name, ring_setting)
+
+        if len(rotor_names) != len(self.rotors):
+            self.rotors = [Rotor(name, position, ring_setting) for name, position, ring_setting
+                           in zip(rotor_names[::-1], positions[::-1], ring_settings[::-1])]
+            return
+
+        for rotor, name, position, ring_setting in zip(reversed(self.rotors), rotor_names,
+                                                       positions, ring_settings):
+            rotor.configure(name, position, ring_setting)
+
+    def set_positions(self, positions):
         """
-        Rotates Enigma Machine rotors.
+        Sets the rotor starting positions in place.
 
         Parameters
         ----------
-        None
+        positions : list
+            List of rotor positions. First item in list is the leftmost rotor.
 
         Returns
         -------
@@ -688,7 +1638,249 @@ class Enigma:
 
         """
 
-        # Figure out which rotors need to be rotated
+        # Validate every position before changing any rotor
+        if len(positions) != len(self.rotors):
+            raise ValueError('Rotor settings must have consistent lengths')
+        for position in positions:
+            check_position(position)
+        for rotor, position in zip(reversed(self.rotors), positions):
+            rotor.position = position
+            rotor.offset = ord(position) - 65
+
+    def set_ring_settings(self, ring_settings):
+        """
+        Sets the rotor ring settings in place. Rotors keep their current
+        positions.
+
+        Parameters
+        ----------
+        ring_settings : list
+            List of ring settings. First item in list is the leftmost rotor.
+
+        Returns
+        -------
+        None
+
+        """
+
+        # Compile every rotor before changing any
+        if len(ring_settings) != len(self.rotors):
+            raise ValueError('Rotor settings must have consistent lengths')
+        tables = [compile_rotor(rotor.rotor_name, ring_setting)
+                  for rotor, ring_setting in zip(reversed(self.rotors), ring_settings)]
+        for rotor, ring_setting, (forward, backward, _) in zip(reversed(self.rotors), ring_settings, tables):
+            rotor.forward, rotor.backward = forward, backward
+            rotor.ring_setting = ring_setting
+
+    def set_reflector(self, reflector):
+        """
+        Replaces the reflector in place.
+
+        Parameters
+        ----------
+        reflector : str
+            Reflector to use in the Enigma Machine.
+
+        Returns
+        -------
+        None
+
+        """
+
+        if self.reflector is None:
+            self.reflector = Reflector(reflector)
+        else:
+            self.reflector.configure(reflector)
+
+    def set_config(self, config):
+        """
+        Reconfigures the machine in place from a configuration in the format
+        returned by show_config.
+
+        Parameters
+        ----------
+        config : dict
+            Dictionary with plugboard pairs (or None), rotor settings as
+            (name, position, ring setting) leftmost first, and reflector.
+
+        Returns
+        -------
+        None
+
+        """
+
+        rotors = config['rotors']
+        self.set_rotors([rotor[0] for rotor in rotors], [rotor[1] for rotor in rotors],
+                        [rotor[2] for rotor in rotors])
+        self.set_reflector(config['reflector'])
+        self.set_plugboard(config.get('plugboard') or None)
+
+    def reset(self):
+        """
+        Returns the rotors to their starting positions.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+        for rotor in self.rotors:
+            rotor.offset = ord(rotor.position) - 65
+
+    def advance(self, n):
+        """
+        Moves the rotors forward by n keypresses in constant time.
+
+        Parameters
+        ----------
+        n : int
+            Number of keypresses.
+
+        Returns
+        -------
+        None
+
+        """
+
+        right, middle, left = self.rotors[0], self.rotors[1], self.rotors[2]
+        right.offset, middle.offset, left.offset = step_offsets(
+            (right.offset, middle.offset, left.offset),
+            (right.notch_index, middle.notch_index), n)
+
+    def get_state(self):
+        """
+        Returns a snapshot of the full machine state as a tuple of ints.
+
+        The tuple holds the number of rotors, then for each rotor (leftmost
+        first) its index in ROTOR_NAMES, ring setting, starting position and
+        current offset, then the index of the reflector in REFLECTOR_NAMES
+        (-1 if none), the number of plugboard pairs (-1 if no plugboard) and
+        each pair encoded as 26 * first letter + second letter.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Tuple of ints.
+
+        """
+
+        state = [len(self.rotors)]
+        for rotor in reversed(self.rotors):
+            state += [ROTOR_NAMES.index(rotor.rotor_name), rotor.ring_setting,
+                      ord(rotor.position) - 65, rotor.offset]
+
+        state.append(REFLECTOR_NAMES.index(self.reflector.reflector_name)
+                     if self.reflector is not None else -1)
+
+        if self.plugboard is None:
+            state.append(-1)
+        else:
+            pairs = self.plugboard.show_pairs()
+            state.append(len(pairs))
+            state += [(ord(pair[0]) - 65) * 26 + ord(pair[1]) - 65 for pair in pairs]
+
+        return tuple(state)
+
+    def set_state(self, state):
+        """
+        Restores a machine state snapshot taken with get_state.
+
+        Parameters
+        ----------
+        state : tuple
+            Machine state as returned by get_state.
+
+        Returns
+        -------
+        None
+
+        """
+
+        n_rotors = state[0]
+        rotor_state = state[1:1 + 4 * n_rotors]
+        if n_rotors == 0:
+            self.rotors = []
+        else:
+            self.set_rotors([ROTOR_NAMES[i] for i in rotor_state[0::4]],
+                            [chr(65 + i) for i in rotor_state[2::4]],
+                            list(rotor_state[1::4]))
+        for rotor, offset in zip(reversed(self.rotors), rotor_state[3::4]):
+            rotor.offset = offset
+
+        reflector, n_pairs = state[1 + 4 * n_rotors:3 + 4 * n_rotors]
+        if reflector < 0:
+            self.reflector = None
+        else:
+            self.set_reflector(REFLECTOR_NAMES[reflector])
+
+        if n_pairs < 0:
+            self.set_plugboard(None)
+        else:
+            pairs = state[3 + 4 * n_rotors:3 + 4 * n_rotors + n_pairs]
+            self.set_plugboard([chr(65 + code // 26) + chr(65 + code % 26) for code in pairs])
+
+    def validate_machine_config(self):
+        """
+        Checks that Enigma Machine has necessary and valid components.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+        if len(self.rotors) < 3 or self.reflector is None:
+            raise ValueError('Invalid configuration. Enigma Machine must have at least 3 rotors and 1 reflector')
+
+    def validate_message(self, message):
+        """
+        Checks that message is valid before encoding.
+
+        Parameters
+        ----------
+        message : str, bytes, bytearray or memoryview
+
+        Returns
+        -------
+        None
+
+        """
+
+        if isinstance(message, str):
+            valid = message.isascii() and (not message or (message.isalpha() and message.isupper()))
+        else:
+            data = message if isinstance(message, (bytes, bytearray)) else memoryview(message).tobytes()
+            valid = not data.translate(None, UPPERCASE)
+        if not valid:
+            raise ValueError('Invalid message. Enigma Machine only supports messages composed of uppercase letters')
+
+    def rotate_rotors(self):
+        """
+        Rotates Enigma Machine rotors.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+        # Figure out which rotors need to be rotated
         to_rotate = [-1] * len(self.rotors)
         for i, rotor in enumerate(self.rotors):
             # First rotor is always rotated
@@ -718,62 +1910,92 @@ class Enigma:
 
         """
 
-        # Pass char through plugboard
+        # Convert char to an index and pass through plugboard
+        idx = ord(char) - 65
         if self.plugboard is not None:
-            char = self.plugboard.encode(char)
-
-        # Convert char to an index
-        idx = ord(char) % 65
+            idx = self.plugboard.wiring[idx]
 
         # Rotate Rotors
         self.rotate_rotors()
 
-        # Forward pass through rotors
-        for i, rotor in enumerate(self.rotors):
-            _, idx = rotor.encode_right_to_left(idx)
-
-        # Pass through reflector
-        _, idx = self.reflector.encode_right_to_left(idx)
-
-        # Backwards pass through rotors
-        for rotor in reversed(self.rotors):
-            _, idx = rotor.encode_left_to_right(idx)
-
-        # Output char
-        char = chr(65 + idx)
-
-        # Pass char through plugboard
+        # Pass through right rotor, the middle rotor, left rotor and reflector
+        # combined, and back through the right rotor. The combined table only
+        # changes when the middle or left rotor tables do, or when a static
+        # rotor beyond the third is reconfigured
+        right, middle, left = self.rotors[0], self.rotors[1], self.rotors[2]
+        key = (middle.forward[middle.offset], left.forward[left.offset], self.reflector.forward)
+        if len(self.rotors) > 3:
+            key += tuple(rotor.forward[rotor.offset] for rotor in self.rotors[3:])
+        cached = self.composite_key
+        if cached is None or key[0] is not cached[0] or key[1] is not cached[1] \
+           or key[2] is not cached[2] or key[3:] != cached[3:]:
+            self.composite_row = self.composite_table().row(
+                (middle.offset - (middle.ring_setting - 1 if middle.ring_setting > 1 else 0)) % 26,
+                (left.offset - (left.ring_setting - 1 if left.ring_setting > 1 else 0)) % 26)
+            self.composite_key = key
+        idx = right.backward[right.offset][self.composite_row[right.forward[right.offset][idx]]]
+
+        # Pass through plugboard and output char
         if self.plugboard is not None:
-            char = self.plugboard.encode(char)
+            idx = self.plugboard.wiring[idx]
 
-        return char
+        return chr(65 + idx)
 
-    def encode_message(self, message):
+    def keystream_table(self):
         """
-        Encodes enigma message by running each letter through the Enigma Machine.
+        Returns the compiled keystream table for the current configuration.
 
         Parameters
         ----------
-        message : str
+        None
 
         Returns
         -------
-        Encoded message.
+        KeystreamTable.
 
         """
 
         self.validate_machine_config()
-        self.validate_message(message)
-        encoded_message = ''
+        rotors = self.rotors[::-1]
+        return compile_keystream([rotor.rotor_name for rotor in rotors],
+                                 [rotor.ring_setting for rotor in rotors],
+                                 self.reflector.reflector_name,
+                                 [chr(65 + rotor.offset) for rotor in rotors[:-3]])
 
-        for char in message:
-            encoded_message += self.encode_char(char)
+    def reflector_table(self):
+        """
+        Returns the reflector combined with the rotors beyond the third,
+        which never rotate, as a single numerical lookup.
+
+        Parameters
+        ----------
+        None
 
-        return encoded_message
+        Returns
+        -------
+        List of 26 ints.
 
-    def show_plugboard(self):
         """
-        Shows plugboard settings in Enigma Machine.
+
+        if len(self.rotors) <= 3:
+            return self.reflector.forward[0]
+
+        reflect = list(range(26))
+        for i in range(26):
+            idx = i
+            for rotor in self.rotors[3:]:
+                idx = rotor.forward[rotor.offset][idx]
+            idx = self.reflector.forward[0][idx]
+            for rotor in reversed(self.rotors[3:]):
+                idx = rotor.backward[rotor.offset][idx]
+            reflect[i] = idx
+        return reflect
+
+    def composite_table(self):
+        """
+        Returns the combined table of the middle rotor, left rotor and
+        reflector, including any static rotors, for the current
+        configuration.
 
         Parameters
         ----------
@@ -781,255 +2003,3418 @@ class Enigma:
 
         Returns
         -------
-        Plugboard pairs.
+        CompositeTable.
 
         """
 
-        return self.plugboard.show_pairs()
+        return compile_composite(self.rotors[1].rotor_name, self.rotors[2].rotor_name, self.reflector_table())
 
-    def show_rotors(self, starting_config):
+    def encode_indices(self, indices):
         """
-        Shows rotor settings in Enigma Machine.
+        Encodes numerical representations of letters (where 'A'=0 and 'Z'=25)
+        by running them through the Enigma Machine.
 
         Parameters
         ----------
-        starting_config : bool (default=True)
-            Specifies whether to return the rotor starting or current position.
+        indices : iterable
+            Numerical representations of letters to encode.
 
         Returns
         -------
-        List of rotor settings.
+        List of encoded indices.
 
         """
 
-        rotor_settings = []
-        if starting_config is True:
-            for rotor in reversed(self.rotors):
-                rotor_settings.append((rotor.rotor_name, rotor.position, rotor.ring_setting))
-        else:
-            for rotor in reversed(self.rotors):
-                rotor_settings.append((rotor.rotor_name, rotor.pins[0], rotor.ring_setting))
+        plug = self.plugboard.wiring if self.plugboard is not None else list(range(26))
+        right, middle, left = self.rotors[0], self.rotors[1], self.rotors[2]
+
+        if self.keystream:
+            table = self.keystream_table()
+            permutations, successor = table.permutations, table.successor
+            state = table.state_of((right.offset, middle.offset, left.offset))
+            encoded = []
+            for idx in indices:
+                state = successor[state]
+                encoded.append(plug[permutations[26 * state + plug[idx]]])
+            right.offset, middle.offset, left.offset = table.offsets_of(state)
+            return encoded
+
+        o0, o1, o2 = right.offset, middle.offset, left.offset
+        n0, n1 = right.notch_index, middle.notch_index
+        fwd0, bwd0 = right.forward, right.backward
+
+        # Middle rotor, left rotor and reflector combined, looked up again
+        # only when the middle rotor turns over
+        row_of = self.composite_table().row
+        s1 = middle.ring_setting - 1 if middle.ring_setting > 1 else 0
+        s2 = left.ring_setting - 1 if left.ring_setting > 1 else 0
+        row = row_of((o1 - s1) % 26, (o2 - s2) % 26)
+
+        encoded = []
+        for idx in indices:
+            # Rotate rotors, middle rotor double steps when in notch position
+            if o1 == n1:
+                o1 = (o1 + 1) % 26
+                o2 = (o2 + 1) % 26
+                row = row_of((o1 - s1) % 26, (o2 - s2) % 26)
+            elif o0 == n0:
+                o1 = (o1 + 1) % 26
+                row = row_of((o1 - s1) % 26, (o2 - s2) % 26)
+            o0 = (o0 + 1) % 26
+
+            encoded.append(plug[bwd0[o0][row[fwd0[o0][plug[idx]]]]])
+
+        right.offset, middle.offset, left.offset = o0, o1, o2
+        return encoded
+
+    def find_crib(self, indices, crib, starts):
+        """
+        Finds the first start position where the crib decodes, decoding only
+        the letters needed and giving up on a start at its first mismatching
+        letter. The machine state is left unchanged.
 
-        return rotor_settings
+        Parameters
+        ----------
+        indices : list
+            Numerical representation of the encoded message.
+        crib : list
+            Numerical representation of the crib.
+        starts : list
+            Sorted positions in the message where the crib may start.
+
+        Returns
+        -------
+        First matching start position, or -1 if the crib is not found.
 
-    def show_reflector(self):
         """
-        Shows reflector settings in Enigma Machine.
+
+        if not starts or not crib:
+            return starts[0] if starts else -1
+
+        plug = self.plugboard.wiring if self.plugboard is not None else list(range(26))
+        right, middle, left = self.rotors[0], self.rotors[1], self.rotors[2]
+        n0, n1 = right.notch_index, middle.notch_index
+        fwd0, fwd1, fwd2 = right.forward, middle.forward, left.forward
+        bwd0, bwd1, bwd2 = right.backward, middle.backward, left.backward
+        reflect = self.reflector_table()
+        start_offsets = (right.offset, middle.offset, left.offset)
+
+        starts = iter(starts)
+        next_start = next(starts)
+        active = []
+        last = len(crib) - 1
+        k = next_start
+        o0, o1, o2 = step_offsets(start_offsets, (n0, n1), k)
+        while k < len(indices):
+            # Rotate rotors, middle rotor double steps when in notch position
+            if o1 == n1:
+                o1 = (o1 + 1) % 26
+                o2 = (o2 + 1) % 26
+            elif o0 == n0:
+                o1 = (o1 + 1) % 26
+            o0 = (o0 + 1) % 26
+
+            if k == next_start:
+                active.append(k)
+                next_start = next(starts, -1)
+
+            if active:
+                idx = plug[indices[k]]
+                idx = fwd2[o2][fwd1[o1][fwd0[o0][idx]]]
+                idx = plug[bwd0[o0][bwd1[o1][bwd2[o2][reflect[idx]]]]]
+                if len(active) == 1:
+                    if crib[k - active[0]] != idx:
+                        active = []
+                else:
+                    active = [start for start in active if crib[k - start] == idx]
+                if active and k - active[0] == last:
+                    return active[0]
+
+            k += 1
+            if not active:
+                if next_start < 0:
+                    return -1
+                if next_start - k > 8:
+                    # Jump straight to the next start position
+                    o0, o1, o2 = step_offsets(start_offsets, (n0, n1), next_start)
+                    k = next_start
+
+        return -1
+
+    def encode_message(self, message):
+        """
+        Encodes enigma message by running each letter through the Enigma Machine.
 
         Parameters
         ----------
-        None
+        message : str, bytes, bytearray or memoryview
 
         Returns
         -------
-        Reflector name.
+        Encoded message, as bytes if the message was not a str.
 
         """
 
-        return self.reflector.reflector_name
+        self.validate_machine_config()
+        self.validate_message(message)
+        if isinstance(message, str):
+            return self.encode_ascii(message.encode('ascii')).decode('ascii')
+        return self.encode_ascii(message)
 
-    def show_config(self, starting_config=True):
+    def encode_ascii(self, data):
         """
-        Shows Enigma Machine configuration.
+        Encodes a message of ASCII uppercase letters given as bytes, without
+        validating it.
 
         Parameters
         ----------
-        starting_config : bool (default=True)
-            Specifies whether to return the starting or current rotor position.
+        data : bytes, bytearray or memoryview
 
         Returns
         -------
-        Dictionary containing Enigma Machine configuration.
+        Encoded message as bytes.
 
         """
 
-        config = {'plugboard': None, 'rotors': None, 'reflector': None}
-        if self.plugboard is not None:
-            config['plugboard'] = self.plugboard.show_pairs()
-        if self.rotors is not None:
-            config['rotors'] = self.show_rotors(starting_config=starting_config)
-        if self.reflector is not None:
-            config['reflector'] = self.show_reflector()
+        data = data if isinstance(data, (bytes, bytearray)) else memoryview(data).tobytes()
+        return bytes(self.encode_indices(data.translate(LETTER_INDICES))).translate(INDEX_LETTERS)
 
-        return config
+    def encode_into(self, src, dst):
+        """
+        Encodes a message into a writable buffer provided by the caller, such
+        as a bytearray, memoryview or mmap, as ASCII uppercase letters.
+
+        Parameters
+        ----------
+        src : str, bytes, bytearray or memoryview
+            Message to encode.
+        dst : writable buffer
+            Buffer to write the encoded message to, from its start.
+
+        Returns
+        -------
+        Number of bytes written.
 
-def solve_enigma(encoded_message, crib, plugboard=None, rot_in=None, pos_in=None,
-                 set_in=None, ref_in=None, return_first=True, max_iterations=100000):
         """
-        Solves a 3 rotor Enigma Machine given a message, a crib and initial
-        Enigma settings (optional). Does not solve the plugboard.
+
+        self.validate_machine_config()
+        self.validate_message(src)
+        target = memoryview(dst).cast('B')
+        size = len(src) if not isinstance(src, memoryview) else src.nbytes
+        if len(target) < size:
+            raise ValueError('Destination buffer is too small: {} bytes for a {} letter message'.format(
+                len(target), size))
+        target[:size] = self.encode_ascii(src.encode('ascii') if isinstance(src, str) else src)
+
+        return size
+
+    def encode_stream(self, chunks, piece_size=65536):
+        """
+        Encodes a message arriving in chunks of any size, yielding each chunk
+        encoded as soon as it arrives. Rotor positions carry over from one
+        chunk to the next, so the output joined together is the same as
+        encoding the whole message at once, but only one chunk is held at a
+        time. Each chunk is validated when it arrives, so an invalid chunk
+        raises ValueError after the chunks before it have been yielded.
 
         Parameters
         ----------
-        encoded_message : str
-            Encoded message to decode.
-        crib : str
-            Crib in message to aid in decoding.
-        plugboard : list (default=None)
-            List of known plugboard configuration.
-        rot_in : list (default=None)
-            List of known rotors.
-        pos_in : list (default=None)
-            List of known positions.
-        set_in : list (default=None)
-            List of known ring settings.
-        ref_in : str (default=None)
-            Known reflector.
-        return_first : bool (default=True)
-            Option to stop solving when first solution found.
-        max_iterations : int (default=100000)
-            Maximum number of iterations to run solver loop.
-
-        Returns
-        -------
-        List of tuples with decoded message(s) and initial Enigma set_in.
-
-        """
-
-        all_rot = ['I', 'II', 'III', 'IV', 'V', 'Beta', 'Gamma']
-        all_pos = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
-        all_set = [x for x in range(1, 27)]
-        all_ref = ['A', 'B', 'C']
-
-        # 1. Case where we know everything
-        if rot_in is not None and pos_in is not None and set_in is not None and ref_in is not None:
-            combinations = (rot0, rot1, rot2, pos0, pos1, pos2, ref) = rot_in[0], rot_in[1], rot_in[2], \
-                            pos_in[0], pos_in[1], pos_in[2], set_in[0], set_in[1], set_in[2], \
-                            ref_in
-            combinations = [list(combinations)]
-
-        # 2. Case where we know rotors, positions and settings
-        elif rot_in is not None and pos_in is not None and set_in is not None and ref_in is None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos_in[0], pos_in[1], pos_in[2],
-                             set_in[0], set_in[1], set_in[2], ref)
-                             for ref in all_ref)
-
-        # 3. Case where we know rotors, positions and reflector
-        elif rot_in is not None and pos_in is not None and set_in is None and ref_in is not None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos_in[0], pos_in[1], pos_in[2],
-                             set0, set1, set2, ref_in)
-                             for set0 in all_set for set1 in all_set for set2 in all_set)
-
-        # 4. Case where we know rotors, settings and reflector
-        elif rot_in is not None and pos_in is None and set_in is not None and ref_in is not None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos0, pos1, pos2,
-                             set_in[0], set_in[1], set_in[2], ref_in)
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos)
-
-        # 5. Case where we know position, settings and reflector
-        elif rot_in is None and pos_in is not None and set_in is not None and ref_in is not None:
-            combinations = ((rot0, rot1, rot2, pos_in[0], pos_in[1], pos_in[2],
-                             set_in[0], set_in[1], set_in[2], ref_in)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # 6. Case where we know only rotors and positions
-        elif rot_in is not None and pos_in is not None and set_in is None and ref_in is None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos_in[0], pos_in[1], pos_in[2],
-                             set0, set1, set2, ref)
-                             for set0 in all_set for set1 in all_set for set2 in all_set
-                             for ref in all_ref)
-
-        # 7. Case where we know only rotors and settings
-        elif rot_in is not None and pos_in is None and set_in is not None and ref_in is None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos0, pos1, pos2,
-                             set_in[0], set_in[1], set_in[2], ref)
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                             for ref in all_ref)
-
-        # 8. Case where we know only rotors and reflector
-        elif rot_in is not None and pos_in is None and set_in is None and ref_in is not None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos0, pos1, pos2,
-                             set0, set1, set2, ref_in)
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                             for set0 in all_set for set1 in all_set for set2 in all_set)
-
-        # 9. Case where we know only positions and settings
-        elif rot_in is None and pos_in is not None and set_in is not None and ref_in is None:
-            combinations = ((rot0, rot1, rot2, pos_in[0], pos_in[1], pos_in[2],
-                             set_in[0], set_in[1], set_in[2], ref)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             for ref in all_ref
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # 10. Case where we know only positions and reflector
-        elif rot_in is None and pos_in is not None and set_in is None and ref_in is not None:
-            combinations = ((rot0, rot1, rot2, pos_in[0], pos_in[1], pos_in[2],
-                             set0, set1, set2, ref_in)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             for set0 in all_set for set1 in all_set for set2 in all_set
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # 11. Case where we know only settings and reflector
-        elif rot_in is None and pos_in is None and set_in is not None and ref_in is not None:
-            combinations = ((rot0, rot1, rot2, pos0, pos1, pos2,
-                             set_in[0], set_in[1], set_in[2], ref_in)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # 12. Case where we only know the rotors
-        elif rot_in is not None and pos_in is None and set_in is None and ref_in is None:
-            combinations = ((rot_in[0], rot_in[1], rot_in[2], pos0, pos1, pos2,
-                             set0, set1, set2, ref)
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                             for set0 in all_set for set1 in all_set for set2 in all_set
-                             for ref in all_ref)
-
-        # 13. Case where we only know the positions
-        elif rot_in is None and pos_in is not None and set_in is None and ref_in is None:
-            combinations = ((rot0, rot1, rot2, pos_in[0], pos_in[1], pos_in[2],
-                             set0, set1, set2, ref)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             for set0 in all_set for set1 in all_set for set2 in all_set
-                             for ref in all_ref
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # 14. Case where we only know the settings
-        elif rot_in is None and pos_in is None and set_in is not None and ref_in is None:
-            combinations = ((rot0, rot1, rot2, pos0, pos1, pos2,
-                             set_in[0], set_in[1], set_in[2], ref)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                             for ref in all_ref
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # 15. Case where we only know the reflector
-        elif rot_in is None and pos_in is None and set_in is None and ref_in is not None:
-            combinations = ((rot0, rot1, rot2, pos0, pos1, pos2,
-                              set0, set1, set2, ref_in)
-                             for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                             for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                             for set0 in all_set for set1 in all_set for set2 in all_set
-                             if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # Catch-all case where we don't know anything!
-        else:
-            combinations = ((rot0, rot1, rot2, pos0, pos1, pos2, ref)
-                            for rot0 in all_rot for rot1 in all_rot for rot2 in all_rot
-                            for pos0 in all_pos for pos1 in all_pos for pos2 in all_pos
-                            for ref in all_ref
-                            if rot0 != rot1 and rot0 != rot2 and rot1 != rot2)
-
-        # Solve the message
-        decoded_messages = []
-        iterations = 0
-
-        for comb in combinations:
-            if iterations >= max_iterations and max_iterations > 0:
-                raise TimeoutError('Maximum iterations reached: {}. Increase max_iterations to \
-                                   solve for more iterations'.format(max_iterations))
-            my_enigma = Enigma()
-            if plugboard is not None:
-                my_enigma.add_plugboard(plugboard)
-            my_enigma.add_rotors([comb[0], comb[1], comb[2]], [comb[3], comb[4], comb[5]],
-                                 [comb[6], comb[7], comb[8]])
-            my_enigma.add_reflector(comb[9])
-            decoded_message = my_enigma.encode_message(encoded_message)
-            iterations += 1
-            if decoded_message.find(crib) > -1:
-                decoded_messages.append((decoded_message, my_enigma.show_config()))
-                if return_first is True:
-                    return decoded_messages
+        chunks : iterable
+            Chunks of the message, each a str or bytes-like object of
+            uppercase letters. Bytes-like chunks are yielded as bytes.
+        piece_size : int (default=65536)
+            Largest number of letters converted at once within a chunk, to
+            bound the working memory for large chunks.
 
-        return decoded_messages
+        Returns
+        -------
+        Generator of encoded chunks.
+
+        """
+
+        self.validate_machine_config()
+        for chunk in chunks:
+            self.validate_message(chunk)
+            if isinstance(chunk, str):
+                yield ''.join([self.encode_ascii(chunk[start:start + piece_size].encode('ascii')).decode('ascii')
+                               for start in range(0, len(chunk), piece_size)])
+            else:
+                chunk = memoryview(chunk).cast('B')
+                yield b''.join([self.encode_ascii(chunk[start:start + piece_size])
+                                for start in range(0, len(chunk), piece_size)])
+
+    def encode_file(self, src_path, dst_path=None, non_letters='pass', block_size=1 << 20):
+        """
+        Encodes a file through memory maps, block by block with the rotor
+        positions carried over, so files of any size are processed with
+        bounded memory. Every byte other than A-Z either passes through
+        unchanged without stepping the rotors, or makes the whole file
+        rejected before anything is written. The machine is left in its final
+        state, which is also returned so a later file can continue from it
+        with set_state.
+
+        Parameters
+        ----------
+        src_path : str
+            File to encode.
+        dst_path : str (default=None)
+            File to write, created or truncated to the size of src_path. None
+            (or src_path itself) encodes the file in place.
+        non_letters : str (default='pass')
+            'pass' to copy non-letter bytes unchanged, 'reject' to raise
+            ValueError if the file holds any.
+        block_size : int (default=1 << 20)
+            Number of bytes encoded at once.
+
+        Returns
+        -------
+        Final machine state, as returned by get_state.
+
+        """
+
+        if non_letters not in ('pass', 'reject'):
+            raise ValueError("Invalid non_letters option: {}. Use 'pass' or 'reject'".format(non_letters))
+        if block_size < 1:
+            raise ValueError('block_size must be at least 1')
+        self.validate_machine_config()
+
+        in_place = dst_path is None or (os.path.exists(dst_path) and os.path.samefile(src_path, dst_path))
+        size = os.path.getsize(src_path)
+        with open(src_path, 'r+b' if in_place else 'rb') as src:
+            if size == 0:
+                if not in_place:
+                    open(dst_path, 'wb').close()
+                return self.get_state()
+
+            with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_WRITE if in_place else mmap.ACCESS_READ) as source:
+                if hasattr(source, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    source.madvise(mmap.MADV_SEQUENTIAL)
+                if non_letters == 'reject':
+                    invalid = NON_LETTER.search(source)
+                    if invalid is not None:
+                        raise ValueError('Invalid file. Non-letter byte {!r} at offset {}'.format(
+                            invalid.group(), invalid.start()))
+
+                if in_place:
+                    self.encode_blocks(source, source, block_size)
+                else:
+                    with open(dst_path, 'w+b') as dst:
+                        dst.truncate(size)
+                        with mmap.mmap(dst.fileno(), size) as target:
+                            self.encode_blocks(source, target, block_size)
+
+        return self.get_state()
+
+    def encode_blocks(self, source, target, block_size):
+        """
+        Encodes the letters of a buffer into a buffer of the same size, block
+        by block, copying every other byte unchanged.
+
+        Parameters
+        ----------
+        source : buffer
+            Bytes to encode.
+        target : writable buffer
+            Buffer to write to, which may be source itself.
+        block_size : int
+            Number of bytes encoded at once.
+
+        Returns
+        -------
+        None
+
+        """
+
+        for start in range(0, len(source), block_size):
+            block = source[start:start + block_size]
+            letters = block.translate(None, NON_UPPERCASE)
+            encoded = self.encode_ascii(letters)
+            if len(letters) == len(block):
+                target[start:start + len(block)] = encoded
+                continue
+
+            out = bytearray(block)
+            done = 0
+            for run in LETTER_RUNS.finditer(block):
+                n = run.end() - run.start()
+                out[run.start():run.end()] = encoded[done:done + n]
+                done += n
+            target[start:start + len(block)] = out
+
+        if isinstance(target, mmap.mmap):
+            target.flush()
+
+    def decode_range(self, message, start=0, end=None):
+        """
+        Encodes message[start:end] as if message[:start] had been encoded
+        first, without encoding the letters before start. The machine state
+        is left unchanged.
+
+        Parameters
+        ----------
+        message : str
+            Full encoded message, starting at the current machine state.
+        start : int (default=0)
+            Index of the first letter to decode.
+        end : int (default=None)
+            Index after the last letter to decode, None for the end of the
+            message.
+
+        Returns
+        -------
+        Decoded slice of the message.
+
+        """
+
+        self.validate_machine_config()
+        start, end, _ = slice(start, end).indices(len(message))
+        window = message[start:end]
+        self.validate_message(window)
+
+        offsets = [rotor.offset for rotor in self.rotors]
+        try:
+            self.advance(start)
+            decoded = self.encode_indices([ord(char) - 65 for char in window])
+        finally:
+            for rotor, offset in zip(self.rotors, offsets):
+                rotor.offset = offset
+
+        return ''.join([chr(65 + idx) for idx in decoded])
+
+    def show_plugboard(self):
+        """
+        Shows plugboard settings in Enigma Machine.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Plugboard pairs.
+
+        """
+
+        return self.plugboard.show_pairs()
+
+    def show_rotors(self, starting_config):
+        """
+        Shows rotor settings in Enigma Machine.
+
+        Parameters
+        ----------
+        starting_config : bool (default=True)
+            Specifies whether to return the rotor starting or current position.
+
+        Returns
+        -------
+        List of rotor settings.
+
+        """
+
+        rotor_settings = []
+        if starting_config is True:
+            for rotor in reversed(self.rotors):
+                rotor_settings.append((rotor.rotor_name, rotor.position, rotor.ring_setting))
+        else:
+            for rotor in reversed(self.rotors):
+                rotor_settings.append((rotor.rotor_name, chr(65 + rotor.offset), rotor.ring_setting))
+
+        return rotor_settings
+
+    def show_reflector(self):
+        """
+        Shows reflector settings in Enigma Machine.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Reflector name.
+
+        """
+
+        return self.reflector.reflector_name
+
+    def show_config(self, starting_config=True):
+        """
+        Shows Enigma Machine configuration.
+
+        Parameters
+        ----------
+        starting_config : bool (default=True)
+            Specifies whether to return the starting or current rotor position.
+
+        Returns
+        -------
+        Dictionary containing Enigma Machine configuration.
+
+        """
+
+        config = {'plugboard': None, 'rotors': None, 'reflector': None}
+        if self.plugboard is not None:
+            config['plugboard'] = self.plugboard.show_pairs()
+        if self.rotors is not None:
+            config['rotors'] = self.show_rotors(starting_config=starting_config)
+        if self.reflector is not None:
+            config['reflector'] = self.show_reflector()
+
+        return config
+
+def batch_encode(configs, message):
+    """
+    Encodes a message through many Enigma Machine configurations at once
+    using NumPy. Requires numpy.
+
+    Parameters
+    ----------
+    configs : list
+        List of Enigma Machine configurations as returned by
+        Enigma.show_config. All configurations must have the same number of
+        rotors.
+    message : str
+        Message to encode.
+
+    Returns
+    -------
+    Array of shape (len(configs), len(message)) with the numerical
+    representation of each encoded letter (where 'A'=0 and 'Z'=25).
+
+    """
+
+    if np is None:
+        raise ImportError('batch_encode requires numpy')
+
+    n_rotors = len(configs[0]['rotors']) if len(configs) > 0 else 3
+    rotors, positions, ring_settings, reflectors, plugboards = [], [], [], [], []
+    wirings = {}
+    for config in configs:
+        if len(config['rotors']) != n_rotors:
+            raise ValueError('All configurations must have the same number of rotors')
+        for name, position, ring_setting in config['rotors']:
+            if name not in ROTOR_WIRINGS:
+                raise ValueError('Invalid rotor name. Valid rotor names are Beta, Gamma, I II, III, IV, V')
+            rotors.append(ROTOR_NAMES.index(name))
+            positions.append(ord(position) - 65)
+            ring_settings.append(ring_setting)
+        if config['reflector'] not in REFLECTOR_WIRINGS:
+            raise ValueError('Invalid reflector name. Valid reflector names are A, B, C')
+        reflectors.append(REFLECTOR_NAMES.index(config['reflector']))
+        pairs = tuple(config['plugboard'] or ())
+        if pairs not in wirings:
+            wirings[pairs] = Plugboard(pairs).wiring
+        plugboards.append(wirings[pairs])
+
+    shape = (len(configs), n_rotors)
+    return batch_encode_arrays(np.reshape(rotors, shape), np.reshape(positions, shape),
+                               np.reshape(ring_settings, shape), np.array(reflectors),
+                               np.reshape(plugboards, (len(configs), 26)), message)
+
+
+def batch_encode_arrays(rotors, positions, ring_settings, reflectors, plugboards, message):
+    """
+    Encodes a message through many Enigma Machine configurations given as
+    integer arrays. Requires numpy. See batch_encode and BatchMachines.
+
+    Parameters
+    ----------
+    rotors : array
+        Array of shape (K, 3) or (K, 4) with indices into ROTOR_NAMES. First
+        column is the leftmost rotor.
+    positions : array
+        Array of shape (K, 3) or (K, 4) with numerical rotor positions (where
+        'A'=0 and 'Z'=25).
+    ring_settings : array
+        Array of shape (K, 3) or (K, 4) with rotor ring settings.
+    reflectors : array
+        Array of shape (K,) with indices into REFLECTOR_NAMES.
+    plugboards : array
+        Array of shape (K, 26) or (26,) with numerical plugboard wirings, see
+        Plugboard.wiring.
+    message : str
+        Message to encode.
+
+    Returns
+    -------
+    Array of shape (K, len(message)) with the numerical representation of
+    each encoded letter (where 'A'=0 and 'Z'=25).
+
+    """
+
+    return BatchMachines(rotors, positions, ring_settings, reflectors, plugboards).encode(message)
+
+
+class BatchMachines:
+    """
+    A class to represent many Enigma Machine configurations encoded together
+    with NumPy. Requires numpy.
+
+    Wirings only depend on the rotor offset relative to the ring setting, so
+    each rotor at each keypress is addressed by the row 26 * rotor + offset -
+    shift of the shared tables from batch_tables.
+
+    ...
+
+    Attributes
+    ----------
+    size : int
+        Number of configurations
+    rotors : array
+        Array of shape (K, 3) with 26 * rotor index, rightmost rotor first
+    positions : array
+        Array of shape (K, 3) with starting rotor offsets, rightmost rotor first
+    shifts : array
+        Array of shape (K, 3) with ring setting shifts, rightmost rotor first
+    notches : array
+        Array of shape (K, 2) with right and middle rotor notch indices
+    plug : array
+        Array of shape (K * 26,) with the plugboard wirings
+    reflect : array
+        Array of shape (K * 26,) with the reflectors, static rotors included
+
+    Methods
+    -------
+    encode(message):
+        Encodes a message through every configuration.
+
+    encode_at(rows, steps, letters):
+        Encodes single letters for given configurations and keypresses.
+
+    find_crib(message, crib, starts):
+        Finds the first start position where the crib decodes for every
+        configuration.
+
+    """
+
+    def __init__(self, rotors, positions, ring_settings, reflectors, plugboards):
+        """
+        Constructs attributes for the BatchMachines object. See
+        batch_encode_arrays for the parameters.
+
+        """
+
+        if np is None:
+            raise ImportError('BatchMachines requires numpy')
+
+        rotors = np.asarray(rotors, dtype=np.intp)
+        n_configs, n_rotors = rotors.shape
+        if n_rotors < 3 or n_rotors > 4:
+            raise ValueError('Enigma machine can only have 3 or 4 rotors')
+        forward, backward, notch_table, reflector_table = batch_tables()
+
+        # Columns are rightmost rotor first
+        rotors = rotors[:, ::-1] * 26
+        positions = np.asarray(positions, dtype=np.intp)[:, ::-1]
+        shifts = np.maximum(np.asarray(ring_settings, dtype=np.intp)[:, ::-1] - 1, 0)
+        plug = np.broadcast_to(np.asarray(plugboards, dtype=np.intp), (n_configs, 26)).ravel()
+        reflect = reflector_table[np.asarray(reflectors, dtype=np.intp)]
+
+        # Rotors beyond the third never rotate, fold them into the reflector
+        for r in range(3, n_rotors):
+            row = (rotors[:, r] + (positions[:, r] - shifts[:, r]) % 26)[:, None] * 26
+            x = forward[row + np.arange(26)]
+            x = reflect[np.arange(n_configs)[:, None], x]
+            reflect = backward[row + x]
+
+        self.size = n_configs
+        self.rotors = np.ascontiguousarray(rotors[:, :3])
+        self.positions = np.ascontiguousarray(positions[:, :3])
+        self.shifts = np.ascontiguousarray(shifts[:, :3])
+        self.notches = notch_table[self.rotors[:, :2] // 26]
+        self.plug = plug
+        self.reflect = reflect.ravel()
+
+    def encode(self, message):
+        """
+        Encodes a message through every configuration.
+
+        Parameters
+        ----------
+        message : str
+            Message to encode.
+
+        Returns
+        -------
+        Array of shape (K, len(message)) with the numerical representation of
+        each encoded letter (where 'A'=0 and 'Z'=25).
+
+        """
+
+        Enigma().validate_message(message)
+        letters = np.array([ord(char) - 65 for char in message], dtype=np.intp)
+        rows = np.arange(self.size, dtype=np.intp)[:, None]
+        steps = np.arange(1, len(message) + 1, dtype=np.intp)[None, :]
+        return self.encode_at(rows, steps, letters[None, :]).astype(np.uint8)
+
+    def encode_at(self, rows, steps, letters):
+        """
+        Encodes single letters for given configurations and keypresses. The
+        arguments are broadcast together.
+
+        Parameters
+        ----------
+        rows : array
+            Configuration numbers.
+        steps : array
+            Keypress numbers, 1 for the first letter of a message.
+        letters : array
+            Numerical representations of the letters to encode.
+
+        Returns
+        -------
+        Array with the numerical representation of each encoded letter.
+
+        """
+
+        forward, backward = batch_tables()[:2]
+        rows = np.asarray(rows, dtype=np.intp)
+
+        # Rotor offsets at every keypress, see step_offsets
+        o0, o1, o2 = self.positions[rows, 0], self.positions[rows, 1], self.positions[rows, 2]
+        n0, n1 = self.notches[rows, 0], self.notches[rows, 1]
+        initial = (o1 == n1).astype(np.intp)
+        o0, o1, o2, n = o0 + initial, o1 + initial, o2 + initial, steps - initial
+        first = (n0 - o0) % 26
+        carries = np.where((n0 >= 0) & (first < n), (n - 1 - first) // 26 + 1, 0)
+        distance = (n1 - o1) % 26
+        landed = (n1 >= 0) & (carries >= distance)
+        double_steps = np.where(landed, 1 + (carries - distance) // 25, 0)
+        double_steps -= landed & ((carries - distance) % 25 == 0) & (first + (carries - 1) * 26 == n - 1)
+        row0 = (self.rotors[rows, 0] + (o0 + n - self.shifts[rows, 0]) % 26) * 26
+        row1 = (self.rotors[rows, 1] + (o1 + carries + double_steps - self.shifts[rows, 1]) % 26) * 26
+        row2 = (self.rotors[rows, 2] + (o2 + double_steps - self.shifts[rows, 2]) % 26) * 26
+
+        # Run every letter through its machine
+        base = 26 * rows
+        x = self.plug[base + letters]
+        x = forward[row0 + x]
+        x = forward[row1 + x]
+        x = forward[row2 + x]
+        x = self.reflect[base + x]
+        x = backward[row2 + x]
+        x = backward[row1 + x]
+        x = backward[row0 + x]
+        return self.plug[base + x]
+
+    def find_crib(self, message, crib, starts):
+        """
+        Finds the first start position where the crib decodes for every
+        configuration. Each candidate start is dropped at its first
+        mismatching letter, so most only cost one decoded letter.
+
+        Parameters
+        ----------
+        message : str
+            Encoded message.
+        crib : str
+            Crib to look for in the decoded message.
+        starts : list
+            Sorted positions in the message where the crib may start.
+
+        Returns
+        -------
+        Array of shape (K,) with the first matching start position for each
+        configuration, or -1 if the crib is not found.
+
+        """
+
+        letters = np.array([ord(char) - 65 for char in message], dtype=np.intp)
+        crib = np.array([ord(char) - 65 for char in crib], dtype=np.intp)
+        starts = np.asarray(starts, dtype=np.intp)
+        found = np.full(self.size, -1, dtype=np.intp)
+
+        if len(crib) == 0:
+            found[:] = starts[0] if len(starts) > 0 else -1
+            return found
+
+        # Work through the start positions in blocks to bound memory use. The
+        # first crib letter is checked for every configuration and start,
+        # the rest only for the (row, start) pairs still matching.
+        rows = np.arange(self.size, dtype=np.intp)[:, None]
+        block = max(1, 2 ** 20 // max(self.size, 1))
+        for b in range(0, len(starts), block):
+            block_starts = starts[b:b + block]
+            decoded = self.encode_at(rows, block_starts[None, :] + 1, letters[block_starts][None, :])
+            pair_rows, pair_columns = np.nonzero((decoded == crib[0]) & (found[:, None] < 0))
+            pair_starts = block_starts[pair_columns]
+            for j in range(1, len(crib)):
+                if len(pair_rows) == 0:
+                    break
+                decoded = self.encode_at(pair_rows, pair_starts + j + 1, letters[pair_starts + j])
+                keep = decoded == crib[j]
+                pair_rows, pair_starts = pair_rows[keep], pair_starts[keep]
+            # Pairs are ordered by start within each row, keep the first
+            matched, first = np.unique(pair_rows, return_index=True)
+            found[matched] = pair_starts[first]
+
+        return found
+
+
+def batch_tables():
+    """
+    Returns the wiring tables used by batch_encode_arrays as NumPy arrays.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    Tuple of forward and backward rotor tables indexed by
+    [26 * (26 * rotor + offset) + index_in], rotor notch indices and
+    reflector tables indexed by [reflector, index_in].
+
+    """
+
+    if 'batch' not in BATCH_TABLES:
+        forward, backward, notches = [], [], []
+        for name in ROTOR_NAMES:
+            fwd, bwd, notch = compile_rotor(name, 1)
+            forward += [i for row in fwd for i in row]
+            backward += [i for row in bwd for i in row]
+            notches.append(ord(notch) - 65 if notch else -1)
+        reflectors = [compile_reflector(name)[0][0] for name in REFLECTOR_NAMES]
+        BATCH_TABLES['batch'] = (np.array(forward, dtype=np.intp), np.array(backward, dtype=np.intp),
+                                 np.array(notches, dtype=np.intp), np.array(reflectors, dtype=np.intp))
+    return BATCH_TABLES['batch']
+
+
+class Keyspace:
+    """
+    A class to represent the Enigma settings searched by the solver. Each
+    rotor, position and ring setting slot and the reflector can be known,
+    unknown or limited to a list of candidates, and every combination has
+    an index so the keyspace can be skipped into, split and sampled without
+    enumerating it.
+
+    Combinations are ordered by rotors, then positions, then ring settings,
+    then reflector, and are tuples of (rotor, rotor, rotor, position,
+    position, position, ring setting, ring setting, ring setting,
+    reflector), leftmost rotor first.
+
+    ...
+
+    Attributes
+    ----------
+    rotors : list
+        List of candidate rotor orders, each a tuple of distinct rotors
+    positions : list
+        List of candidate positions for each rotor
+    ring_settings : list
+        List of candidate ring settings for each rotor
+    reflectors : list
+        List of candidate reflectors
+    slots : list
+        List of candidate lists in order of significance
+
+    Methods
+    -------
+    rank(combination):
+        Returns the index of a combination.
+
+    unrank(index):
+        Returns the combination at an index.
+
+    iterate(start=0, stop=None):
+        Yields the combinations from start up to stop.
+
+    shard(shard_index, shard_count):
+        Returns the start and stop indices of one of several equal shards.
+
+    sample(n, seed=None):
+        Returns n distinct combinations chosen at random.
+
+    """
+
+    def __init__(self, rotors=None, positions=None, ring_settings=None, reflector=None):
+        """
+        Constructs attributes for the Keyspace object.
+
+        Parameters
+        ----------
+        rotors : list (default=None)
+            List of 3 rotors, leftmost rotor first. Each entry is a rotor
+            name, a list of candidate names or None for any rotor. None for
+            any rotors.
+        positions : list (default=None)
+            List of 3 positions in the same form, None for any positions.
+        ring_settings : list (default=None)
+            List of 3 ring settings in the same form, None for any ring
+            settings.
+        reflector : str or list (default=None)
+            Reflector name, list of candidate names or None for any reflector.
+
+        Raises ValueError for an invalid setting, a slot without candidates
+        or rotors that leave no order of three different rotors.
+
+        """
+
+        rotor_slots = self.candidates(rotors, ['I', 'II', 'III', 'IV', 'V', 'Beta', 'Gamma'], 'rotors')
+        for name in [name for slot in rotor_slots for name in slot]:
+            if name not in ROTOR_WIRINGS:
+                raise ValueError('Invalid rotor name {!r}. Valid rotor names are {}'.format(
+                    name, ', '.join(ROTOR_NAMES)))
+        self.rotors = [(rot0, rot1, rot2) for rot0 in rotor_slots[0] for rot1 in rotor_slots[1]
+                       for rot2 in rotor_slots[2] if rot0 != rot1 and rot0 != rot2 and rot1 != rot2]
+        if not self.rotors:
+            raise ValueError('Rotors {} leave no order of three different rotors'.format(rotor_slots))
+
+        self.positions = self.candidates(positions, list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'positions')
+        for position in [position for slot in self.positions for position in slot]:
+            check_position(position)
+        self.ring_settings = self.candidates(ring_settings, list(range(1, 27)), 'ring settings')
+        for ring_setting in [ring_setting for slot in self.ring_settings for ring_setting in slot]:
+            check_ring_setting(ring_setting)
+
+        if reflector is None:
+            self.reflectors = ['A', 'B', 'C']
+        elif isinstance(reflector, (list, tuple)):
+            self.reflectors = list(reflector)
+        else:
+            self.reflectors = [reflector]
+        if not self.reflectors:
+            raise ValueError('No reflector candidates')
+        for name in self.reflectors:
+            if name not in REFLECTOR_WIRINGS:
+                raise ValueError('Invalid reflector name {!r}. Valid reflector names are {}'.format(
+                    name, ', '.join(REFLECTOR_NAMES)))
+
+        self.slots = [self.rotors] + self.positions + self.ring_settings + [self.reflectors]
+        self.lookup = [dict((value, index) for index, value in enumerate(slot)) for slot in self.slots]
+
+    @staticmethod
+    def candidates(values, all_values, label):
+        """
+        Returns the list of candidates for each of 3 slots.
+
+        Parameters
+        ----------
+        values : list
+            List of 3 entries, each a value, a list of values or None, or
+            None for all values in every slot.
+        all_values : list
+            List of every possible value.
+        label : str
+            Name of the setting, for error messages.
+
+        Returns
+        -------
+        List of 3 lists of candidates.
+
+        """
+
+        if values is None:
+            return [list(all_values) for _ in range(3)]
+        if len(values) != 3:
+            raise ValueError('Expected 3 {}, got {}'.format(label, len(values)))
+
+        slots = []
+        for value in values:
+            if value is None:
+                slots.append(list(all_values))
+            elif isinstance(value, (list, tuple)):
+                if not value:
+                    raise ValueError('No candidates for one of the {}'.format(label))
+                slots.append(list(value))
+            else:
+                slots.append([value])
+
+        return slots
+
+    def __len__(self):
+        """
+        Returns the number of combinations in the keyspace.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Number of combinations.
+
+        """
+
+        size = 1
+        for slot in self.slots:
+            size *= len(slot)
+
+        return size
+
+    def __iter__(self):
+        """
+        Yields every combination in the keyspace.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Generator of combinations.
+
+        """
+
+        return self.iterate()
+
+    def __getitem__(self, key):
+        """
+        Returns the combination at an index, or a generator of the
+        combinations in a slice.
+
+        Parameters
+        ----------
+        key : int or slice
+            Index of combination, negative indices count from the end, or
+            slice of indices.
+
+        Returns
+        -------
+        Combination, or generator of combinations.
+
+        """
+
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return self.iterate(start, stop)
+            return (self.unrank(index) for index in range(start, stop, step))
+
+        return self.unrank(key)
+
+    def digits(self, index):
+        """
+        Returns the candidate index of each slot for a keyspace index.
+
+        Parameters
+        ----------
+        index : int
+            Index of combination, negative indices count from the end.
+
+        Returns
+        -------
+        List of candidate indices, most significant slot first.
+
+        """
+
+        size = len(self)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError('Keyspace index out of range')
+
+        digits = []
+        for slot in reversed(self.slots):
+            index, digit = divmod(index, len(slot))
+            digits.append(digit)
+
+        return digits[::-1]
+
+    def combination(self, digits):
+        """
+        Returns the combination for the candidate index of each slot.
+
+        Parameters
+        ----------
+        digits : list
+            Candidate index of each slot, as returned by digits.
+
+        Returns
+        -------
+        Tuple of 3 rotors, 3 positions, 3 ring settings and reflector.
+
+        """
+
+        return self.slots[0][digits[0]] + tuple(slot[digit] for slot, digit in
+                                                zip(self.slots[1:], digits[1:]))
+
+    def rank(self, combination):
+        """
+        Returns the index of a combination.
+
+        Parameters
+        ----------
+        combination : tuple
+            Tuple of 3 rotors, 3 positions, 3 ring settings and reflector.
+
+        Returns
+        -------
+        Index of combination.
+
+        """
+
+        values = [tuple(combination[0:3])] + list(combination[3:10])
+        index = 0
+        for slot, lookup, value in zip(self.slots, self.lookup, values):
+            if value not in lookup:
+                raise ValueError('Combination not in keyspace: {}'.format(combination))
+            index = index * len(slot) + lookup[value]
+
+        return index
+
+    def unrank(self, index):
+        """
+        Returns the combination at an index.
+
+        Parameters
+        ----------
+        index : int
+            Index of combination, negative indices count from the end.
+
+        Returns
+        -------
+        Tuple of 3 rotors, 3 positions, 3 ring settings and reflector.
+
+        """
+
+        return self.combination(self.digits(index))
+
+    def iterate(self, start=0, stop=None):
+        """
+        Yields the combinations from start up to stop, stepping through the
+        slots like an odometer from the first one.
+
+        Parameters
+        ----------
+        start : int (default=0)
+            Index of first combination, clamped to 0.
+        stop : int (default=None)
+            Index to stop before, None for the end of the keyspace. Clamped to
+            the size of the keyspace.
+
+        Returns
+        -------
+        Generator of combinations.
+
+        """
+
+        size = len(self)
+        start = max(start, 0)
+        stop = size if stop is None else min(stop, size)
+        if start >= stop:
+            return
+
+        slots = self.slots
+        digits = self.digits(start)
+        values = [slot[digit] for slot, digit in zip(slots, digits)]
+        for _ in range(start, stop):
+            yield values[0] + tuple(values[1:])
+            k = len(slots) - 1
+            while k >= 0:
+                digits[k] += 1
+                if digits[k] < len(slots[k]):
+                    values[k] = slots[k][digits[k]]
+                    break
+                digits[k] = 0
+                values[k] = slots[k][0]
+                k -= 1
+
+    def shard(self, shard_index, shard_count):
+        """
+        Returns the index range of one of several shards of near equal size.
+
+        Parameters
+        ----------
+        shard_index : int
+            Index of shard, from 0 to shard_count - 1.
+        shard_count : int
+            Number of shards.
+
+        Returns
+        -------
+        Tuple of start and stop indices.
+
+        """
+
+        if shard_index < 0 or shard_index >= shard_count:
+            raise ValueError('Shard index must be between 0 and {}'.format(shard_count - 1))
+        size = len(self)
+
+        return size * shard_index // shard_count, size * (shard_index + 1) // shard_count
+
+    def sample(self, n, seed=None):
+        """
+        Returns n distinct combinations chosen at random.
+
+        Parameters
+        ----------
+        n : int
+            Number of combinations.
+        seed : int (default=None)
+            Seed for the random number generator.
+
+        Returns
+        -------
+        List of combinations.
+
+        """
+
+        return [self.unrank(index) for index in random.Random(seed).sample(range(len(self)), n)]
+
+
+class NgramScorer:
+    """
+    A class to represent a table of n-gram log-likelihoods for scoring
+    decodings without a crib. Scores are integers, 100 times the base 10 log
+    probability of each n-gram, summed over a message given as letter
+    indices.
+
+    ...
+
+    Attributes
+    ----------
+    n : int
+        Length of n-grams
+    table : array
+        Array of 26 ** n integer scores indexed by the n-gram in base 26
+    floor : int
+        Score of n-grams never seen in the text the table was built from
+
+    Methods
+    -------
+    from_text(text, n=3):
+        Builds a scorer from the n-gram counts of a text.
+
+    score(indices):
+        Returns the score of a message given as letter indices.
+
+    """
+
+    def __init__(self, n, table, floor):
+        """
+        Constructs attributes for the NgramScorer object.
+
+        Parameters
+        ----------
+        n : int
+            Length of n-grams
+        table : array
+            Array of 26 ** n integer scores indexed by the n-gram in base 26
+        floor : int
+            Score of n-grams never seen
+
+        """
+
+        if len(table) != 26 ** n:
+            raise ValueError('Expected {} scores for {}-grams, got {}'.format(26 ** n, n, len(table)))
+        self.n = n
+        self.table = table
+        self.floor = floor
+
+    @classmethod
+    def from_text(cls, text, n=3):
+        """
+        Builds a scorer from the n-gram counts of a text. Everything but the
+        letters is dropped first, so n-grams run across word boundaries as
+        they do in Enigma messages.
+
+        Parameters
+        ----------
+        text : str
+            Text to count n-grams in.
+        n : int (default=3)
+            Length of n-grams.
+
+        Returns
+        -------
+        NgramScorer object.
+
+        """
+
+        letters = [ord(char) - 65 for char in text.upper() if 'A' <= char <= 'Z']
+        if len(letters) < n:
+            raise ValueError('Text is too short to count {}-grams'.format(n))
+
+        counts = [0] * 26 ** n
+        size = 26 ** n
+        index = 0
+        for position, letter in enumerate(letters):
+            index = (index * 26 + letter) % size
+            if position >= n - 1:
+                counts[index] += 1
+
+        total = len(letters) - n + 1
+        floor = int(round(100 * log10(0.01 / total)))
+        table = array('i', [int(round(100 * log10(count / total))) if count else floor for count in counts])
+
+        return cls(n, table, floor)
+
+    def score(self, indices):
+        """
+        Returns the score of a message given as letter indices.
+
+        Parameters
+        ----------
+        indices : list
+            Letter indices, where 'A'=0 and 'Z'=25.
+
+        Returns
+        -------
+        Integer score, higher for more English-like messages.
+
+        """
+
+        table = self.table
+        if self.n == 1:
+            return sum(table[a] for a in indices)
+        if self.n == 2:
+            return sum(table[26 * a + b] for a, b in zip(indices, indices[1:]))
+        if self.n == 3:
+            return sum(table[676 * a + 26 * b + c] for a, b, c in zip(indices, indices[1:], indices[2:]))
+
+        size, index, total = 26 ** self.n, 0, 0
+        for position, letter in enumerate(indices):
+            index = (index * 26 + letter) % size
+            if position >= self.n - 1:
+                total += table[index]
+
+        return total
+
+
+def english_scorer(n=3):
+    """
+    Returns the NgramScorer for English n-grams counted in ENGLISH_SAMPLE,
+    built once and shared.
+
+    Parameters
+    ----------
+    n : int (default=3)
+        Length of n-grams.
+
+    Returns
+    -------
+    NgramScorer object.
+
+    """
+
+    if n not in ENGLISH_SCORERS:
+        ENGLISH_SCORERS[n] = NgramScorer.from_text(ENGLISH_SAMPLE, n)
+
+    return ENGLISH_SCORERS[n]
+
+
+def select_scorer(scoring):
+    """
+    Returns the NgramScorer for a scoring option, or None for the index of
+    coincidence.
+
+    Parameters
+    ----------
+    scoring : str or NgramScorer
+        'ioc', 'bigram', 'trigram' or an NgramScorer.
+
+    Returns
+    -------
+    NgramScorer object or None.
+
+    """
+
+    if isinstance(scoring, NgramScorer):
+        return scoring
+    if scoring == 'ioc':
+        return None
+    if scoring in ('bigram', 'trigram'):
+        return english_scorer(2 if scoring == 'bigram' else 3)
+
+    raise ValueError('Invalid scoring. Valid scorings are ioc, bigram, trigram or an NgramScorer')
+
+
+def coincidence_score(indices):
+    """
+    Returns the number of pairs of equal letters in a message given as letter
+    indices. For messages of the same length this ranks decodings like the
+    index of coincidence, which divides it by the number of pairs.
+
+    Parameters
+    ----------
+    indices : list
+        Letter indices, where 'A'=0 and 'Z'=25.
+
+    Returns
+    -------
+    Integer score, higher for more English-like messages.
+
+    """
+
+    counts = [0] * 26
+    for letter in indices:
+        counts[letter] += 1
+
+    return sum(count * (count - 1) for count in counts) // 2
+
+
+def index_of_coincidence(message):
+    """
+    Returns the index of coincidence of a message, the chance that two
+    letters picked at random are the same. English is around 0.066 and
+    random text around 0.038.
+
+    Parameters
+    ----------
+    message : str
+        Message in capital letters.
+
+    Returns
+    -------
+    Index of coincidence.
+
+    """
+
+    length = len(message)
+    if length < 2:
+        return 0.0
+
+    return coincidence_score([ord(char) - 65 for char in message]) / (length * (length - 1) / 2)
+
+
+class SolverStats:
+    """
+    A class to represent the progress and timings of a solver search.
+
+    Phase timings are summed over worker processes, so with workers they
+    can add up to more than the elapsed time.
+
+    ...
+
+    Attributes
+    ----------
+    total : int
+        Number of combinations in the search, or None if unknown
+    searched : int
+        Number of combinations searched, including any skipped on resume
+    skipped : int
+        Number of combinations skipped by resuming from a checkpoint
+    matches : int
+        Number of matches found
+    started : float
+        time.perf_counter() when the search started
+    elapsed : float
+        Seconds since the search started, as of the last update
+    setup_time : float
+        Seconds spent setting up machines for each combination
+    decrypt_time : float
+        Seconds spent decoding
+    match_time : float
+        Seconds spent checking the crib and building matches
+    profile : pstats.Stats
+        Profile of the search if requested, otherwise None
+
+    Methods
+    -------
+    rate():
+        Returns the number of combinations searched per second.
+
+    eta():
+        Returns the estimated seconds until the search is finished.
+
+    merge(other):
+        Adds the phase timings of another SolverStats.
+
+    summary():
+        Returns a dictionary of the progress and timings.
+
+    """
+
+    def __init__(self, total=None):
+        """
+        Constructs attributes for the SolverStats object.
+
+        Parameters
+        ----------
+        total : int (default=None)
+            Number of combinations in the search, None if unknown.
+
+        """
+
+        self.total = total
+        self.searched = 0
+        self.skipped = 0
+        self.matches = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.setup_time = 0.0
+        self.decrypt_time = 0.0
+        self.match_time = 0.0
+        self.profile = None
+
+    def rate(self):
+        """
+        Returns the number of combinations searched per second in this run.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Combinations per second, 0.0 before any time has elapsed.
+
+        """
+
+        if self.elapsed <= 0:
+            return 0.0
+
+        return (self.searched - self.skipped) / self.elapsed
+
+    def eta(self):
+        """
+        Returns the estimated seconds until the search is finished.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Seconds, or None if the total or the rate is unknown.
+
+        """
+
+        rate = self.rate()
+        if self.total is None or rate <= 0:
+            return None
+
+        return max(0, self.total - self.searched) / rate
+
+    def merge(self, other):
+        """
+        Adds the phase timings of another SolverStats.
+
+        Parameters
+        ----------
+        other : SolverStats
+            SolverStats to add.
+
+        Returns
+        -------
+        None
+
+        """
+
+        self.setup_time += other.setup_time
+        self.decrypt_time += other.decrypt_time
+        self.match_time += other.match_time
+
+    def summary(self):
+        """
+        Returns a dictionary of the progress and timings.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Dictionary with searched, total, matches, elapsed, rate, eta and the
+        phase timings.
+
+        """
+
+        return {'searched': self.searched, 'total': self.total, 'matches': self.matches,
+                'elapsed': self.elapsed, 'rate': self.rate(), 'eta': self.eta(),
+                'setup_time': self.setup_time, 'decrypt_time': self.decrypt_time,
+                'match_time': self.match_time}
+
+
+class PlugboardClimber:
+    """
+    A class to represent a hill-climbing search for the plugboard of an
+    Enigma Machine with known rotors and reflector.
+
+    Each keypress goes through the plugboard, the scrambler for that
+    keypress and the plugboard again. Changing a pair only changes the
+    keypresses whose encoded letter or scrambler output is one of the
+    letters rewired, so each pair is scored by redecoding those keypresses
+    and rescoring the n-grams around them.
+
+    ...
+
+    Attributes
+    ----------
+    encoded : list
+        Letter indices of the encoded message
+    scramblers : list
+        Scrambler permutation of each keypress, as bytes
+    wiring : list
+        Plugboard wiring, the letter each letter is swapped with
+    middle : list
+        Scrambler output of each keypress
+    decoded : list
+        Letter indices of the decoded message
+    counts : list
+        Number of times each letter appears in the decoded message
+    by_encoded : list
+        Keypresses for each encoded letter
+    by_middle : list
+        Set of keypresses for each scrambler output letter
+    scorer : NgramScorer
+        Scorer of decodings, None for the index of coincidence
+    score : int
+        Score of the current decoding
+    max_pairs : int
+        Maximum number of plugboard pairs
+
+    Methods
+    -------
+    rescore(wiring):
+        Returns the score and changed keypresses for a new wiring.
+
+    accept(wiring, score, changes):
+        Moves to a new wiring scored by rescore.
+
+    toggled(a, b):
+        Returns the wiring with letters a and b connected or disconnected.
+
+    climb():
+        Applies the best improving pair changes until none improve.
+
+    pairs():
+        Returns the plugboard pairs of the current wiring.
+
+    """
+
+    def __init__(self, encoded_message, rotors, positions, ring_settings, reflector, scoring='trigram',
+                 max_pairs=10, plugboard=None):
+        """
+        Constructs attributes for the PlugboardClimber object.
+
+        Parameters
+        ----------
+        encoded_message : str
+            Encoded message.
+        rotors : list
+            List of 3 rotor names, leftmost rotor first.
+        positions : list
+            List of rotor starting positions, leftmost rotor first.
+        ring_settings : list
+            List of rotor ring settings, leftmost rotor first.
+        reflector : str
+            Reflector name.
+        scoring : str or NgramScorer (default='trigram')
+            'ioc', 'bigram', 'trigram' or an NgramScorer, see select_scorer.
+        max_pairs : int (default=10)
+            Maximum number of plugboard pairs.
+        plugboard : list (default=None)
+            List of plugboard pairs to start from.
+
+        """
+
+        if max_pairs > 10:
+            raise ValueError('Plugboard can only have up to 10 pairs')
+
+        table = compile_keystream(rotors, ring_settings, reflector)
+        state = table.state_of([ord(position) - 65 for position in positions[::-1]])
+        self.scramblers = []
+        for _ in encoded_message:
+            state = table.successor[state]
+            self.scramblers.append(table.permutations[26 * state:26 * state + 26])
+
+        self.encoded = [ord(char) - 65 for char in encoded_message]
+        self.by_encoded = [[] for _ in range(26)]
+        for k, letter in enumerate(self.encoded):
+            self.by_encoded[letter].append(k)
+
+        self.wiring = list(range(26))
+        if plugboard is not None:
+            self.wiring = list(Plugboard(plugboard).wiring)
+        self.middle = [scrambler[self.wiring[letter]] for scrambler, letter in zip(self.scramblers, self.encoded)]
+        self.decoded = [self.wiring[letter] for letter in self.middle]
+        self.counts = [0] * 26
+        for letter in self.decoded:
+            self.counts[letter] += 1
+        self.by_middle = [set() for _ in range(26)]
+        for k, letter in enumerate(self.middle):
+            self.by_middle[letter].add(k)
+
+        self.scorer = select_scorer(scoring)
+        self.score = coincidence_score(self.decoded) if self.scorer is None else self.scorer.score(self.decoded)
+        self.max_pairs = max_pairs
+
+    def rescore(self, wiring):
+        """
+        Returns the score of the decoding with a new plugboard wiring,
+        redecoding only the keypresses it changes.
+
+        Parameters
+        ----------
+        wiring : list
+            New plugboard wiring.
+
+        Returns
+        -------
+        Tuple of score and dictionary of changed keypress to new scrambler
+        output and decoded letter.
+
+        """
+
+        keypresses = set()
+        for letter in range(26):
+            if wiring[letter] != self.wiring[letter]:
+                keypresses.update(self.by_encoded[letter])
+                keypresses.update(self.by_middle[letter])
+
+        changes = {}
+        for k in keypresses:
+            middle = self.scramblers[k][wiring[self.encoded[k]]]
+            changes[k] = (middle, wiring[middle])
+
+        decoded = self.decoded
+        if self.scorer is None:
+            # Only the pairs of equal letters among the changed letters' counts change
+            deltas = {}
+            for k, (_, letter) in changes.items():
+                if letter != decoded[k]:
+                    deltas[decoded[k]] = deltas.get(decoded[k], 0) - 1
+                    deltas[letter] = deltas.get(letter, 0) + 1
+            score = self.score
+            for letter, delta in deltas.items():
+                count = self.counts[letter]
+                score += ((count + delta) * (count + delta - 1) - count * (count - 1)) // 2
+            return score, changes
+
+        # Only the n-grams overlapping a changed letter change score
+        n, table, length = self.scorer.n, self.scorer.table, len(decoded)
+        starts = set()
+        for k, (_, letter) in changes.items():
+            if letter != decoded[k]:
+                starts.update(range(max(0, k - n + 1), min(k, length - n) + 1))
+
+        delta = 0
+        for start in starts:
+            old = new = 0
+            for j in range(start, start + n):
+                old = old * 26 + decoded[j]
+                new = new * 26 + (changes[j][1] if j in changes else decoded[j])
+            delta += table[new] - table[old]
+
+        return self.score + delta, changes
+
+    def accept(self, wiring, score, changes):
+        """
+        Moves to a new plugboard wiring scored by rescore.
+
+        Parameters
+        ----------
+        wiring : list
+            New plugboard wiring.
+        score : int
+            Score from rescore.
+        changes : dict
+            Changed keypresses from rescore.
+
+        Returns
+        -------
+        None
+
+        """
+
+        for k, (middle, letter) in changes.items():
+            self.by_middle[self.middle[k]].discard(k)
+            self.by_middle[middle].add(k)
+            self.middle[k] = middle
+            self.counts[self.decoded[k]] -= 1
+            self.counts[letter] += 1
+            self.decoded[k] = letter
+        self.wiring = list(wiring)
+        self.score = score
+
+    def toggled(self, a, b):
+        """
+        Returns the plugboard wiring with letters a and b disconnected if they
+        are a pair, otherwise connected after freeing them from their current
+        pairs. Returns None if that would use more than max_pairs pairs.
+
+        Parameters
+        ----------
+        a : int
+            Letter index.
+        b : int
+            Letter index.
+
+        Returns
+        -------
+        New plugboard wiring or None.
+
+        """
+
+        wiring = list(self.wiring)
+        if wiring[a] == b:
+            wiring[a], wiring[b] = a, b
+            return wiring
+
+        for letter in (a, b):
+            wiring[wiring[letter]] = wiring[letter]
+            wiring[letter] = letter
+        wiring[a], wiring[b] = b, a
+        if sum(1 for letter in range(26) if wiring[letter] > letter) > self.max_pairs:
+            return None
+
+        return wiring
+
+    def climb(self):
+        """
+        Applies the pair change that improves the score most, until no pair
+        change improves it.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        Final score.
+
+        """
+
+        while True:
+            best = None
+            for a in range(26):
+                for b in range(a + 1, 26):
+                    wiring = self.toggled(a, b)
+                    if wiring is None:
+                        continue
+                    score, changes = self.rescore(wiring)
+                    if score > self.score and (best is None or score > best[1]):
+                        best = (wiring, score, changes)
+            if best is None:
+                return self.score
+            self.accept(*best)
+
+    def pairs(self):
+        """
+        Returns the plugboard pairs of the current wiring.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        List of plugboard pairs.
+
+        """
+
+        return [chr(65 + letter) + chr(65 + self.wiring[letter]) for letter in range(26)
+                if self.wiring[letter] > letter]
+
+
+class BombeMenu:
+    """
+    A class to represent a bombe menu, the graph of letters linked by a crib
+    and its encoded letters. Each keypress links the crib letter and the
+    encoded letter through the scrambler for that keypress, after both go
+    through the plugboard, so a guess at the plugboard partner of one letter
+    fixes the partners of every letter linked to it. Closed loops in the
+    menu are what make wrong guesses contradict themselves.
+
+    ...
+
+    Attributes
+    ----------
+    crib : str
+        Crib
+    encoded : str
+        Encoded letters under the crib
+    edges : list
+        List of tuples of crib letter, encoded letter and crib index, as
+        letter indices
+    links : list
+        List of (letter, crib index) tuples linked to each letter
+    components : list
+        Lists of connected letters, largest first
+    test_letters : list
+        Most connected letter of each component
+    loops : list
+        Lists of crib indices forming independent closed loops
+
+    """
+
+    def __init__(self, crib, encoded):
+        """
+        Constructs attributes for the BombeMenu object.
+
+        Parameters
+        ----------
+        crib : str
+            Crib.
+        encoded : str
+            Encoded letters under the crib.
+
+        """
+
+        if len(crib) != len(encoded):
+            raise ValueError('Crib and encoded letters must have the same length')
+        for a, b in zip(crib, encoded):
+            if a == b:
+                raise ValueError('Crib cannot line up a letter with the same encoded letter')
+
+        self.crib = crib
+        self.encoded = encoded
+        self.edges = [(ord(a) - 65, ord(b) - 65, i) for i, (a, b) in enumerate(zip(crib, encoded))]
+        self.links = [[] for _ in range(26)]
+        for a, b, i in self.edges:
+            self.links[a].append((b, i))
+            self.links[b].append((a, i))
+
+        # Spanning tree of each component, every other edge closes a loop
+        parent = {}
+        depth = {}
+        self.components = []
+        for root in sorted(range(26), key=lambda letter: -len(self.links[letter])):
+            if root in depth or not self.links[root]:
+                continue
+            component = [root]
+            parent[root], depth[root] = None, 0
+            stack = [root]
+            while stack:
+                letter = stack.pop()
+                for other, i in self.links[letter]:
+                    if other not in depth:
+                        parent[other], depth[other] = (letter, i), depth[letter] + 1
+                        component.append(other)
+                        stack.append(other)
+            self.components.append(component)
+        self.components.sort(key=len, reverse=True)
+        self.test_letters = [max(component, key=lambda letter: len(self.links[letter]))
+                             for component in self.components]
+
+        tree = set(edge[1] for edge in parent.values() if edge is not None)
+        self.loops = []
+        for a, b, i in self.edges:
+            if i in tree:
+                continue
+            left, right = [i], []
+            while depth[a] > depth[b]:
+                a, step = parent[a]
+                left.append(step)
+            while depth[b] > depth[a]:
+                b, step = parent[b]
+                right.append(step)
+            while a != b:
+                a, step = parent[a]
+                left.append(step)
+                b, step = parent[b]
+                right.append(step)
+            self.loops.append(left + right[::-1])
+
+
+def solve_enigma(encoded_message, crib, plugboard=None, rot_in=None, pos_in=None,
+                 set_in=None, ref_in=None, return_first=True, max_iterations=100000,
+                 batch_size=None, workers=None, crib_offset=None, sliding=False,
+                 reduce_rings=False, checkpoint=None, checkpoint_every=100000, resume=False,
+                 progress=None, progress_every=10000, deadline=None, profile=False, stats=None,
+                 scoring='trigram', top=10):
+        """
+        Solves a 3 rotor Enigma Machine given a message, a crib and initial
+        Enigma settings (optional). Does not solve the plugboard, see
+        solve_plugboard.
+
+        Parameters
+        ----------
+        encoded_message : str
+            Encoded message to decode.
+        crib : str
+            Crib in message to aid in decoding. None ranks every decoding by
+            scoring instead, see rank_combinations.
+        plugboard : list (default=None)
+            List of known plugboard configuration.
+        rot_in : list (default=None)
+            List of known rotors. Each entry can also be a list of candidate
+            rotors or None for an unknown rotor, see Keyspace.
+        pos_in : list (default=None)
+            List of known positions, entries as for rot_in.
+        set_in : list (default=None)
+            List of known ring settings, entries as for rot_in. Ring settings
+            are only searched when something else is known, otherwise they
+            are kept at 1.
+        ref_in : str (default=None)
+            Known reflector, or list of candidate reflectors.
+        return_first : bool (default=True)
+            Option to stop solving when first solution found.
+        max_iterations : int (default=100000)
+            Maximum number of iterations to run solver loop. When there is no
+            crib or return_first is False, and no checkpoint, a larger
+            keyspace raises TimeoutError before anything is searched.
+        batch_size : int (default=None)
+            Number of combinations to decode at once with the NumPy batch
+            engine, see batch_encode. None decodes one combination at a time.
+        workers : int (default=None)
+            Number of worker processes to share the search across, see
+            parallel_search. None searches in the current process.
+        crib_offset : int (default=None)
+            Known position of the crib in the message. Only the crib window
+            is decoded for each combination, and the full message only for
+            matches. None tries every position allowed by crib_positions.
+        sliding : bool (default=False)
+            Option to test every starting position of each rotor order, ring
+            setting and reflector in one pass over its keystream table, see
+            sliding_search. Only available when positions are unknown.
+            Solutions are then returned ordered by rotors, ring settings,
+            reflector and positions.
+        reduce_rings : bool (default=False)
+            Option to search one representative of each class of starting
+            positions and ring settings that encode the message identically,
+            see setting_classes, when both are unknown. Each solution is
+            expanded into every equivalent setting, see equivalent_settings,
+            and max_iterations counts representatives.
+        checkpoint : str (default=None)
+            Path of a JSON file to save the search progress and matches to,
+            see chunked_search. None for no checkpoint.
+        checkpoint_every : int (default=100000)
+            Number of combinations to search between checkpoints.
+        resume : bool (default=False)
+            Option to continue from the checkpoint file if it exists. Raises
+            ValueError if it was saved for a different search.
+        progress : callable (default=None)
+            Function called with the SolverStats after every progress_every
+            combinations.
+        progress_every : int (default=10000)
+            Number of combinations to search between progress reports and
+            deadline checks.
+        deadline : float (default=None)
+            Wall-clock seconds after which to stop the search with a
+            TimeoutError, checked every progress_every combinations.
+        profile : bool (default=False)
+            Option to run the search under cProfile and keep the pstats.Stats
+            in the SolverStats. Worker processes are not profiled.
+        stats : SolverStats (default=None)
+            SolverStats to fill in with throughput and phase timings while
+            searching.
+        scoring : str or NgramScorer (default='trigram')
+            How to rank decodings when there is no crib: 'ioc' for the index
+            of coincidence, 'bigram' or 'trigram' for English n-gram
+            log-likelihoods, or an NgramScorer.
+        top : int (default=10)
+            Number of best decodings to return when there is no crib.
+
+        Returns
+        -------
+        List of tuples with decoded message(s) and initial Enigma set_in, or
+        with decoded message, initial Enigma settings and score, best first,
+        when there is no crib.
+
+        """
+
+        # Catch-all case where we don't know anything keeps ring settings at 1
+        if rot_in is None and pos_in is None and set_in is None and ref_in is None:
+            set_in = [1, 1, 1]
+        keyspace = Keyspace(rot_in, pos_in, set_in, ref_in)
+        positions_unknown = all(len(slot) == 26 for slot in keyspace.positions)
+        settings_unknown = all(len(slot) == 26 for slot in keyspace.ring_settings)
+
+        # Sliding keystream search over every starting position at once
+        if sliding is True:
+            if crib is None:
+                raise ValueError('Sliding search needs a crib')
+            if not positions_unknown:
+                raise ValueError('Sliding search is only available when positions are unknown')
+            if workers is not None or batch_size is not None:
+                raise ValueError('Sliding search cannot be combined with workers or batch_size')
+            if reduce_rings is True or checkpoint is not None or progress is not None \
+               or deadline is not None or profile is True or stats is not None:
+                raise ValueError('Sliding search cannot be combined with reduce_rings, checkpoints '
+                                 'or progress reporting')
+            ring_settings = keyspace.ring_settings
+            groups = (rotors + (set0, set1, set2, ref) for rotors in keyspace.rotors
+                      for set0 in ring_settings[0] for set1 in ring_settings[1]
+                      for set2 in ring_settings[2] for ref in keyspace.reflectors)
+            return sliding_search(encoded_message, crib, plugboard, groups, return_first,
+                                  crib_offset, max_iterations)
+
+        # Search one setting per class of equivalent positions and ring settings
+        reduce_rings = reduce_rings is True and positions_unknown and settings_unknown
+        if reduce_rings:
+            combinations = (rotors + positions + settings + (ref,) for rotors in keyspace.rotors
+                            for positions, settings in setting_classes(rotors, len(encoded_message))
+                            for ref in keyspace.reflectors)
+        else:
+            combinations = keyspace
+
+        # Without a first match to end the search early, a keyspace larger
+        # than max_iterations can only time out, so fail before searching
+        # unless a checkpoint keeps the work for a later run
+        if max_iterations > 0 and (crib is None or return_first is False) and checkpoint is None \
+           and not reduce_rings and len(keyspace) > max_iterations:
+            raise TimeoutError('Maximum iterations {} is less than the {} settings to search. Increase '
+                               'max_iterations to solve for more iterations'.format(max_iterations, len(keyspace)))
+
+        # Rank every decoding when there is no crib
+        if crib is None:
+            if workers is not None or batch_size is not None or crib_offset is not None or reduce_rings:
+                raise ValueError('Ranking without a crib cannot be combined with workers, batch_size, '
+                                 'crib_offset or reduce_rings')
+            if checkpoint is not None or progress is not None or deadline is not None \
+               or profile is True or stats is not None:
+                raise ValueError('Ranking without a crib cannot be combined with checkpoints '
+                                 'or progress reporting')
+            scorer = select_scorer(scoring)
+            scorer = coincidence_score if scorer is None else scorer.score
+            return rank_combinations(encoded_message, plugboard, combinations, scorer, top)
+
+        # Solve the message in chunks if saving or reporting progress
+        if profile is True and stats is None:
+            stats = SolverStats()
+        if checkpoint is not None or progress is not None or deadline is not None or stats is not None:
+            parameters = json.loads(json.dumps({
+                'encoded_message': encoded_message, 'crib': crib, 'plugboard': plugboard,
+                'rot_in': rot_in, 'pos_in': pos_in, 'set_in': set_in, 'ref_in': ref_in,
+                'return_first': return_first, 'crib_offset': crib_offset, 'reduce_rings': reduce_rings}))
+            if stats is None:
+                stats = SolverStats()
+            if reduce_rings:
+                stats.total = len(keyspace.reflectors) * sum(
+                    26 ** 3 * sum(len(middle_groups) for _, middle_groups in
+                                  rotor_groups(rotors, len(encoded_message)))
+                    for rotors in keyspace.rotors)
+            else:
+                stats.total = len(keyspace)
+            if max_iterations > 0:
+                stats.total = min(stats.total, max_iterations)
+            chunk_size = progress_every if checkpoint is None else min(progress_every, checkpoint_every)
+            if profile is True:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                decoded_messages = chunked_search(encoded_message, crib, plugboard, combinations,
+                                                  chunk_size, return_first, max_iterations, batch_size,
+                                                  workers, crib_offset, checkpoint, parameters, resume,
+                                                  stats, progress, deadline)
+            finally:
+                if profile is True:
+                    profiler.disable()
+                    stats.profile = pstats.Stats(profiler)
+        else:
+            combinations = iter(combinations)
+            limited = islice(combinations, max_iterations) if max_iterations > 0 else combinations
+            if workers is None:
+                decoded_messages = search_combinations(encoded_message, crib, plugboard, limited,
+                                                       return_first, batch_size, crib_offset)
+            else:
+                decoded_messages = parallel_search(encoded_message, crib, plugboard, limited,
+                                                   return_first, batch_size, workers, crib_offset)
+
+            if (return_first is False or not decoded_messages) and max_iterations > 0 \
+               and next(combinations, None) is not None:
+                raise TimeoutError(('Maximum iterations reached: {}. Increase max_iterations to '
+                                    'solve for more iterations').format(max_iterations))
+
+        if reduce_rings:
+            expanded = []
+            for decoded, config in decoded_messages:
+                names = [rotor[0] for rotor in config['rotors']]
+                for positions, settings in equivalent_settings(names, [rotor[1] for rotor in config['rotors']],
+                                                               [rotor[2] for rotor in config['rotors']],
+                                                               len(encoded_message)):
+                    expanded.append((decoded, dict(config, rotors=list(zip(names, positions, settings)))))
+            decoded_messages = expanded
+
+        return decoded_messages
+
+
+def chunked_search(encoded_message, crib, plugboard, combinations, chunk_size=10000, return_first=True,
+                   max_iterations=-1, batch_size=None, workers=None, crib_offset=None, checkpoint=None,
+                   parameters=None, resume=False, stats=None, progress=None, deadline=None):
+    """
+    Searches combinations in chunks. After each chunk the number of
+    combinations searched and the matches so far are saved to the checkpoint
+    file, progress is reported and the deadline is checked. A resumed search
+    skips straight to where the checkpoint stopped, and max_iterations counts
+    from the start of the first run.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    crib : str
+        Crib in message to aid in decoding.
+    plugboard : list
+        List of known plugboard configuration, or None.
+    combinations : Keyspace or iterable
+        Combinations of Enigma settings, see search_combinations.
+    chunk_size : int (default=10000)
+        Number of combinations to search between checkpoints.
+    return_first : bool (default=True)
+        Option to stop searching when first solution found.
+    max_iterations : int (default=-1)
+        Maximum number of combinations to search, -1 for no limit.
+    batch_size : int (default=None)
+        Number of combinations to decode at once with the NumPy batch
+        engine, see batch_encode. None decodes one combination at a time.
+    workers : int (default=None)
+        Number of worker processes, see parallel_search. None searches in
+        the current process.
+    crib_offset : int (default=None)
+        Known position of the crib in the message, see search_combinations.
+    checkpoint : str (default=None)
+        Path of checkpoint file, None for no checkpoint.
+    parameters : dict (default=None)
+        Parameters identifying the search, compared with the checkpoint when
+        resuming.
+    resume : bool (default=False)
+        Option to continue from the checkpoint file if it exists.
+    stats : SolverStats (default=None)
+        SolverStats to fill in while searching.
+    progress : callable (default=None)
+        Function called with the SolverStats after each chunk.
+    deadline : float (default=None)
+        Wall-clock seconds after which to stop with a TimeoutError.
+
+    Returns
+    -------
+    List of tuples with decoded message(s) and initial Enigma settings.
+
+    """
+
+    stats = stats if stats is not None else SolverStats()
+    stats.started = time.perf_counter()
+    cursor, decoded_messages = 0, []
+    if resume is True and checkpoint is not None and os.path.exists(checkpoint):
+        state = load_checkpoint(checkpoint)
+        if state['parameters'] != parameters:
+            raise ValueError('Checkpoint {} was saved for a different search'.format(checkpoint))
+        if state['complete']:
+            return state['matches']
+        cursor, decoded_messages = state['cursor'], state['matches']
+    stats.skipped = stats.searched = cursor
+    stats.matches = len(decoded_messages)
+
+    if isinstance(combinations, Keyspace):
+        remaining = combinations.iterate(cursor)
+    else:
+        remaining = islice(iter(combinations), cursor, None)
+
+    def report(complete):
+        stats.searched, stats.matches = cursor, len(decoded_messages)
+        stats.elapsed = time.perf_counter() - stats.started
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, parameters, cursor, decoded_messages, complete)
+        if progress is not None:
+            progress(stats)
+
+    # One process pool serves every chunk
+    pool = search_pool(workers) if workers is not None else None
+    try:
+        while True:
+            size = chunk_size if max_iterations <= 0 else max(0, min(chunk_size, max_iterations - cursor))
+            chunk = list(islice(remaining, size))
+            if chunk:
+                if workers is None:
+                    found = search_combinations(encoded_message, crib, plugboard, chunk, return_first,
+                                                batch_size, crib_offset, stats)
+                else:
+                    found = parallel_search(encoded_message, crib, plugboard, chunk, return_first,
+                                            batch_size, workers, crib_offset, stats, pool)
+                cursor += len(chunk)
+                decoded_messages.extend(found)
+
+            if (return_first is True and decoded_messages) or len(chunk) < size:
+                report(True)
+                return decoded_messages
+
+            if max_iterations > 0 and cursor >= max_iterations:
+                complete = next(remaining, None) is None
+                report(complete)
+                if not complete:
+                    raise TimeoutError(('Maximum iterations reached: {}. Increase max_iterations to '
+                                        'solve for more iterations').format(max_iterations))
+                return decoded_messages
+
+            report(False)
+            if deadline is not None and stats.elapsed >= deadline:
+                raise TimeoutError(('Deadline reached: {} seconds. Increase deadline to '
+                                    'solve for longer').format(deadline))
+    finally:
+        if pool is not None:
+            pool[0].shutdown(cancel_futures=True)
+
+
+def save_checkpoint(path, parameters, cursor, matches, complete):
+    """
+    Saves search progress to a JSON checkpoint file. The file is written
+    next to the old one and renamed over it, so an interrupted save leaves
+    the previous checkpoint intact.
+
+    Parameters
+    ----------
+    path : str
+        Path of checkpoint file.
+    parameters : dict
+        Parameters identifying the search.
+    cursor : int
+        Number of combinations searched.
+    matches : list
+        List of tuples with decoded message(s) and initial Enigma settings.
+    complete : bool
+        Whether the search has finished.
+
+    Returns
+    -------
+    None
+
+    """
+
+    state = {'parameters': parameters, 'cursor': cursor, 'complete': complete,
+             'matches': [[decoded, config] for decoded, config in matches]}
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """
+    Loads search progress from a JSON checkpoint file.
+
+    Parameters
+    ----------
+    path : str
+        Path of checkpoint file.
+
+    Returns
+    -------
+    Dictionary with parameters, cursor, complete and matches, as passed to
+    save_checkpoint.
+
+    """
+
+    with open(path) as f:
+        state = json.load(f)
+
+    matches = []
+    for decoded, config in state['matches']:
+        config['rotors'] = [tuple(rotor) for rotor in config['rotors']]
+        matches.append((decoded, config))
+    state['matches'] = matches
+
+    return state
+
+
+def search_combinations(encoded_message, crib, plugboard, combinations, return_first=True,
+                        batch_size=None, crib_offset=None, stats=None):
+    """
+    Decodes a message with each combination of Enigma settings and keeps the
+    ones whose decoding contains the crib. Nothing is decoded if the crib
+    cannot start anywhere in the message.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    crib : str
+        Crib in message to aid in decoding.
+    plugboard : list
+        List of known plugboard configuration, or None.
+    combinations : iterable
+        Tuples of (rotor, rotor, rotor, position, position, position,
+        ring setting, ring setting, ring setting, reflector), leftmost rotor
+        first.
+    return_first : bool (default=True)
+        Option to stop searching when first solution found.
+    batch_size : int (default=None)
+        Number of combinations to decode at once with the NumPy batch engine,
+        None decodes one combination at a time.
+    crib_offset : int (default=None)
+        Known position of the crib in the message, None to try every
+        position allowed by crib_positions.
+    stats : SolverStats (default=None)
+        SolverStats to add the time spent setting up machines, decoding and
+        matching the crib to.
+
+    Returns
+    -------
+    List of tuples with decoded message(s) and initial Enigma settings.
+
+    """
+
+    timed = stats is not None
+    decoded_messages = []
+    my_enigma = Enigma()
+    if plugboard is not None:
+        my_enigma.add_plugboard(plugboard)
+
+    # Only decode the letters needed to check the crib at each possible start
+    if crib_offset is None:
+        starts = crib_positions(encoded_message, crib)
+    elif 0 <= crib_offset <= len(encoded_message) - len(crib):
+        starts = [crib_offset]
+    else:
+        starts = []
+    if not starts:
+        return decoded_messages
+
+    # Decode batches of combinations at once with NumPy
+    if batch_size is not None:
+        if np is None:
+            raise ImportError('solve_enigma with batch_size requires numpy')
+        combinations = iter(combinations)
+        plug = my_enigma.plugboard.wiring if plugboard is not None else list(range(26))
+        while True:
+            chunk = list(islice(combinations, batch_size))
+            if not chunk:
+                break
+            if timed:
+                started = time.perf_counter()
+            machines = BatchMachines([[ROTOR_NAMES.index(name) for name in comb[0:3]] for comb in chunk],
+                                     [[ord(pos) - 65 for pos in comb[3:6]] for comb in chunk],
+                                     [comb[6:9] for comb in chunk],
+                                     [REFLECTOR_NAMES.index(comb[9]) for comb in chunk],
+                                     plug)
+            if timed:
+                setup = time.perf_counter()
+                stats.setup_time += setup - started
+            found = machines.find_crib(encoded_message, crib, starts)
+            if timed:
+                decrypt = time.perf_counter()
+                stats.decrypt_time += decrypt - setup
+            for k in np.flatnonzero(found >= 0):
+                comb = chunk[k]
+                my_enigma.set_rotors([comb[0], comb[1], comb[2]], [comb[3], comb[4], comb[5]],
+                                     [comb[6], comb[7], comb[8]])
+                my_enigma.set_reflector(comb[9])
+                decoded_messages.append((my_enigma.encode_message(encoded_message), my_enigma.show_config()))
+                if return_first is True:
+                    break
+            if timed:
+                stats.match_time += time.perf_counter() - decrypt
+            if return_first is True and decoded_messages:
+                break
+        return decoded_messages
+
+    # Decoding every letter in a single pass is quicker than scanning the
+    # possible crib starts one at a time with find_crib, even when under half
+    # of the starts are possible, so only use find_crib when the crib position
+    # is known. The crib can only be found at a possible start, as no letter
+    # encodes to itself
+    indices = [ord(char) - 65 for char in encoded_message]
+    crib_indices = [ord(char) - 65 for char in crib]
+    for comb in combinations:
+        if timed:
+            started = time.perf_counter()
+        my_enigma.set_rotors([comb[0], comb[1], comb[2]], [comb[3], comb[4], comb[5]],
+                             [comb[6], comb[7], comb[8]])
+        my_enigma.set_reflector(comb[9])
+        if timed:
+            setup = time.perf_counter()
+            stats.setup_time += setup - started
+        if crib_offset is not None:
+            found = my_enigma.find_crib(indices, crib_indices, starts) >= 0
+            if timed:
+                decrypt = time.perf_counter()
+                stats.decrypt_time += decrypt - setup
+            if not found:
+                continue
+            decoded_message = my_enigma.encode_message(encoded_message)
+        else:
+            decoded_message = my_enigma.encode_message(encoded_message)
+            if timed:
+                decrypt = time.perf_counter()
+                stats.decrypt_time += decrypt - setup
+            found = decoded_message.find(crib) >= 0
+            if timed:
+                stats.match_time += time.perf_counter() - decrypt
+            if not found:
+                continue
+        decoded_messages.append((decoded_message, my_enigma.show_config()))
+        if return_first is True:
+            return decoded_messages
+
+    return decoded_messages
+
+
+def rank_combinations(encoded_message, plugboard, combinations, scorer, top=10):
+    """
+    Decodes a message with each combination of Enigma settings and keeps the
+    top scoring decodings in a heap, so memory stays the same however many
+    combinations are searched. Decodings are scored as letter indices and
+    only the ones kept are turned back into text.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    plugboard : list
+        List of known plugboard configuration, or None.
+    combinations : iterable
+        Combinations of Enigma settings, see search_combinations.
+    scorer : callable
+        Function returning an integer score for a list of letter indices,
+        such as NgramScorer.score or coincidence_score.
+    top : int (default=10)
+        Number of decodings to keep, at least 1.
+
+    Returns
+    -------
+    List of tuples with decoded message, initial Enigma settings and score,
+    best first.
+
+    """
+
+    if top < 1:
+        raise ValueError('top must be at least 1, got {}'.format(top))
+
+    my_enigma = Enigma()
+    if plugboard is not None:
+        my_enigma.add_plugboard(plugboard)
+    my_enigma.validate_message(encoded_message)
+    indices = [ord(char) - 65 for char in encoded_message]
+
+    # Ties keep the earliest combination, which has the largest negated index
+    heap = []
+    for number, comb in enumerate(combinations):
+        my_enigma.set_rotors([comb[0], comb[1], comb[2]], [comb[3], comb[4], comb[5]],
+                             [comb[6], comb[7], comb[8]])
+        my_enigma.set_reflector(comb[9])
+        entry = (scorer(my_enigma.encode_indices(indices)), -number, comb)
+        if len(heap) < top:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    ranked = []
+    for score, _, comb in sorted(heap, reverse=True):
+        my_enigma.set_rotors([comb[0], comb[1], comb[2]], [comb[3], comb[4], comb[5]],
+                             [comb[6], comb[7], comb[8]])
+        my_enigma.set_reflector(comb[9])
+        ranked.append((my_enigma.encode_message(encoded_message), my_enigma.show_config(), score))
+
+    return ranked
+
+
+def solve_plugboard(encoded_message, candidates, scoring=('ioc', 'trigram'), max_pairs=10, plugboard=None):
+    """
+    Recovers the plugboard for each candidate rotor and reflector setting by
+    hill-climbing over plugboard pairs, see PlugboardClimber. Candidates are
+    usually the best decodings from solve_enigma without a crib, ranked by
+    the index of coincidence, which the plugboard affects least.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    candidates : list
+        Enigma configurations as from show_config, or tuples from
+        solve_enigma with the configuration second.
+    scoring : str, NgramScorer or list (default=('ioc', 'trigram'))
+        'ioc', 'bigram', 'trigram' or an NgramScorer, see select_scorer, or
+        a list of them to climb with in turn, each starting from the pairs
+        found by the one before. The index of coincidence finds most pairs
+        from a poor start and n-grams finish them off.
+    max_pairs : int (default=10)
+        Maximum number of plugboard pairs.
+    plugboard : list (default=None)
+        List of plugboard pairs to start from.
+
+    Returns
+    -------
+    List of tuples with decoded message, Enigma settings and score from the
+    last stage, best first.
+
+    """
+
+    my_enigma = Enigma()
+    my_enigma.validate_message(encoded_message)
+    stages = [scoring] if isinstance(scoring, (str, NgramScorer)) else list(scoring)
+
+    results = []
+    for candidate in candidates:
+        config = candidate if isinstance(candidate, dict) else candidate[1]
+        rotors, positions, ring_settings = [list(values) for values in zip(*config['rotors'])]
+        pairs = plugboard
+        for stage in stages:
+            climber = PlugboardClimber(encoded_message, rotors, positions, ring_settings,
+                                       config['reflector'], stage, max_pairs, pairs)
+            score = climber.climb()
+            pairs = climber.pairs()
+
+        my_enigma.set_plugboard(pairs or None)
+        my_enigma.set_rotors(rotors, positions, ring_settings)
+        my_enigma.set_reflector(config['reflector'])
+        results.append((my_enigma.encode_message(encoded_message), my_enigma.show_config(), score))
+
+    return sorted(results, key=lambda result: -result[2])
+
+
+def bombe_search(encoded_message, crib, crib_offset=None, rot_in=None, set_in=None, ref_in=None,
+                 max_stops=None, max_pairs=10):
+    """
+    Finds rotor settings that fit a crib with an unknown plugboard, like a
+    Turing bombe. For each rotor order, ring setting, reflector and starting
+    position the partner of the menu's test letter is guessed, and the
+    guess is followed around the menu through the scrambler of each keypress
+    until two partners are found for one letter, which rules it out. A
+    position where some guess survives is a stop, and the partners found
+    are part of the plugboard.
+
+    Other menu components are then checked against each stop. A component
+    with no surviving guess rules the stop out, and one with exactly one
+    adds its partners. Several surviving guesses for the test letter give
+    several stops. A guess whose partners need more than max_pairs plugboard
+    pairs is ruled out too, so every stop's plugboard can be set on a
+    machine.
+
+    Ring settings only change when the middle and left rotors turn over, so
+    with ring settings kept at 1 the stops still give the plugboard and an
+    equivalent setting for cribs that see no turnover.
+
+    Crib offsets are tried in order of the number of closed loops in their
+    menu, most first, since menus with more loops rule out more settings
+    and give fewer false stops.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message.
+    crib : str
+        Crib in message.
+    crib_offset : int (default=None)
+        Known position of the crib in the message, None to try every
+        position allowed by crib_positions.
+    rot_in : list (default=None)
+        Rotors, entries as for solve_enigma, None for any rotors.
+    set_in : list (default=None)
+        Ring settings, entries as for solve_enigma, None to keep them at 1.
+    ref_in : str or list (default=None)
+        Reflector or list of candidate reflectors, None for any reflector.
+    max_stops : int (default=None)
+        Stop searching after this many stops, None for no limit.
+    max_pairs : int (default=10)
+        Largest number of plugboard pairs, at most 10.
+
+    Returns
+    -------
+    List of tuples with Enigma settings, including the partial plugboard,
+    and crib offset.
+
+    """
+
+    if max_pairs > 10:
+        raise ValueError('Plugboard can only have up to 10 pairs')
+    Enigma().validate_message(encoded_message)
+    if crib_offset is None:
+        offsets = crib_positions(encoded_message, crib)
+    elif 0 <= crib_offset <= len(encoded_message) - len(crib):
+        offsets = [crib_offset]
+    else:
+        offsets = []
+    keyspace = Keyspace(rot_in, None, set_in if set_in is not None else [1, 1, 1], ref_in)
+    settings = keyspace.ring_settings
+    menus = [(BombeMenu(crib, encoded_message[offset:offset + len(crib)]), offset) for offset in offsets]
+    menus.sort(key=lambda item: -len(item[0].loops))
+
+    stops = []
+    for menu, offset in menus:
+        for rotors in keyspace.rotors:
+            notches = tuple(ord(ROTOR_WIRINGS[name][1]) - 65 if ROTOR_WIRINGS[name][1] else -1
+                            for name in (rotors[2], rotors[1]))
+            for ring_settings in ((set0, set1, set2) for set0 in settings[0] for set1 in settings[1]
+                                  for set2 in settings[2]):
+                for reflector in keyspace.reflectors:
+                    table = compile_keystream(rotors, ring_settings, reflector)
+                    permutations, successor = table.permutations, table.successor
+                    for start in range(26 ** 3):
+                        # Jump to the crib offset in constant time
+                        state = start
+                        if offset:
+                            state = table.state_of(step_offsets(table.offsets_of(start), notches, offset))
+                        bases = []
+                        for _ in crib:
+                            state = successor[state]
+                            bases.append(26 * state)
+
+                        for plug in bombe_test(menu, permutations, bases, max_pairs):
+                            o0, o1, o2 = table.offsets_of(start)
+                            positions = [chr(65 + o2), chr(65 + o1), chr(65 + o0)]
+                            config = {'plugboard': [chr(65 + a) + chr(65 + plug[a]) for a in range(26)
+                                                    if plug[a] > a],
+                                      'rotors': list(zip(rotors, positions, ring_settings)),
+                                      'reflector': reflector}
+                            stops.append((config, offset))
+                            if max_stops is not None and len(stops) >= max_stops:
+                                return stops
+
+    return stops
+
+
+def bombe_test(menu, permutations, bases, max_pairs=10):
+    """
+    Tests one rotor setting against a bombe menu, trying every partner for
+    the test letter of the main component. Partners needing more than
+    max_pairs plugboard pairs are ruled out.
+
+    Parameters
+    ----------
+    menu : BombeMenu
+        Bombe menu.
+    permutations : bytes
+        Scrambler permutations, see KeystreamTable.
+    bases : list
+        Offset into permutations of the scrambler for each crib index.
+    max_pairs : int (default=10)
+        Largest number of plugboard pairs.
+
+    Returns
+    -------
+    List of surviving plugboard partner lists, -1 where unknown.
+
+    """
+
+    links = menu.links
+
+    def fits(plug):
+        return sum(1 for a in range(26) if plug[a] > a) <= max_pairs
+
+    def propagate(plug, letter, partner):
+        # Partners are swapped both ways, so a letter's partner is also
+        # linked through the menu from the partner's side
+        stack = [(letter, partner)]
+        while stack:
+            a, y = stack.pop()
+            if plug[a] >= 0 or plug[y] >= 0:
+                if plug[a] != y or plug[y] != a:
+                    return False
+                continue
+            plug[a], plug[y] = y, a
+            for b, i in links[a]:
+                stack.append((b, permutations[bases[i] + y]))
+            if y != a:
+                for b, i in links[y]:
+                    stack.append((b, permutations[bases[i] + a]))
+        return True
+
+    stops = []
+    for partner in range(26):
+        plug = [-1] * 26
+        if not propagate(plug, menu.test_letters[0], partner) or not fits(plug):
+            continue
+        for test_letter in menu.test_letters[1:]:
+            if plug[test_letter] >= 0:
+                continue
+            survivors = []
+            for other in range(26):
+                trial = list(plug)
+                if propagate(trial, test_letter, other) and fits(trial):
+                    survivors.append(trial)
+                    if len(survivors) > 1:
+                        break
+            if not survivors:
+                plug = None
+                break
+            if len(survivors) == 1:
+                plug = survivors[0]
+        if plug is not None:
+            stops.append(plug)
+
+    return stops
+
+
+def anneal_enigma(encoded_message, plugboard=None, rot_in=None, pos_in=None, set_in=None, ref_in=None,
+                  scoring='trigram', iterations=20000, restarts=5, temperature=200.0, cooling=0.9995,
+                  seed=None, callback=None):
+    """
+    Searches rotors, positions, ring settings and reflector by simulated
+    annealing on the score of the decoding, for keyspaces too large to
+    search in full. Each step changes one setting at random, or turns a
+    rotor's position and ring setting together so its wiring stays put and
+    only its turnover moves, and keeps the change if it scores better or,
+    with a chance that shrinks as the temperature cools, worse.
+
+    A decoding only starts to score well once most of the settings are
+    right, so this is a probabilistic search: more restarts and iterations,
+    or a narrower keyspace, make it likelier to find the key.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    plugboard : list (default=None)
+        List of known plugboard configuration.
+    rot_in : list (default=None)
+        Rotors, entries as for solve_enigma, None for any rotors.
+    pos_in : list (default=None)
+        Positions, entries as for solve_enigma, None for any positions.
+    set_in : list (default=None)
+        Ring settings, entries as for solve_enigma, None for any ring
+        settings.
+    ref_in : str or list (default=None)
+        Reflector or list of candidate reflectors, None for any reflector.
+    scoring : str or NgramScorer (default='trigram')
+        'ioc', 'bigram', 'trigram' or an NgramScorer, see select_scorer.
+    iterations : int (default=20000)
+        Number of steps in each restart.
+    restarts : int (default=5)
+        Number of runs from random starting settings.
+    temperature : float (default=200.0)
+        Starting temperature, in score units.
+    cooling : float or callable (default=0.9995)
+        Factor to multiply the temperature by after each step, or a function
+        of the step number and number of iterations returning the
+        temperature.
+    seed : int (default=None)
+        Seed for the random number generator, so runs can be repeated.
+    callback : callable (default=None)
+        Function called with the best decoding so far, the restart number
+        and the step number whenever the best decoding improves.
+
+    Returns
+    -------
+    List of tuples with decoded message, initial Enigma settings and score
+    of the best decoding of each restart, best first.
+
+    """
+
+    rng = random.Random(seed)
+    keyspace = Keyspace(rot_in, pos_in, set_in, ref_in)
+    if len(keyspace) == 0:
+        return []
+    scorer = select_scorer(scoring)
+    scorer = coincidence_score if scorer is None else scorer.score
+
+    my_enigma = Enigma()
+    if plugboard is not None:
+        my_enigma.add_plugboard(plugboard)
+    my_enigma.validate_message(encoded_message)
+    indices = [ord(char) - 65 for char in encoded_message]
+
+    slots = keyspace.slots
+    movable = [k for k, slot in enumerate(slots) if len(slot) > 1]
+    # Rotors whose position and ring setting can both be turned
+    coupled = [k for k in range(3) if len(slots[1 + k]) == 26 and len(slots[4 + k]) == 26]
+
+    def score_of(digits):
+        comb = keyspace.combination(digits)
+        my_enigma.set_rotors(list(comb[0:3]), list(comb[3:6]), list(comb[6:9]))
+        my_enigma.set_reflector(comb[9])
+        return scorer(my_enigma.encode_indices(indices))
+
+    def result_of(digits, score):
+        comb = keyspace.combination(digits)
+        my_enigma.set_rotors(list(comb[0:3]), list(comb[3:6]), list(comb[6:9]))
+        my_enigma.set_reflector(comb[9])
+        return my_enigma.encode_message(encoded_message), my_enigma.show_config(), score
+
+    best_overall = None
+    results = []
+    for restart in range(restarts):
+        digits = keyspace.digits(rng.randrange(len(keyspace)))
+        score = score_of(digits)
+        best_digits, best_score = list(digits), score
+        heat = temperature
+        for step in range(iterations):
+            if not movable:
+                break
+            trial = list(digits)
+            if coupled and rng.random() < 0.2:
+                k = rng.choice(coupled)
+                turn = rng.randrange(1, 26)
+                trial[1 + k] = (trial[1 + k] + turn) % 26
+                trial[4 + k] = (trial[4 + k] + turn) % 26
+            else:
+                k = rng.choice(movable)
+                trial[k] = (trial[k] + rng.randrange(1, len(slots[k]))) % len(slots[k])
+
+            trial_score = score_of(trial)
+            delta = trial_score - score
+            if delta >= 0 or (heat > 0 and rng.random() < exp(delta / heat)):
+                digits, score = trial, trial_score
+                if score > best_score:
+                    best_digits, best_score = list(digits), score
+                    if callback is not None and (best_overall is None or score > best_overall[2]):
+                        best_overall = result_of(best_digits, best_score)
+                        callback(best_overall, restart, step)
+
+            heat = cooling(step + 1, iterations) if callable(cooling) else heat * cooling
+
+        result = result_of(best_digits, best_score)
+        if best_overall is None or result[2] > best_overall[2]:
+            best_overall = result
+            if callback is not None:
+                callback(best_overall, restart, iterations)
+        results.append(result)
+
+    return sorted(results, key=lambda result: -result[2])
+
+
+def sliding_search(encoded_message, crib, plugboard, groups, return_first=True, crib_offset=None,
+                   max_iterations=-1):
+    """
+    Tests every starting position of each rotor order, ring setting and
+    reflector using its keystream table. Starting positions on the same
+    stepping cycle see the same sequence of permutations shifted by one
+    keypress, so each cycle is laid out once and the crib is checked against
+    every starting position with bytes.find over one column per letter.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    crib : str
+        Crib in message to aid in decoding.
+    plugboard : list
+        List of known plugboard configuration, or None.
+    groups : iterable
+        Tuples of (rotor, rotor, rotor, ring setting, ring setting,
+        ring setting, reflector), leftmost rotor first.
+    return_first : bool (default=True)
+        Option to stop searching when first solution found.
+    crib_offset : int (default=None)
+        Known position of the crib in the message, None to try every
+        position allowed by crib_positions.
+    max_iterations : int (default=-1)
+        Maximum number of starting positions to test across all groups, -1
+        for no limit.
+
+    Returns
+    -------
+    List of tuples with decoded message(s) and initial Enigma settings.
+
+    """
+
+    my_enigma = Enigma()
+    if plugboard is not None:
+        my_enigma.add_plugboard(plugboard)
+    my_enigma.validate_message(encoded_message)
+    plug = my_enigma.plugboard.wiring if plugboard is not None else list(range(26))
+
+    if crib_offset is None:
+        starts = crib_positions(encoded_message, crib)
+    elif 0 <= crib_offset <= len(encoded_message) - len(crib):
+        starts = [crib_offset]
+    else:
+        starts = []
+
+    # Plugboard is applied to the encoded message and crib instead of the
+    # keystream: out = plug[perm[plug[letter]]] is crib iff
+    # perm[plug[letter]] is plug[crib]
+    letters = [plug[ord(char) - 65] for char in encoded_message]
+    target = [plug[ord(char) - 65] for char in crib]
+    length = starts[-1] + len(crib) if starts else 0
+
+    decoded_messages = []
+    iterations = 0
+    for group in groups:
+        n_candidates = 26 ** 3
+        if max_iterations > 0:
+            if iterations >= max_iterations:
+                raise TimeoutError(('Maximum iterations reached: {}. Increase max_iterations to '
+                                    'solve for more iterations').format(max_iterations))
+            n_candidates = min(n_candidates, max_iterations - iterations)
+        iterations += n_candidates
+
+        table = compile_keystream(group[0:3], group[3:6], group[6])
+        matches = set()
+        for sequence, n_starts in table.trajectories(length):
+            if not starts:
+                break
+            if not target:
+                matches.update(sequence[:n_starts])
+                continue
+            # rows[26 * q + letter] is the permutation of sequence[q], and the
+            # letter at message position k from starting state sequence[i]
+            # goes through sequence[i + k + 1]
+            rows = b''.join([table.permutations[26 * state:26 * state + 26] for state in sequence])
+            columns = [rows[letter::26] for letter in range(26)]
+            for start in starts:
+                column, first = columns[letters[start]], target[0]
+                q = column.find(first, start + 1, start + 1 + n_starts)
+                while q >= 0:
+                    for j in range(1, len(target)):
+                        if columns[letters[start + j]][q + j] != target[j]:
+                            break
+                    else:
+                        matches.add(sequence[q - start - 1])
+                    q = column.find(first, q + 1, start + 1 + n_starts)
+
+        for state in sorted(matches):
+            if state >= n_candidates:
+                break
+            o0, o1, o2 = table.offsets_of(state)
+            my_enigma.set_rotors(group[0:3], [chr(65 + o2), chr(65 + o1), chr(65 + o0)], group[3:6])
+            my_enigma.set_reflector(group[6])
+            decoded_messages.append((my_enigma.encode_message(encoded_message), my_enigma.show_config()))
+            if return_first is True:
+                return decoded_messages
+
+        if n_candidates < 26 ** 3:
+            raise TimeoutError(('Maximum iterations reached: {}. Increase max_iterations to '
+                                'solve for more iterations').format(max_iterations))
+
+    return decoded_messages
+
+
+def notch_groups(limit):
+    """
+    Groups the distances of a rotor from its notch, 0 to 25, into those that
+    can be told apart within a message. Distances below limit each get a
+    group of their own and the rest share one group.
+
+    Parameters
+    ----------
+    limit : int
+        Smallest distance that cannot be told apart from larger ones.
+
+    Returns
+    -------
+    List of lists of distances.
+
+    """
+
+    limit = min(limit, 26)
+    groups = [[distance] for distance in range(limit)]
+    if limit < 26:
+        groups.append(list(range(limit, 26)))
+
+    return groups
+
+
+def rotor_groups(rotor_names, length):
+    """
+    Returns the notch distance groups of the right rotor and, for each of
+    them, the notch distance groups of the middle rotor for a message of
+    the given length.
+
+    Within a message the right rotor only matters through its wiring offset
+    (position less ring setting) and the keypresses at which it carries,
+    which repeat every 26 keypresses from its distance to the notch. The
+    middle rotor matters through its wiring offset and how many carries it
+    takes to reach its notch, and the left rotor only through its wiring
+    offset, as it never carries.
+
+    Parameters
+    ----------
+    rotor_names : list
+        List of rotor names, leftmost rotor first.
+    length : int
+        Length of message.
+
+    Returns
+    -------
+    List of tuples of right rotor distances and list of middle rotor
+    distance groups.
+
+    """
+
+    notches = [ROTOR_WIRINGS[name][1] for name in rotor_names]
+    groups = []
+    for right in notch_groups(length if notches[2] else 0):
+        carries = (length - right[0] - 1) // 26 + 1 if right[0] < length and notches[2] else 0
+        groups.append((right, notch_groups(carries + 1 if notches[1] else 0)))
+
+    return groups
+
+
+def setting_classes(rotor_names, length):
+    """
+    Yields one representative starting position and ring setting for each
+    class of settings that encode a message of the given length identically,
+    see rotor_groups. Representatives use ring setting 1 where the class
+    allows it.
+
+    Parameters
+    ----------
+    rotor_names : list
+        List of rotor names, leftmost rotor first.
+    length : int
+        Length of message.
+
+    Returns
+    -------
+    Generator of tuples of positions and ring settings, leftmost rotor first.
+
+    """
+
+    for name in rotor_names:
+        if name not in ROTOR_WIRINGS:
+            raise ValueError('Invalid rotor name. Valid rotor names are Beta, Gamma, I II, III, IV, V')
+    notches = [ord(ROTOR_WIRINGS[name][1]) - 65 if ROTOR_WIRINGS[name][1] else -1
+               for name in rotor_names]
+
+    def representative(notch, group, wiring_offset):
+        distance = (notch - wiring_offset) % 26
+        position = (notch - (distance if distance in group else group[0])) % 26
+        return chr(65 + position), (position - wiring_offset) % 26 + 1
+
+    left = list(range(26))
+    for right, middle_groups in rotor_groups(rotor_names, length):
+        for middle in middle_groups:
+            for e2 in range(26):
+                pos2, set2 = representative(notches[0], left, e2)
+                for e1 in range(26):
+                    pos1, set1 = representative(notches[1], middle, e1)
+                    for e0 in range(26):
+                        pos0, set0 = representative(notches[2], right, e0)
+                        yield (pos2, pos1, pos0), (set2, set1, set0)
+
+
+def equivalent_settings(rotor_names, positions, ring_settings, length):
+    """
+    Returns every starting position and ring setting that encodes a message
+    of the given length identically to the one given, including itself.
+
+    Parameters
+    ----------
+    rotor_names : list
+        List of rotor names, leftmost rotor first.
+    positions : list
+        List of rotor starting positions, leftmost rotor first.
+    ring_settings : list
+        List of rotor ring settings, leftmost rotor first.
+    length : int
+        Length of message.
+
+    Returns
+    -------
+    List of tuples of positions and ring settings, leftmost rotor first.
+
+    """
+
+    notches = [ord(ROTOR_WIRINGS[name][1]) - 65 if ROTOR_WIRINGS[name][1] else -1
+               for name in rotor_names]
+    distances = [(notch - (ord(position) - 65)) % 26 for notch, position in zip(notches, positions)]
+    wiring_offsets = [(ord(position) - 65 - (ring - 1 if ring > 1 else 0)) % 26
+                      for position, ring in zip(positions, ring_settings)]
+
+    for right, middle_groups in rotor_groups(rotor_names, length):
+        if distances[2] in right:
+            break
+    middle = [group for group in middle_groups if distances[1] in group][0]
+
+    members = []
+    for notch, group, wiring_offset in zip(notches, (list(range(26)), middle, right), wiring_offsets):
+        rotor_members = sorted(((notch - distance) % 26, (notch - distance - wiring_offset) % 26 + 1)
+                               for distance in group)
+        members.append([(chr(65 + position), ring) for position, ring in rotor_members])
+
+    return [((left[0], mid[0], rgt[0]), (left[1], mid[1], rgt[1]))
+            for left in members[0] for mid in members[1] for rgt in members[2]]
+
+
+def crib_positions(encoded_message, crib):
+    """
+    Returns the positions where a crib can start in an encoded message. An
+    Enigma Machine never encodes a letter to itself, so the crib cannot start
+    anywhere it would line up a letter with the same encoded letter.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message.
+    crib : str
+        Crib in message.
+
+    Returns
+    -------
+    List of possible start positions.
+
+    """
+
+    return [start for start in range(len(encoded_message) - len(crib) + 1)
+            if all(a != b for a, b in zip(crib, encoded_message[start:start + len(crib)]))]
+
+
+def search_pool(workers=None):
+    """
+    Starts a process pool for parallel_search, whose workers share an event
+    telling them to stop searching.
+
+    Parameters
+    ----------
+    workers : int (default=None)
+        Number of worker processes, None for one per CPU.
+
+    Returns
+    -------
+    Tuple of ProcessPoolExecutor and multiprocessing.Event.
+
+    """
+
+    stop = multiprocessing.Event()
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=set_search_stop,
+                               initargs=(stop,))
+
+    return pool, stop
+
+
+def set_search_stop(stop):
+    """
+    Keeps the stop event of a search pool in a worker process.
+
+    Parameters
+    ----------
+    stop : multiprocessing.Event
+        Event set when the workers should stop searching.
+
+    Returns
+    -------
+    None
+
+    """
+
+    global SEARCH_STOP
+    SEARCH_STOP = stop
+
+
+def parallel_search(encoded_message, crib, plugboard, combinations, return_first=True,
+                    batch_size=None, workers=None, crib_offset=None, stats=None, pool=None):
+    """
+    Runs search_combinations over chunks of combinations in a process pool.
+    Chunks are handed out as workers become free, and when return_first is
+    set the remaining chunks are cancelled as soon as a match comes back.
+    Chunks already running are told to stop through the pool's stop event,
+    and stop within a few hundred combinations.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    crib : str
+        Crib in message to aid in decoding.
+    plugboard : list
+        List of known plugboard configuration, or None.
+    combinations : iterable
+        Combinations of Enigma settings, see search_combinations.
+    return_first : bool (default=True)
+        Option to stop searching when first solution found.
+    batch_size : int (default=None)
+        Number of combinations decoded at once by each worker with the NumPy
+        batch engine. Also sets the chunk size, which defaults to 1000.
+    workers : int (default=None)
+        Number of worker processes, None for one per CPU.
+    crib_offset : int (default=None)
+        Known position of the crib in the message.
+    stats : SolverStats (default=None)
+        SolverStats to add the phase timings of every worker to.
+    pool : tuple (default=None)
+        Process pool and stop event from search_pool, left open for later
+        searches. None starts a pool for this search.
+
+    Returns
+    -------
+    List of tuples with decoded message(s) and initial Enigma settings, in
+    combination order unless return_first is set.
+
+    """
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = batch_size or 1000
+    combinations = iter(combinations)
+    chunks = enumerate(iter(lambda: list(islice(combinations, chunk_size)), []))
+    results = {}
+    first = None
+
+    owned = pool is None
+    executor, stop = search_pool(workers) if owned else pool
+    stop.clear()
+    pending = {}
+    try:
+        in_flight = 2 * workers
+        for number, chunk in islice(chunks, in_flight):
+            pending[executor.submit(timed_search, encoded_message, crib, plugboard, chunk,
+                                    return_first, batch_size, crib_offset)] = number
+
+        while pending and first is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                number = pending.pop(future)
+                results[number], worker_stats = future.result()
+                if stats is not None:
+                    stats.merge(worker_stats)
+                if return_first is True and results[number]:
+                    first = results[number][:1]
+                    break
+
+            for number, chunk in islice(chunks, 0 if first else in_flight - len(pending)):
+                pending[executor.submit(timed_search, encoded_message, crib, plugboard, chunk,
+                                        return_first, batch_size, crib_offset)] = number
+    finally:
+        # Cancel the chunks not started and stop the ones running, so no work
+        # carries on after returning
+        stop.set()
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        if owned:
+            executor.shutdown()
+
+    if first is not None:
+        return first
+
+    return [match for number in sorted(results) for match in results[number]]
+
+
+def timed_search(encoded_message, crib, plugboard, combinations, return_first=True,
+                 batch_size=None, crib_offset=None):
+    """
+    Runs search_combinations in a worker process and returns its phase
+    timings with the matches. The combinations are searched a batch, or 100
+    combinations, at a time, stopping early once the search pool is told to
+    stop.
+
+    Parameters
+    ----------
+    encoded_message : str
+        Encoded message to decode.
+    crib : str
+        Crib in message to aid in decoding.
+    plugboard : list
+        List of known plugboard configuration, or None.
+    combinations : list
+        Combinations of Enigma settings, see search_combinations.
+    return_first : bool (default=True)
+        Option to stop searching when first solution found.
+    batch_size : int (default=None)
+        Number of combinations decoded at once with the NumPy batch engine,
+        None to decode one combination at a time.
+    crib_offset : int (default=None)
+        Known position of the crib in the message, None to try every
+        position.
+
+    Returns
+    -------
+    Tuple of list of matches and SolverStats.
+
+    """
+
+    stats = SolverStats()
+    decoded_messages = []
+    step = batch_size or 100
+    for start in range(0, len(combinations), step):
+        if SEARCH_STOP is not None and SEARCH_STOP.is_set():
+            break
+        decoded_messages += search_combinations(encoded_message, crib, plugboard, combinations[start:start + step],
+                                                return_first, batch_size, crib_offset, stats)
+        if return_first is True and decoded_messages:
+            break
+
+    return decoded_messages, stats
+
+
+def encode_batch(records, workers=None, chunk_size=1000, ordered=True):
+    """
+    Encodes many independent messages, each with its own configuration, in
+    a process pool. Records are read a chunk at a time and the messages of
+    each chunk are grouped by configuration, so each worker configures one
+    machine per group and only resets the rotors between its messages. At
+    most two chunks per worker are in flight or waiting to be yielded in
+    order, so records can come from an iterable of any length.
+
+    Parameters
+    ----------
+    records : iterable
+        Tuples of configuration, in the format returned by
+        Enigma.show_config, and message to encode.
+    workers : int (default=None)
+        Number of worker processes, None for one per CPU.
+    chunk_size : int (default=1000)
+        Number of records sent to a worker at once.
+    ordered : bool (default=True)
+        Option to yield results in the order of the records. Otherwise
+        results are yielded as soon as their chunk is encoded.
+
+    Returns
+    -------
+    Generator of tuples of record index and encoded message.
+
+    """
+
+    workers = workers or os.cpu_count() or 1
+    records = enumerate(records)
+    chunks = enumerate(iter(lambda: list(islice(records, chunk_size)), []))
+    in_flight = 2 * workers
+    ready = {}
+    next_chunk = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for number, chunk in islice(chunks, in_flight):
+            pending[pool.submit(encode_records, group_records(chunk))] = number
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                number = pending.pop(future)
+                if not ordered:
+                    yield from future.result()
+                    continue
+                ready[number] = sorted(future.result())
+                while next_chunk in ready:
+                    yield from ready.pop(next_chunk)
+                    next_chunk += 1
+
+            # Chunks waiting in ready for an earlier one count as in flight
+            for number, chunk in islice(chunks, in_flight - len(pending) - len(ready)):
+                pending[pool.submit(encode_records, group_records(chunk))] = number
+
+
+def group_records(records):
+    """
+    Groups indexed records by configuration.
+
+    Parameters
+    ----------
+    records : list
+        Tuples of record index and a tuple of configuration and message.
+
+    Returns
+    -------
+    List of tuples of configuration and list of tuples of record index and
+    message.
+
+    """
+
+    groups = {}
+    for index, (config, message) in records:
+        groups.setdefault(config_key(config), (config, []))[1].append((index, message))
+
+    return list(groups.values())
+
+
+def config_key(config):
+    """
+    Returns a hashable key for a configuration in the format returned by
+    Enigma.show_config, equal for equal configurations.
+
+    Parameters
+    ----------
+    config : dict
+        Enigma Machine configuration.
+
+    Returns
+    -------
+    Tuple.
+
+    """
+
+    return (tuple(config.get('plugboard') or ()),
+            tuple(tuple(rotor) for rotor in config['rotors']), config['reflector'])
+
+
+def encode_records(groups):
+    """
+    Encodes grouped records in a worker process with a single machine,
+    reconfigured in place for each group.
+
+    Parameters
+    ----------
+    groups : list
+        Tuples of configuration and list of tuples of record index and
+        message, see group_records.
+
+    Returns
+    -------
+    List of tuples of record index and encoded message.
+
+    """
+
+    my_enigma = Enigma()
+    encoded = []
+    for config, messages in groups:
+        my_enigma.set_config(config)
+        for index, message in messages:
+            my_enigma.reset()
+            encoded.append((index, my_enigma.encode_message(message)))
+
+    return encoded
@@ -0,0 +1,329 @@
+import argparse
+import json
+import sys
+
+from enigma import NON_LETTER, Enigma, solve_enigma
+
+
+def parse_slots(values, convert=str):
+    """
+    Converts command line slot values for the solver, where '?' is an unknown
+    slot and a comma separated value is a list of candidates.
+
+    Parameters
+    ----------
+    values : list
+        Slot values as given on the command line, or None.
+    convert : callable (default=str)
+        Function applied to each known value.
+
+    Returns
+    -------
+    List of values, candidate lists and None, or None if values is None.
+
+    """
+
+    if values is None:
+        return None
+
+    slots = []
+    for value in values:
+        if value == '?':
+            slots.append(None)
+        elif ',' in value:
+            slots.append([convert(item) for item in value.split(',')])
+        else:
+            slots.append(convert(value))
+
+    return slots
+
+
+def load_config(path):
+    """
+    Loads an Enigma Machine configuration from a JSON file in the format
+    returned by Enigma.show_config, e.g.
+    {"plugboard": ["AZ"], "rotors": [["I", "A", 1], ...], "reflector": "B"}.
+
+    Parameters
+    ----------
+    path : str
+        Path of the JSON file.
+
+    Returns
+    -------
+    Dictionary with plugboard, rotors, positions, ring_settings and reflector.
+
+    """
+
+    with open(path) as file:
+        config = json.load(file)
+
+    rotors = config.get('rotors') or []
+    return {'plugboard': config.get('plugboard'),
+            'rotors': [rotor[0] for rotor in rotors],
+            'positions': [rotor[1] for rotor in rotors],
+            'ring_settings': [rotor[2] for rotor in rotors],
+            'reflector': config.get('reflector')}
+
+
+def build_machine(args):
+    """
+    Builds the Enigma Machine for the encode command, from the JSON config
+    file if given, with any config flags taking precedence.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed encode command arguments.
+
+    Returns
+    -------
+    Enigma object.
+
+    """
+
+    config = load_config(args.config) if args.config else {}
+    rotors = args.rotors or config.get('rotors')
+    positions = args.positions or config.get('positions')
+    ring_settings = args.rings or config.get('ring_settings')
+    reflector = args.reflector or config.get('reflector')
+    plugboard = args.plugboard if args.plugboard is not None else config.get('plugboard')
+
+    if not rotors or not reflector:
+        raise ValueError('Rotors and reflector must be given as flags or in the config file')
+
+    machine = Enigma()
+    machine.add_rotors(rotors, positions, ring_settings)
+    machine.add_reflector(reflector)
+    if plugboard:
+        machine.add_plugboard(plugboard)
+
+    return machine
+
+
+def run_encode(args, stdin, stdout):
+    """
+    Streams stdin through the Enigma Machine to stdout, a chunk at a time.
+    Bytes other than A-Z pass through unchanged unless --non-letters reject
+    is given, in which case the first one stops the stream with an error.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed encode command arguments.
+    stdin : binary file
+        Input stream.
+    stdout : binary file
+        Output stream.
+
+    Returns
+    -------
+    Exit status.
+
+    """
+
+    machine = build_machine(args)
+    machine.validate_machine_config()
+    read = getattr(stdin, 'read1', stdin.read)
+
+    offset = 0
+    while True:
+        chunk = read(args.chunk_size)
+        if not chunk:
+            break
+        if args.non_letters == 'reject':
+            invalid = NON_LETTER.search(chunk)
+            if invalid is not None:
+                raise ValueError('Non-letter byte {!r} at offset {}'.format(invalid.group(),
+                                                                             offset + invalid.start()))
+        buffer = bytearray(chunk)
+        machine.encode_blocks(buffer, buffer, len(buffer))
+        stdout.write(buffer)
+        stdout.flush()
+        offset += len(chunk)
+
+    return 0
+
+
+def write_error(stdout, number, error):
+    """
+    Writes a JSON line reporting that a message could not be solved.
+
+    Parameters
+    ----------
+    stdout : text file
+        Output stream of JSON lines.
+    number : int
+        Line number of the message, counting from 0.
+    error : Exception
+        Reason the message could not be solved.
+
+    Returns
+    -------
+    None
+
+    """
+
+    stdout.write(json.dumps({'line': number, 'error': str(error)}) + '\n')
+    stdout.flush()
+
+
+def run_solve(args, stdin, stdout, stderr):
+    """
+    Solves each message given with --message, or each non-empty line of
+    stdin, writing one JSON line per solution. A message that is not valid,
+    or that is not solved within --max-iterations or --deadline, gets a JSON
+    line with an error instead and the next message is solved.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed solve command arguments.
+    stdin : text file
+        Input stream of messages, one per line.
+    stdout : text file
+        Output stream of JSON lines.
+    stderr : text file
+        Stream for progress reports.
+
+    Returns
+    -------
+    Exit status, 0 if any message was solved and 1 otherwise. Errors in the
+    arguments or configuration raise ValueError.
+
+    """
+
+    rot_in = parse_slots(args.rotors)
+    pos_in = parse_slots(args.positions)
+    set_in = parse_slots(args.rings, int)
+    ref_in = parse_slots([args.reflector])[0] if args.reflector else None
+    messages = [args.message] if args.message is not None else (line.strip() for line in stdin)
+    progress = None
+    if args.progress:
+        def progress(stats):
+            print(json.dumps(stats.summary()), file=stderr, flush=True)
+
+    found = False
+    for number, message in enumerate(messages):
+        if not message:
+            continue
+        # Invalid messages and search limits only affect their own line, other
+        # errors come from the arguments and stop the run
+        try:
+            Enigma().validate_message(message)
+        except ValueError as error:
+            write_error(stdout, number, error)
+            continue
+        try:
+            results = solve_enigma(message, args.crib, args.plugboard, rot_in=rot_in, pos_in=pos_in,
+                                   set_in=set_in, ref_in=ref_in, return_first=not args.all,
+                                   max_iterations=args.max_iterations, batch_size=args.batch_size,
+                                   workers=args.jobs, crib_offset=args.crib_offset, sliding=args.sliding,
+                                   reduce_rings=args.reduce_rings, deadline=args.deadline,
+                                   progress=progress, progress_every=args.progress_every,
+                                   scoring=args.scoring, top=args.top)
+        except TimeoutError as error:
+            write_error(stdout, number, error)
+            continue
+
+        for result in results:
+            record = {'line': number, 'message': result[0], 'config': result[1]}
+            if len(result) > 2:
+                record['score'] = result[2]
+            stdout.write(json.dumps(record) + '\n')
+            found = True
+        stdout.flush()
+
+    return 0 if found else 1
+
+
+def build_parser():
+    """
+    Builds the command line parser.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    argparse.ArgumentParser
+
+    """
+
+    parser = argparse.ArgumentParser(prog='enigma', description='Enigma Machine encoder and solver.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    encode = commands.add_parser('encode', help='Encode stdin to stdout.')
+    encode.add_argument('--config', help='JSON file in the format of Enigma.show_config.')
+    encode.add_argument('--rotors', nargs='+', help='Rotor names, leftmost first.')
+    encode.add_argument('--positions', nargs='+', help='Rotor starting positions, leftmost first.')
+    encode.add_argument('--rings', nargs='+', type=int, help='Rotor ring settings, leftmost first.')
+    encode.add_argument('--reflector', help='Reflector name.')
+    encode.add_argument('--plugboard', nargs='*', help='Plugboard pairs, e.g. AZ BY.')
+    encode.add_argument('--non-letters', choices=('pass', 'reject'), default='pass',
+                        help='Copy bytes other than A-Z unchanged, or stop with an error.')
+    encode.add_argument('--chunk-size', type=int, default=65536, help='Largest number of bytes read at once.')
+
+    solve = commands.add_parser('solve', help='Solve messages given with --message or one per stdin line.')
+    solve.add_argument('--message', help='Encoded message. Defaults to one message per stdin line.')
+    solve.add_argument('--crib', help='Crib in the message. Without one, decodings are ranked by --scoring.')
+    solve.add_argument('--crib-offset', type=int, help='Known position of the crib in the message.')
+    solve.add_argument('--plugboard', nargs='*', help='Known plugboard pairs.')
+    solve.add_argument('--rotors', nargs=3,
+                       help="Known rotors, leftmost first. '?' for unknown, comma separated candidates.")
+    solve.add_argument('--positions', nargs=3, help='Known positions, as for --rotors.')
+    solve.add_argument('--rings', nargs=3, help='Known ring settings, as for --rotors.')
+    solve.add_argument('--reflector', help='Known reflector, or comma separated candidates.')
+    solve.add_argument('--all', action='store_true', help='Return every solution, not just the first.')
+    solve.add_argument('--max-iterations', type=int, default=100000,
+                       help='Maximum number of settings to try, -1 for no limit.')
+    solve.add_argument('--jobs', type=int, help='Number of worker processes.')
+    solve.add_argument('--batch-size', type=int, help='Decode settings in NumPy batches of this size.')
+    solve.add_argument('--sliding', action='store_true', help='Use the sliding keystream search.')
+    solve.add_argument('--reduce-rings', action='store_true',
+                       help='Search one setting per class of equivalent positions and ring settings.')
+    solve.add_argument('--deadline', type=float, help='Seconds after which to stop searching.')
+    solve.add_argument('--progress', action='store_true', help='Report progress on stderr.')
+    solve.add_argument('--progress-every', type=int, default=10000,
+                       help='Number of settings between progress reports.')
+    solve.add_argument('--scoring', default='trigram', choices=('ioc', 'bigram', 'trigram'),
+                       help='How to rank decodings without a crib.')
+    solve.add_argument('--top', type=int, default=10, help='Number of decodings to return without a crib.')
+
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Runs the command line interface.
+
+    Parameters
+    ----------
+    argv : list (default=None)
+        Command line arguments, None for sys.argv[1:].
+    stdin, stdout, stderr : file (default=None)
+        Streams to use instead of the sys ones. The encode command needs
+        binary streams and the solve command text streams.
+
+    Returns
+    -------
+    Exit status.
+
+    """
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    stderr = stderr or sys.stderr
+
+    try:
+        if args.command == 'encode':
+            return run_encode(args, stdin or sys.stdin.buffer, stdout or sys.stdout.buffer)
+        return run_solve(args, stdin or sys.stdin, stdout or sys.stdout, stderr)
+    except (ValueError, TimeoutError) as error:
+        print('{}: error: {}'.format(parser.prog, error), file=stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,587 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from enigma import Keyspace, search_combinations
+from enigma_cli import parse_slots
+
+
+def send(writer, message):
+    """
+    Writes a message to a connection as a JSON line.
+
+    """
+
+    writer.write(json.dumps(message).encode() + b'\n')
+
+
+class Coordinator:
+    """
+    A class to represent the coordinator of a solver search shared by worker
+    processes over TCP, on the same or other hosts.
+
+    The keyspace of solve_enigma is handed out as leases of index ranges,
+    see Keyspace. Workers report their progress and matches after every
+    step of their lease, which also renews it. When no range is left to
+    hand out, an idle worker steals the second half of the largest range
+    still to be searched by another worker, which is told to stop at the
+    split. A lease not renewed within lease_timeout, or held by a worker
+    that disconnects, goes back to be handed out again. Stolen and
+    reclaimed ranges can be searched twice, and matches are kept once each.
+
+    Messages are JSON objects, one per line. Workers send hello, then
+    progress and done messages for their leases. The coordinator sends the
+    job once, then lease, shrink and finally stop messages. A malformed
+    message from a worker is answered with an error message and otherwise
+    ignored, without disconnecting the worker.
+
+    ...
+
+    Attributes
+    ----------
+    job : dict
+        Search parameters sent to every worker.
+    keyspace : Keyspace
+        Settings searched.
+    stop : int
+        Index after the last combination searched.
+    next_start : int
+        Index of the first combination not yet leased.
+    free : list
+        Reclaimed ranges waiting to be leased again, as [start, stop].
+    leases : dict
+        Leases being searched by id, each a dictionary with the worker
+        connection, cursor, stop and expiry time.
+    workers : set
+        Connections of the workers.
+    idle : set
+        Connections of the workers waiting for work.
+    matches : dict
+        Decoded messages and settings by combination index.
+    searched : int
+        Number of combinations reported searched, including repeats.
+    rejected : int
+        Number of malformed messages received.
+    address : tuple
+        Host and port the coordinator is listening on, once started.
+
+    Methods
+    -------
+    start():
+        Starts listening for workers.
+
+    close():
+        Stops the workers and the server.
+
+    solve():
+        Waits for the search to finish and returns the matches.
+
+    handle(reader, writer):
+        Serves the messages of one worker.
+
+    validate(message):
+        Checks a message from a worker and ranks its matches.
+
+    report(writer, message, matches):
+        Records a progress or done message of a worker.
+
+    assign(writer):
+        Leases a range to a worker, stealing one if none is left.
+
+    reclaim(lease_id):
+        Takes a lease back so its remaining range can be leased again.
+
+    expire():
+        Reclaims the leases that have not been renewed in time.
+
+    finish():
+        Tells every worker to stop and ends the search.
+
+    """
+
+    def __init__(self, encoded_message, crib, plugboard=None, rot_in=None, pos_in=None, set_in=None,
+                 ref_in=None, return_first=True, crib_offset=None, start=0, stop=None,
+                 lease_size=10000, step=1000, lease_timeout=30.0, host='127.0.0.1', port=0):
+        """
+        Constructs attributes for the Coordinator object.
+
+        Parameters
+        ----------
+        encoded_message, crib, plugboard, rot_in, pos_in, set_in, ref_in,
+        return_first, crib_offset :
+            As for solve_enigma.
+        start : int (default=0)
+            Index of the first combination to search.
+        stop : int (default=None)
+            Index after the last combination to search, None for the end of
+            the keyspace.
+        lease_size : int (default=10000)
+            Number of combinations in a new lease.
+        step : int (default=1000)
+            Number of combinations a worker searches between reports. Ranges
+            are only stolen if they have more than two steps left.
+        lease_timeout : float (default=30.0)
+            Seconds without a report after which a lease is reclaimed.
+        host : str (default='127.0.0.1')
+            Host to listen on.
+        port : int (default=0)
+            Port to listen on, 0 for any free port.
+
+        """
+
+        # Catch-all case where we don't know anything keeps ring settings at 1, as in solve_enigma
+        if rot_in is None and pos_in is None and set_in is None and ref_in is None:
+            set_in = [1, 1, 1]
+        self.keyspace = Keyspace(rot_in, pos_in, set_in, ref_in)
+        self.job = {'type': 'job', 'encoded_message': encoded_message, 'crib': crib,
+                    'plugboard': plugboard, 'rot_in': rot_in, 'pos_in': pos_in, 'set_in': set_in,
+                    'ref_in': ref_in, 'return_first': return_first, 'crib_offset': crib_offset,
+                    'step': step}
+        self.return_first = return_first
+        self.next_start = start
+        self.stop = len(self.keyspace) if stop is None else min(stop, len(self.keyspace))
+        self.lease_size = lease_size
+        self.step = step
+        self.lease_timeout = lease_timeout
+        self.host = host
+        self.port = port
+
+        self.free = []
+        self.leases = {}
+        self.next_lease = 0
+        self.workers = set()
+        self.idle = set()
+        self.matches = {}
+        self.searched = 0
+        self.rejected = 0
+        self.finished = None
+        self.server = None
+        self.address = None
+        self.expiry = None
+
+    async def start(self):
+        """
+        Starts listening for workers.
+
+        Returns
+        -------
+        The Coordinator.
+
+        """
+
+        self.finished = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.address = self.server.sockets[0].getsockname()[:2]
+        self.expiry = asyncio.ensure_future(self.expire())
+        if self.next_start >= self.stop:
+            self.finish()
+
+        return self
+
+    async def close(self):
+        """
+        Stops the workers and the server.
+
+        """
+
+        self.finish()
+        self.expiry.cancel()
+        self.server.close()
+        for writer in list(self.workers):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def solve(self):
+        """
+        Waits for the search to finish.
+
+        Returns
+        -------
+        List of tuples with decoded message and initial Enigma settings, in
+        combination order, with only the first when return_first is set.
+
+        """
+
+        await self.finished.wait()
+        matches = [self.matches[index] for index in sorted(self.matches)]
+
+        return matches[:1] if self.return_first else matches
+
+    async def handle(self, reader, writer):
+        """
+        Serves the messages of one worker, and reclaims its leases when it
+        disconnects.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+        writer : asyncio.StreamWriter
+
+        """
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    matches = self.validate(message)
+                except ValueError as error:
+                    self.rejected += 1
+                    send(writer, {'type': 'error', 'error': 'Rejected message: {}'.format(error)})
+                    continue
+                if message['type'] == 'hello':
+                    self.workers.add(writer)
+                    send(writer, self.job)
+                    self.assign(writer)
+                else:
+                    self.report(writer, message, matches)
+        except ConnectionError:
+            pass
+        finally:
+            self.workers.discard(writer)
+            self.idle.discard(writer)
+            for lease_id in [lease_id for lease_id, lease in self.leases.items() if lease['writer'] is writer]:
+                self.reclaim(lease_id)
+            writer.close()
+
+    def validate(self, message):
+        """
+        Checks a message from a worker before anything in it is used, and
+        ranks the settings of its matches in the keyspace.
+
+        Parameters
+        ----------
+        message : dict
+            Message from a worker.
+
+        Returns
+        -------
+        List of tuples of combination index and match. Raises ValueError if
+        the message is malformed or a match is not in the keyspace.
+
+        """
+
+        try:
+            if message['type'] == 'hello':
+                return []
+            if message['type'] not in ('progress', 'done'):
+                raise ValueError('unknown message type {!r}'.format(message['type']))
+            if not isinstance(message['lease'], int) or not isinstance(message['cursor'], int):
+                raise ValueError('lease and cursor must be integers')
+
+            matches = []
+            for decoded, config in message['matches']:
+                rotors = config['rotors']
+                if not isinstance(decoded, str) or len(rotors) != 3 or any(len(rotor) != 3 for rotor in rotors):
+                    raise ValueError('malformed match {!r}'.format([decoded, config]))
+                combination = tuple(rotor[0] for rotor in rotors) + tuple(rotor[1] for rotor in rotors) \
+                    + tuple(rotor[2] for rotor in rotors) + (config['reflector'],)
+                matches.append((self.keyspace.rank(combination), (decoded, config)))
+        except (KeyError, TypeError, IndexError) as error:
+            raise ValueError('malformed message, {!r}'.format(error))
+
+        return matches
+
+    def report(self, writer, message, matches):
+        """
+        Records a progress or done message of a worker. Messages for leases
+        that were reclaimed are ignored, apart from their matches.
+
+        Parameters
+        ----------
+        writer : asyncio.StreamWriter
+            Connection of the worker.
+        message : dict
+            Message with the lease id, the cursor reached and the matches
+            found since the last report, as (decoded message, settings).
+        matches : list
+            Matches ranked by validate.
+
+        """
+
+        for index, match in matches:
+            self.matches[index] = match
+        if self.matches and self.return_first:
+            self.finish()
+            return
+
+        lease = self.leases.get(message['lease'])
+        if lease is None or lease['writer'] is not writer:
+            return
+        self.searched += max(0, message['cursor'] - lease['cursor'])
+        lease['cursor'] = message['cursor']
+        lease['expires'] = time.monotonic() + self.lease_timeout
+
+        if message['type'] == 'done':
+            del self.leases[message['lease']]
+            self.assign(writer)
+
+    def assign(self, writer):
+        """
+        Leases a range to a worker: a reclaimed range, else the next range
+        not yet leased, else the second half of the largest range left in
+        another lease. The worker is left idle if there is nothing to steal,
+        and the search finishes when no lease is left.
+
+        Parameters
+        ----------
+        writer : asyncio.StreamWriter
+            Connection of the worker.
+
+        """
+
+        if self.finished.is_set():
+            return
+
+        if self.free:
+            start, stop = self.free.pop()
+        elif self.next_start < self.stop:
+            start, stop = self.next_start, min(self.next_start + self.lease_size, self.stop)
+            self.next_start = stop
+        else:
+            victim = max(self.leases.items(), key=lambda item: item[1]['stop'] - item[1]['cursor'],
+                         default=None)
+            if victim is None or victim[1]['stop'] - victim[1]['cursor'] <= 2 * self.step:
+                self.idle.add(writer)
+                if not self.leases:
+                    self.finish()
+                return
+            victim_id, lease = victim
+            start, stop = lease['cursor'] + (lease['stop'] - lease['cursor']) // 2, lease['stop']
+            lease['stop'] = start
+            send(lease['writer'], {'type': 'shrink', 'lease': victim_id, 'stop': start})
+
+        lease_id = self.next_lease
+        self.next_lease += 1
+        self.leases[lease_id] = {'writer': writer, 'cursor': start, 'stop': stop,
+                                 'expires': time.monotonic() + self.lease_timeout}
+        self.idle.discard(writer)
+        send(writer, {'type': 'lease', 'lease': lease_id, 'start': start, 'stop': stop})
+
+    def reclaim(self, lease_id):
+        """
+        Takes a lease back so its remaining range can be leased again, and
+        hands it to an idle worker if there is one.
+
+        Parameters
+        ----------
+        lease_id : int
+            Id of the lease.
+
+        """
+
+        lease = self.leases.pop(lease_id)
+        if lease['cursor'] < lease['stop']:
+            self.free.append([lease['cursor'], lease['stop']])
+        for writer in list(self.idle):
+            self.assign(writer)
+        if not self.leases and not self.free and self.next_start >= self.stop:
+            self.finish()
+
+    async def expire(self):
+        """
+        Reclaims the leases that have not been renewed in time, and
+        disconnects their workers.
+
+        """
+
+        while True:
+            await asyncio.sleep(self.lease_timeout / 4)
+            now = time.monotonic()
+            for lease_id, lease in list(self.leases.items()):
+                if lease_id in self.leases and lease['expires'] < now:
+                    self.workers.discard(lease['writer'])
+                    self.reclaim(lease_id)
+                    lease['writer'].close()
+
+    def finish(self):
+        """
+        Tells every worker to stop and ends the search.
+
+        """
+
+        if self.finished.is_set():
+            return
+        self.finished.set()
+        for writer in self.workers:
+            send(writer, {'type': 'stop'})
+
+
+async def run_worker(host, port):
+    """
+    Runs a worker: connects to a coordinator, then searches the leases it is
+    given a step at a time in a thread, reporting after every step, until
+    told to stop or disconnected.
+
+    Parameters
+    ----------
+    host : str
+        Host of the coordinator.
+    port : int
+        Port of the coordinator.
+
+    Returns
+    -------
+    None
+
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    send(writer, {'type': 'hello'})
+    loop = asyncio.get_running_loop()
+    job = json.loads(await reader.readline())
+    keyspace = Keyspace(job['rot_in'], job['pos_in'], job['set_in'], job['ref_in'])
+    leases = asyncio.Queue()
+    current = {}
+
+    async def listen():
+        while True:
+            line = await reader.readline()
+            message = json.loads(line) if line else {'type': 'stop'}
+            if message['type'] == 'lease':
+                leases.put_nowait(message)
+            elif message['type'] == 'shrink':
+                if current.get('lease') == message['lease']:
+                    current['stop'] = max(message['stop'], current['step_stop'])
+            elif message['type'] == 'error':
+                print(message['error'], file=sys.stderr, flush=True)
+            else:
+                leases.put_nowait(None)
+                return
+
+    listener = asyncio.ensure_future(listen())
+    try:
+        while True:
+            lease = await leases.get()
+            if lease is None:
+                break
+            current.update(lease=lease['lease'], stop=lease['stop'], step_stop=lease['start'])
+            cursor = lease['start']
+            while cursor < current['stop'] and not listener.done():
+                current['step_stop'] = min(cursor + job['step'], current['stop'])
+                matches = await loop.run_in_executor(
+                    None, search_combinations, job['encoded_message'], job['crib'], job['plugboard'],
+                    list(keyspace.iterate(cursor, current['step_stop'])), job['return_first'], None,
+                    job['crib_offset'])
+                cursor = current['step_stop']
+                send(writer, {'type': 'done' if cursor >= current['stop'] else 'progress',
+                              'lease': lease['lease'], 'cursor': cursor, 'matches': matches})
+                await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        listener.cancel()
+        writer.close()
+
+
+async def solve_local(encoded_message, crib, workers=2, **kwargs):
+    """
+    Runs a Coordinator with worker processes on this host, for testing or
+    for one machine.
+
+    Parameters
+    ----------
+    encoded_message, crib :
+        As for solve_enigma.
+    workers : int (default=2)
+        Number of worker processes to start.
+    **kwargs :
+        Other Coordinator parameters.
+
+    Returns
+    -------
+    List of matches, see Coordinator.solve.
+
+    """
+
+    async with Coordinator(encoded_message, crib, **kwargs) as coordinator:
+        host, port = coordinator.address
+        processes = [await asyncio.create_subprocess_exec(sys.executable, __file__, 'worker', '--host', host,
+                                                          '--port', str(port))
+                     for _ in range(workers)]
+        try:
+            return await coordinator.solve()
+        finally:
+            await coordinator.close()
+            for process in processes:
+                try:
+                    await asyncio.wait_for(process.wait(), 5)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+
+
+def main(argv=None):
+    """
+    Runs a coordinator or a worker from the command line. The coordinator
+    writes one JSON line per match.
+
+    Parameters
+    ----------
+    argv : list (default=None)
+        Command line arguments, None for sys.argv[1:].
+
+    """
+
+    parser = argparse.ArgumentParser(description='Distributed Enigma Machine solver.')
+    roles = parser.add_subparsers(dest='role', required=True)
+
+    worker = roles.add_parser('worker', help='Search leases given by a coordinator.')
+    worker.add_argument('--host', default='127.0.0.1', help='Host of the coordinator.')
+    worker.add_argument('--port', type=int, required=True, help='Port of the coordinator.')
+
+    coordinator = roles.add_parser('coordinator', help='Share a search between workers.')
+    coordinator.add_argument('--message', required=True, help='Encoded message.')
+    coordinator.add_argument('--crib', required=True, help='Crib in the message.')
+    coordinator.add_argument('--crib-offset', type=int, help='Known position of the crib in the message.')
+    coordinator.add_argument('--plugboard', nargs='*', help='Known plugboard pairs.')
+    coordinator.add_argument('--rotors', nargs=3,
+                             help="Known rotors, leftmost first. '?' for unknown, comma separated candidates.")
+    coordinator.add_argument('--positions', nargs=3, help='Known positions, as for --rotors.')
+    coordinator.add_argument('--rings', nargs=3, help='Known ring settings, as for --rotors.')
+    coordinator.add_argument('--reflector', help='Known reflector, or comma separated candidates.')
+    coordinator.add_argument('--all', action='store_true', help='Return every solution, not just the first.')
+    coordinator.add_argument('--host', default='127.0.0.1', help='Host to listen on.')
+    coordinator.add_argument('--port', type=int, default=0, help='Port to listen on.')
+    coordinator.add_argument('--local-workers', type=int, default=0,
+                             help='Number of worker processes to start on this host.')
+    coordinator.add_argument('--lease-size', type=int, default=10000, help='Number of combinations per lease.')
+    coordinator.add_argument('--step', type=int, default=1000,
+                             help='Number of combinations a worker searches between reports.')
+    coordinator.add_argument('--lease-timeout', type=float, default=30.0,
+                             help='Seconds without a report after which a lease is reclaimed.')
+    args = parser.parse_args(argv)
+
+    if args.role == 'worker':
+        asyncio.run(run_worker(args.host, args.port))
+        return
+
+    kwargs = dict(plugboard=args.plugboard, rot_in=parse_slots(args.rotors),
+                  pos_in=parse_slots(args.positions), set_in=parse_slots(args.rings, int),
+                  ref_in=parse_slots([args.reflector])[0] if args.reflector else None,
+                  return_first=not args.all, crib_offset=args.crib_offset, lease_size=args.lease_size,
+                  step=args.step, lease_timeout=args.lease_timeout, host=args.host, port=args.port)
+
+    async def coordinate():
+        if args.local_workers:
+            return await solve_local(args.message, args.crib, args.local_workers, **kwargs)
+        async with Coordinator(args.message, args.crib, **kwargs) as coordinator:
+            print('Listening on {}'.format(coordinator.address), file=sys.stderr, flush=True)
+            return await coordinator.solve()
+
+    for decoded, config in asyncio.run(coordinate()):
+        print(json.dumps({'message': decoded, 'config': config}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
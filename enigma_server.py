@@ -0,0 +1,555 @@
+import argparse
+import asyncio
+import json
+import time
+
+from enigma import Enigma, LRUCache, config_key
+
+LINE_LIMIT = 1 << 24
+
+
+class EnigmaServer:
+    """
+    A class to represent an asyncio service encoding messages with the
+    Enigma Machine over a TCP or Unix socket.
+
+    Requests and responses are JSON objects, one per line. A request holds
+    an id, a configuration in the format returned by Enigma.show_config and
+    a message, e.g.
+    {"id": 1, "config": {"plugboard": ["AZ"], "rotors": [["I", "A", 1], ...],
+    "reflector": "B"}, "message": "HELLO"}. The response holds the same id
+    and either the encoded message or an error, with the seconds the request
+    waited before its batch started (queue_time), the seconds the batch took
+    (process_time) and the number of messages in the batch (batch_size).
+    Decoding is the same as encoding with the same configuration.
+    Responses on a connection are written as they complete, so they can come
+    back in a different order from the requests.
+
+    Requests for the same configuration arriving within batch_window
+    seconds of each other are encoded together in the executor by one warm
+    machine, taken from a pool of idle machines kept per configuration.
+    Each connection has at most max_pending requests being answered, and
+    further lines are not read until one is answered, so a client that
+    sends faster than it is served is held back by the socket.
+
+    ...
+
+    Attributes
+    ----------
+    host : str
+        Host to listen on for TCP.
+    port : int
+        Port to listen on for TCP, 0 for any free port.
+    path : str
+        Path of the Unix socket to listen on instead of TCP, or None.
+    batch_window : float
+        Seconds to wait for more requests with the same configuration.
+    max_batch : int
+        Number of requests that start a batch without waiting.
+    max_pending : int
+        Number of requests of one connection answered at once.
+    max_idle : int
+        Number of idle machines kept per configuration.
+    machines : LRUCache
+        Lists of idle machines per configuration.
+    executor : concurrent.futures.Executor
+        Executor to encode batches in, None for the event loop default.
+    batches : dict
+        Requests waiting for their batch to start, per configuration.
+    tasks : set
+        Batches being encoded.
+    connections : set
+        Tasks serving open connections.
+    address : tuple or str
+        Address the server is listening on, once started.
+
+    Methods
+    -------
+    start():
+        Starts listening.
+
+    close():
+        Stops listening, drops open connections and waits for the server to close.
+
+    handle(reader, writer):
+        Serves the requests of one connection.
+
+    respond(line, writer):
+        Answers one request line.
+
+    submit(config, message):
+        Queues a message for encoding and returns a future of its response.
+
+    flush(key, batch):
+        Starts encoding a batch of queued requests.
+
+    run_batch(key, config, requests):
+        Encodes a batch in the executor and resolves its futures.
+
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, path=None, batch_window=0.001, max_batch=256,
+                 pool_size=64, executor=None, max_pending=1024, max_idle=4):
+        """
+        Constructs attributes for the EnigmaServer object.
+
+        Parameters
+        ----------
+        host : str (default='127.0.0.1')
+            Host to listen on for TCP.
+        port : int (default=0)
+            Port to listen on for TCP, 0 for any free port.
+        path : str (default=None)
+            Path of the Unix socket to listen on instead of TCP.
+        batch_window : float (default=0.001)
+            Seconds to wait for more requests with the same configuration.
+        max_batch : int (default=256)
+            Number of requests that start a batch without waiting.
+        pool_size : int (default=64)
+            Number of configurations to keep idle machines for.
+        executor : concurrent.futures.Executor (default=None)
+            Executor to encode batches in, None for the event loop default.
+        max_pending : int (default=1024)
+            Number of requests of one connection answered at once.
+        max_idle : int (default=4)
+            Number of idle machines kept per configuration.
+
+        """
+
+        if max_pending < 1:
+            raise ValueError('max_pending must be at least 1, got {}'.format(max_pending))
+        if max_idle < 0:
+            raise ValueError('max_idle must be at least 0, got {}'.format(max_idle))
+
+        self.host = host
+        self.port = port
+        self.path = path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_idle = max_idle
+        self.machines = LRUCache(maxsize=pool_size)
+        self.executor = executor
+        self.batches = {}
+        self.address = None
+        self.server = None
+        self.tasks = set()
+        self.connections = set()
+
+    async def start(self):
+        """
+        Starts listening.
+
+        Returns
+        -------
+        The EnigmaServer.
+
+        """
+
+        if self.path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=self.path, limit=LINE_LIMIT)
+            self.address = self.path
+        else:
+            self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=LINE_LIMIT)
+            self.address = self.server.sockets[0].getsockname()[:2]
+
+        return self
+
+    async def close(self):
+        """
+        Stops listening, drops open connections and waits for the server to
+        close.
+
+        """
+
+        self.server.close()
+        for connection in self.connections:
+            connection.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of one connection, answering each as soon as it
+        is encoded, with at most max_pending being answered at once.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+        writer : asyncio.StreamWriter
+
+        """
+
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        responses = set()
+        slots = asyncio.Semaphore(self.max_pending)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await slots.acquire()
+                task = asyncio.ensure_future(self.respond(line, writer))
+                responses.add(task)
+                task.add_done_callback(responses.discard)
+                task.add_done_callback(lambda _: slots.release())
+            if responses:
+                await asyncio.gather(*responses)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(connection)
+            writer.close()
+
+    async def respond(self, line, writer):
+        """
+        Answers one request line.
+
+        Parameters
+        ----------
+        line : bytes
+            JSON request.
+        writer : asyncio.StreamWriter
+
+        """
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            response = await self.submit(request['config'], request['message'])
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            response = {'error': 'Invalid request: {!r}'.format(error)}
+
+        response['id'] = request_id
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+    def submit(self, config, message):
+        """
+        Queues a message for encoding with the requests waiting for the same
+        configuration.
+
+        Parameters
+        ----------
+        config : dict
+            Enigma Machine configuration, see Enigma.show_config.
+        message : str
+            Message to encode.
+
+        Returns
+        -------
+        Future of the response dictionary.
+
+        """
+
+        loop = asyncio.get_running_loop()
+        key = config_key(config)
+        future = loop.create_future()
+
+        batch = self.batches.get(key)
+        if batch is None:
+            batch = self.batches[key] = (config, [])
+            loop.call_later(self.batch_window, self.flush, key, batch)
+        batch[1].append((message, future, time.perf_counter()))
+        if len(batch[1]) >= self.max_batch:
+            self.flush(key, batch)
+
+        return future
+
+    def flush(self, key, batch):
+        """
+        Starts encoding a batch of queued requests, unless it has already
+        been started.
+
+        Parameters
+        ----------
+        key : tuple
+            Configuration key, see config_key.
+        batch : tuple
+            Configuration and list of queued requests.
+
+        """
+
+        if self.batches.get(key) is not batch:
+            return
+        del self.batches[key]
+        task = asyncio.ensure_future(self.run_batch(key, *batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, key, config, requests):
+        """
+        Encodes a batch in the executor with an idle machine for its
+        configuration, and resolves the futures of its requests. A message
+        that fails to encode only fails its own request.
+
+        Parameters
+        ----------
+        key : tuple
+            Configuration key, see config_key.
+        config : dict
+            Enigma Machine configuration.
+        requests : list
+            Tuples of message, future and time queued.
+
+        """
+
+        idle = self.machines.get(key, list)
+        machine = idle.pop() if idle else None
+        try:
+            machine, results, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self.executor, encode_requests, machine, config, [request[0] for request in requests])
+        except Exception as error:
+            for _, future, _ in requests:
+                if not future.done():
+                    future.set_result({'error': 'Encoding failed: {!r}'.format(error)})
+            return
+        if machine is not None and len(idle) < self.max_idle:
+            idle.append(machine)
+
+        for (_, future, queued), (encoded, error) in zip(requests, results):
+            response = {'message': encoded} if error is None else {'error': error}
+            response.update(queue_time=started - queued, process_time=finished - started,
+                            batch_size=len(requests))
+            if not future.done():
+                future.set_result(response)
+
+
+def encode_requests(machine, config, messages):
+    """
+    Encodes a batch of messages from their starting configuration, building
+    the machine first if none is given.
+
+    Parameters
+    ----------
+    machine : Enigma
+        Machine set to config, or None.
+    config : dict
+        Enigma Machine configuration, see Enigma.show_config.
+    messages : list
+        Messages to encode.
+
+    Returns
+    -------
+    Tuple of the machine (None if config is invalid), list of tuples of
+    encoded message and error (one of them None), and the start and finish
+    times.
+
+    """
+
+    started = time.perf_counter()
+    if machine is None:
+        try:
+            machine = Enigma()
+            machine.set_config(config)
+            machine.validate_machine_config()
+        except (ValueError, KeyError, TypeError, AttributeError, IndexError) as error:
+            error = 'Invalid config: {!r}'.format(error)
+            return None, [(None, error)] * len(messages), started, time.perf_counter()
+
+    results = []
+    for message in messages:
+        machine.reset()
+        try:
+            results.append((machine.encode_message(message), None))
+        except (ValueError, TypeError) as error:
+            results.append((None, str(error)))
+        except Exception as error:
+            results.append((None, 'Encoding failed: {!r}'.format(error)))
+
+    return machine, results, started, time.perf_counter()
+
+
+class EnigmaClient:
+    """
+    A class to represent a client of an EnigmaServer, sending any number of
+    requests over one connection at once.
+
+    ...
+
+    Attributes
+    ----------
+    reader : asyncio.StreamReader
+    writer : asyncio.StreamWriter
+    pending : dict
+        Futures of the responses not yet received, by request id.
+    next_id : int
+        Id of the next request.
+
+    Methods
+    -------
+    connect(host, port, path):
+        Opens a connection to a server.
+
+    encode(config, message):
+        Encodes a message through the server.
+
+    listen():
+        Resolves the pending requests as their responses arrive.
+
+    close():
+        Closes the connection.
+
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Constructs attributes for the EnigmaClient object.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+        writer : asyncio.StreamWriter
+
+        """
+
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self.listener = asyncio.ensure_future(self.listen())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=None, path=None):
+        """
+        Opens a connection to a server on a TCP port or a Unix socket path.
+
+        Returns
+        -------
+        EnigmaClient object.
+
+        """
+
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+        return cls(reader, writer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def encode(self, config, message):
+        """
+        Encodes a message through the server.
+
+        Parameters
+        ----------
+        config : dict
+            Enigma Machine configuration, see Enigma.show_config.
+        message : str
+            Message to encode.
+
+        Returns
+        -------
+        Response dictionary.
+
+        """
+
+        request_id = self.next_id
+        self.next_id += 1
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps({'id': request_id, 'config': config, 'message': message}).encode() + b'\n')
+        await self.writer.drain()
+
+        return await future
+
+    async def listen(self):
+        """
+        Resolves the pending requests as their responses arrive, and fails
+        the rest with ConnectionError when the connection closes.
+
+        """
+
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.pending.pop(response['id'], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Connection closed'))
+            self.pending.clear()
+
+    async def close(self):
+        """
+        Closes the connection.
+
+        """
+
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self.listener.cancel()
+
+
+async def serve(server):
+    """
+    Runs a server until cancelled.
+
+    """
+
+    async with server:
+        print('Listening on {}'.format(server.address), flush=True)
+        await server.server.serve_forever()
+
+
+def main(argv=None):
+    """
+    Runs the server from the command line.
+
+    Parameters
+    ----------
+    argv : list (default=None)
+        Command line arguments, None for sys.argv[1:].
+
+    """
+
+    parser = argparse.ArgumentParser(description='Enigma Machine encoding service.')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to listen on.')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port to listen on.')
+    parser.add_argument('--unix', help='Unix socket path to listen on instead of TCP.')
+    parser.add_argument('--batch-window', type=float, default=0.001,
+                        help='Seconds to wait for more requests with the same configuration.')
+    parser.add_argument('--max-batch', type=int, default=256,
+                        help='Number of requests that start a batch without waiting.')
+    parser.add_argument('--pool-size', type=int, default=64,
+                        help='Number of configurations to keep idle machines for.')
+    parser.add_argument('--max-pending', type=int, default=1024,
+                        help='Number of requests of one connection answered at once.')
+    parser.add_argument('--max-idle', type=int, default=4,
+                        help='Number of idle machines kept per configuration.')
+    args = parser.parse_args(argv)
+
+    try:
+        server = EnigmaServer(args.host, args.port, args.unix, args.batch_window, args.max_batch,
+                              pool_size=args.pool_size, max_pending=args.max_pending, max_idle=args.max_idle)
+    except ValueError as error:
+        parser.error(str(error))
+    try:
+        asyncio.run(serve(server))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
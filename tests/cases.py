@@ -0,0 +1,64 @@
+from enigma import Enigma
+
+
+MESSAGE = ('THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG' * 23)[:800]
+
+# Plugboard, rotors, positions and ring settings (leftmost first), reflector
+# and the encoding of MESSAGE by the original character by character engine
+CASES = [
+    (None, ['I', 'II', 'III'], ['A', 'A', 'A'], [0, 0, 0], 'B',
+        ('OPCILLAZFXLQTDNLGGLEKDIZOKQKGXIEZKDKPQJODPQZHCSBCADYLKAGAABTJKPRZMEZAJGKKENRDHCZ'
+         'TFWVNFFKDQMPTZHSSAVQJPCEQCVKCQOHHKDEVGMTJFZYWBCYYGSRBIDXPNHQVOILRPHZPSASDGJZNWOW'
+         'IMDZBIRSIKELGEURPSVZRGDNPAFTVBEZJQSAYHZKOARBNMMHICCRDRMTBSZJHIGOHAKVBODMNNOMEJPS'
+         'GORSUBNBXGLYFALISPPZNBQKJWMPSXBIZDGJGZBQLIPIKXADZPKUBKJGHOQFUQWWQYTSCSKVOFEBMNUI'
+         'YPTIBCREVCRZBWYLGZQFNADHUGLFRVUMGZNQQXUMWFQHLDBJOADAQRANPRZXEUZBRBNAKIPUTNYDCDWU'
+         'JCTJHKATTIDVKIEDRTDXXQSCDLSOATWDTJSELXIRKBPVOPBCZMLRQLPDXXFNVAQRDIPMBJHFRCLRFPXK'
+         'ECSRMRJFMPWJKWOEHRQLJFMNGSHYTILWDBEZULCKJXEVILGRSHOTQDEWRIDRVBFUENEBRXJRRKMEJIKN'
+         'SIUBDTAHMGGKKRJBVLUWJBWQFASXKXPWKYEIVGRFVMVKXUOKZQWHYOFVEZZIUJGCOPIXPFJJDAQFGUAK'
+         'GUFRHOZRVAOSGSDPZTEJIECQHRFOCRZQYIXNEXOUTDLOLZRGDDLQCCDSFIWBFVPMEOQUSWHAYXBAWDPN'
+         'GTSUCRMUCMYHPVVJISMKGYRJSIUWOCJEEGWZJUGSZSMUZLMTSTCNSUFPSQVCHKJJAJVJDMNZXFKCYJYQ')),
+    (['AZ', 'BY', 'CX'], ['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1], 'B',
+        ('VGPIQKVUEMDXOLPPTWITLYKCFHAGJZNAQVVDRZGHZNQTKNAAGWEMIXCNIFMGLPRYMFPKDWVPSWMRDUSF'
+         'BZCXDHDTXSWGYVCSBJPZGREYEJVUBPWGAHSQGRSQPQNPUMTJYDAVVGLHXZDJQSJWRTKMMDAEWGHUWHWD'
+         'AMOYSILRKKGBQPFPIQDVPAXJCQPQRJDHHOXPQGRBEBOYBEHXDWZAZFIYYHPGHAQTYSUAHZBLCQHVYLIR'
+         'BXOEMMNHYAZKWIFAHISMLOZLUOARIKMKBRZFWVIUWDRSOQLICKWUPEEOOXWBIRMSZDOKQQEPKXDVGWYA'
+         'NILQKPUKRHUSZTWXRIOMBZNPDLFCHBRXXSAYUSIHKTAADVESIFMMQJVFPSTJAWXADZRJSXKBUAHYAODG'
+         'TGIHRIWQHBPFPFYBOSREEVIUXSUAOZDFATTYLJJMXQMXAFGFUMGROEKNVACFMKDGQKEMUDCNKZJOSHWY'
+         'PIMXDGQINZRGZFSLMMNIQBDKPNPOSSYBJMDKLMJYLBBLVNXQTOBLWUMKQUBSDCWBJCIUCZBULIPLBICS'
+         'XCDLGVVCEHCRFTQGAMHOWRZOSNVVZVOMLAYVETDMBDTWDBRSEJFEQGIOUUTTVIBCLERACHXZUZXOVTOA'
+         'DJRJTSKDIGJQTNJNKOGCNSZKLLPDSNHITZULRWAQJNPRQHBHNZBQOKTVFYNTMFNMHLBBXMTUCKFWAJJT'
+         'GTCBTDPQJLNEOQYWLMNQXSINXDDFUSDOEEEPAEFGVSSMBDNBZBIBVLSFIROMYBLVDMCAHZXMOQJJFBWK')),
+    (['QW', 'ER', 'TY', 'UI', 'OP'], ['V', 'II', 'IV'], ['Q', 'D', 'U'], [25, 1, 13], 'C',
+        ('LUTOXFJSMCFTMPNVPPIUBWLFCRNQGSGPQQQYQYZLBKJKBABLLFEMJWNQXBTVOBPKZSPXRDLOTGQWOCIN'
+         'HYFCCUBDBGTEGXECZKXMKNWGNJWCHGEATKKEMSGAJYICTMAHZLJRJCPBBUZOEBVUANKRLOGCVWFEEKAQ'
+         'RTPZORYTODTNPQEPFIGYZPNFCVJARIAKQCCPJYSHUJMYYGLGWJUJCUKDVLXHQDJGHSOETYUUZCJQQLDP'
+         'LORVSESJETRQNOGXYLWKCCMABWNUZQDVBEORZYJSXIAWTNPRUNJHMYMUMSFMYQYWIFFISDKHAHNGUXIK'
+         'GIYZLVKGTAZHMODMNAPXHULMOCGGGVKYVZNWYBJMCQIOJBYKSOMREYSPZJHLMLJRPPBQANHGVACTLZTW'
+         'HOIKOFHCKURBFNDQIVXPZBPDNJYPVFTYBNIRQYYGHKJRLYGNAWCFEMHPZUZIJPRZQPVXCHNBOWYYCCNQ'
+         'WTIKQXGLLRAVIEDDHHMBTTYYWMIZDCCKEHNVTZHCDWPFFPYARYVMLOUKEPSWOZQFAEGWLKZXLFRSMXQE'
+         'GQVGCUFSYGPKRPVJAEZUXLBXOEEXXBXKZLCBBJTWVOWZCRTSJWLWDWCLLYGQHDIROHAZBCGPJLLLYZVF'
+         'YVDQRDXNLLWKGPLLMZQXBIHHOZYQWHMOPDJKFITRTTKCWQKAOVLEHMFGQGDVJMMBGGKDNZXCLSXTPYJD'
+         'OIKMSLBOOMJRQEZJRVCNCJEZOBOBYLDULQFPZSXDSMBBGPBIWRORMTVWBLHJRNDAMVNVGYZCROCJBICX')),
+    (['AB'], ['Beta', 'I', 'II', 'III'], ['B', 'Q', 'E', 'V'], [4, 2, 7, 12], 'A',
+        ('NBPUWKNBETYUTBWEBDOOEPOCONGHPZSUTRWZWJUEPHAUCCYONDYUKPODNPBFBPOBOYLSNXBMITTWFVPQ'
+         'XGXWLUBSJBHNJRAVFLBBMJBDHEKHKOBGYYVCIDEXTCSEATIHIYRTYXTRJGRCWKTEHCUXJJFQJEZQMMSY'
+         'VKRTLIVMYIGPZWBQRRMBBFHQQNGMVYATIOSANEHQUFXSDMJNKBCJHYQPGLZJDUOCFSGRRHGQAKPYFLZL'
+         'GDATDMVXLHZWUCCKFMBBDCJIOXNGVOBZXTTHCTCRGKKSGPBWFOCKXNGVKKBOZMZJISZVVBQWMPJGGKCK'
+         'RWEGMYTDJISCWQSGUIBCKLQXBTRCQCMNOZJXFJGUKETZSFXGUSCUAQJPXSIRISCJWWOFKNFTJIALZKXK'
+         'KNHWGUGLDIGZNWMKAGDBSIMXMZRHQGEXAGTUMLHHRAKGQOMFBCYNIRDGWKMSCDQNITXWVBBUILEYDCLN'
+         'BPOFOMKITHGWMTTJXGVVYCRJQGUPAERUHKIFAPMRVZMFSHBTFBBYAKVUMBHZASGXIVDBMHVYNOLCEMZX'
+         'KUXXKNRTXILSPQKMLLBLAKLZHUVMDVTUNBWJOSWCLOIGANTRXMVZXAJRKGYLHZREIFQCUBGXGJHQZAOV'
+         'YGRTKPGEIWZNDPDKLLITPPBEQSEOHBVYXKXKLOLHNNCGAJBHFUKGHECGRZPPLSBFOLDRYGXYZRRWXJGB'
+         'QSRHILNHYRPATJEBNKYDWXSLZCGUDSHXXPDMGTTIADQMQIEOYFPSIFQRFXGEPQSTVMUKHCGUCHZMOYAE')),
+]
+
+
+def build(case, keystream=False):
+    plugboard, rotors, positions, ring_settings, reflector, _ = case
+    machine = Enigma(keystream=keystream)
+    if plugboard:
+        machine.add_plugboard(plugboard)
+    machine.add_rotors(rotors, positions, ring_settings)
+    machine.add_reflector(reflector)
+    return machine
+
@@ -0,0 +1,12 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(params=[False, True], ids=['cached', 'keystream'])
+def keystream(request):
+    return request.param
@@ -0,0 +1,47 @@
+import pytest
+
+from enigma import Enigma, anneal_enigma
+
+
+MESSAGE = 'THEENEMYFORCESHAVEWITHDRAWNFROMTHEVALLEYANDOURPATROLSREPORTNOCONTACTALONGTHEROADTOTHENORTH'
+ROTORS = ['II', 'IV', 'V']
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_rotors(ROTORS, ['B', 'L', 'A'], [2, 21, 12])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+def test_anneal_finds_key_in_narrow_keyspace(encoded):
+    results = anneal_enigma(encoded, rot_in=ROTORS, pos_in=['B', None, None], set_in=[2, None, None],
+                            ref_in='B', iterations=5000, restarts=4, seed=3)
+    decoded, config, score = results[0]
+    assert decoded == MESSAGE
+    machine = Enigma()
+    machine.add_rotors(*[list(column) for column in zip(*config['rotors'])])
+    machine.add_reflector(config['reflector'])
+    assert machine.encode_message(encoded) == MESSAGE
+
+
+def test_anneal_is_repeatable_and_ordered(encoded):
+    improvements = []
+    first = anneal_enigma(encoded, rot_in=ROTORS, set_in=[2, 21, 12], ref_in='B', iterations=2000, restarts=3,
+                          seed=1, callback=lambda best, restart, step: improvements.append((restart, best[2])))
+    second = anneal_enigma(encoded, rot_in=ROTORS, set_in=[2, 21, 12], ref_in='B', iterations=2000,
+                           restarts=3, seed=1)
+    assert first == second
+    assert len(first) == 3
+    assert [result[2] for result in first] == sorted((result[2] for result in first), reverse=True)
+    scores = [score for restart, score in improvements]
+    assert scores == sorted(scores)
+    assert scores[-1] == first[0][2]
+
+
+def test_anneal_cooling_schedule(encoded):
+    results = anneal_enigma(encoded, rot_in=ROTORS, ref_in='B', iterations=500, restarts=1, seed=2,
+                            cooling=lambda step, iterations: 100.0 * (1 - step / iterations))
+    assert len(results) == 1
+    assert [rotor[0] for rotor in results[0][1]['rotors']] == ROTORS
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from enigma import BatchMachines, Enigma, REFLECTOR_NAMES, ROTOR_NAMES, batch_encode
+
+from cases import MESSAGE
+
+pytest.importorskip('numpy')
+
+
+def random_configs(n, n_rotors, seed):
+    rng = random.Random(seed)
+    letters = [chr(65 + i) for i in range(26)]
+    configs = []
+    for _ in range(n):
+        names = rng.sample(['I', 'II', 'III', 'IV', 'V'], 3)
+        if n_rotors == 4:
+            names = [rng.choice(['Beta', 'Gamma'])] + names
+        shuffled = rng.sample(letters, 2 * rng.randint(0, 10))
+        configs.append({'plugboard': [shuffled[i] + shuffled[i + 1] for i in range(0, len(shuffled), 2)] or None,
+                        'rotors': [(name, rng.choice(letters), rng.randint(0, 26)) for name in names],
+                        'reflector': rng.choice(['A', 'B', 'C'])})
+    return configs
+
+
+def machine_for(config):
+    machine = Enigma()
+    if config['plugboard']:
+        machine.add_plugboard(config['plugboard'])
+    machine.add_rotors(*[list(column) for column in zip(*config['rotors'])])
+    machine.add_reflector(config['reflector'])
+    return machine
+
+
+@pytest.mark.parametrize('n_rotors', [3, 4])
+def test_batch_encode_matches_machines(n_rotors):
+    configs = random_configs(40, n_rotors, n_rotors)
+    encoded = batch_encode(configs, MESSAGE)
+    assert encoded.shape == (40, len(MESSAGE))
+    for config, row in zip(configs, encoded):
+        assert ''.join(chr(65 + x) for x in row) == machine_for(config).encode_message(MESSAGE)
+
+
+def test_find_crib_matches_decoding():
+    configs = random_configs(60, 3, 7)
+    true = configs[17]
+    encoded = machine_for(true).encode_message(MESSAGE)
+    arrays = [[[ROTOR_NAMES.index(name) for name, _, _ in config['rotors']] for config in configs],
+              [[ord(position) - 65 for _, position, _ in config['rotors']] for config in configs],
+              [[ring for _, _, ring in config['rotors']] for config in configs]]
+    batch = BatchMachines(*arrays, [REFLECTOR_NAMES.index(config['reflector']) for config in configs],
+                          [machine_for(config).plugboard.wiring if config['plugboard'] else list(range(26))
+                           for config in configs])
+    crib = 'FOXJUMPS'
+    found = batch.find_crib(encoded, crib, list(range(len(encoded) - len(crib) + 1)))
+    for config, start in zip(configs, found):
+        decoded = machine_for(config).encode_message(encoded)
+        assert start == decoded.find(crib)
+    assert found[17] == MESSAGE.find(crib)
+
+
+def test_batch_encode_rejects_mixed_rotor_counts():
+    with pytest.raises(ValueError):
+        batch_encode(random_configs(2, 3, 0) + random_configs(2, 4, 0), MESSAGE)
@@ -0,0 +1,74 @@
+from collections import Counter
+
+import pytest
+
+from enigma import BombeMenu, Enigma, bombe_search
+
+
+MESSAGE = 'WETTERVORHERSAGEFUERDIENORDSEEHEUTEKLARUNDWINDSTILLBEIGUTERSICHT'
+CRIB = 'WETTERVORHERSAGEFUERDIENORDSEE'
+PLUGBOARD = ['AQ', 'BW', 'CE', 'DR', 'TY', 'UI', 'OP', 'LK', 'ZX', 'MN']
+ROTORS = ['II', 'IV', 'V']
+POSITIONS = ['B', 'L', 'A']
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(ROTORS, POSITIONS, [1, 1, 1])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+@pytest.fixture(scope='module')
+def stops(encoded):
+    return bombe_search(encoded, CRIB, crib_offset=0, rot_in=ROTORS, ref_in='B')
+
+
+def test_bombe_finds_true_rotor_order(stops):
+    rotors = [config['rotors'] for config, offset in stops]
+    assert [('II', 'B', 1), ('IV', 'L', 1), ('V', 'A', 1)] in rotors
+
+
+def test_bombe_stop_decodes_message(encoded, stops):
+    for config, offset in stops:
+        if config['rotors'] == list(zip(ROTORS, POSITIONS, [1, 1, 1])):
+            assert sorted(config['plugboard']) == sorted(''.join(sorted(p)) for p in PLUGBOARD)
+            machine = Enigma()
+            machine.add_plugboard(config['plugboard'])
+            machine.add_rotors(ROTORS, POSITIONS, [1, 1, 1])
+            machine.add_reflector('B')
+            assert machine.encode_message(encoded) == MESSAGE
+
+
+def test_bombe_stops_fit_on_plugboard(stops):
+    for config, offset in stops:
+        assert len(config['plugboard']) <= 10
+        machine = Enigma()
+        machine.add_plugboard(config['plugboard'])
+
+
+def test_bombe_rejects_stops_with_too_many_pairs(encoded):
+    stops = bombe_search(encoded, CRIB, crib_offset=0, rot_in=ROTORS, ref_in='B', max_pairs=9)
+    assert all(len(config['plugboard']) <= 9 for config, offset in stops)
+    assert list(zip(ROTORS, POSITIONS, [1, 1, 1])) not in [config['rotors'] for config, offset in stops]
+
+
+def test_bombe_max_pairs_limit(encoded):
+    with pytest.raises(ValueError):
+        bombe_search(encoded, CRIB, crib_offset=0, rot_in=ROTORS, ref_in='B', max_pairs=11)
+
+
+def test_menu_loops_are_closed(encoded):
+    menu = BombeMenu(CRIB, encoded[:len(CRIB)])
+    assert len(menu.loops) > 0
+    assert sorted(sum(menu.components, [])) == sorted(set(sum(menu.components, [])))
+    assert menu.test_letters[0] in menu.components[0]
+    for loop in menu.loops:
+        ends = Counter()
+        for index in loop:
+            a, b, _ = menu.edges[index]
+            ends[a] += 1
+            ends[b] += 1
+        assert all(count % 2 == 0 for count in ends.values())
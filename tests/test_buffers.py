@@ -0,0 +1,41 @@
+import array
+
+import pytest
+
+from cases import CASES, MESSAGE, build
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_encoded_buffers_match_baseline(case, keystream):
+    machine = build(case, keystream)
+    assert machine.encode_message(MESSAGE.encode('ascii')) == case[-1].encode('ascii')
+    machine.reset()
+    target = bytearray(len(MESSAGE))
+    assert machine.encode_into(MESSAGE, target) == len(MESSAGE)
+    assert target.decode('ascii') == case[-1]
+
+
+def test_encode_message_returns_input_type():
+    machine = build(CASES[1])
+    assert machine.encode_message(bytearray(MESSAGE[:40].encode('ascii'))) == CASES[1][-1][:40].encode('ascii')
+    machine.reset()
+    assert machine.encode_message(memoryview(MESSAGE[:40].encode('ascii'))) == CASES[1][-1][:40].encode('ascii')
+
+
+def test_encode_into_writes_over_buffer_start():
+    machine = build(CASES[3])
+    target = array.array('B', b'.' * 900)
+    assert machine.encode_into(MESSAGE.encode('ascii'), target) == len(MESSAGE)
+    assert target.tobytes() == CASES[3][-1].encode('ascii') + b'.' * 100
+
+
+def test_encode_into_rejects_small_buffer():
+    machine = build(CASES[0])
+    with pytest.raises(ValueError):
+        machine.encode_into(MESSAGE, bytearray(10))
+
+
+def test_encode_message_rejects_lowercase_bytes():
+    machine = build(CASES[0])
+    with pytest.raises(ValueError):
+        machine.encode_message(b'HELLOworld')
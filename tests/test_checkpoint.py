@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from enigma import Enigma, solve_enigma
+
+
+ROTORS = ['I', 'II', 'III']
+RING_SETTINGS = [3, 7, 11]
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_rotors(ROTORS, ['Q', 'E', 'V'], RING_SETTINGS)
+    machine.add_reflector('B')
+    return machine.encode_message('HELLOWORLDENIGMAAAAAAAAA')
+
+
+def solve(encoded, crib='E', **kwargs):
+    return solve_enigma(encoded, crib, rot_in=ROTORS, set_in=RING_SETTINGS, ref_in='B', return_first=False,
+                        **kwargs)
+
+
+def test_resume_after_max_iterations(encoded, tmp_path):
+    path = str(tmp_path / 'search.json')
+    full = solve(encoded, max_iterations=-1)
+
+    with pytest.raises(TimeoutError):
+        solve(encoded, max_iterations=7000, checkpoint=path, checkpoint_every=3000)
+    state = json.load(open(path))
+    assert state['cursor'] == 7000 and not state['complete']
+
+    assert solve(encoded, max_iterations=-1, checkpoint=path, checkpoint_every=3000, resume=True) == full
+    assert json.load(open(path))['complete']
+    # A complete checkpoint is returned without searching again
+    assert solve(encoded, max_iterations=-1, checkpoint=path, resume=True) == full
+
+
+def test_resume_keeps_earlier_matches(encoded, tmp_path):
+    path = str(tmp_path / 'search.json')
+    full = solve(encoded, max_iterations=-1)
+
+    with pytest.raises(TimeoutError):
+        solve(encoded, max_iterations=15000, checkpoint=path, checkpoint_every=5000)
+    saved = json.load(open(path))['matches']
+    assert 0 < len(saved) < len(full)
+
+    resumed = solve(encoded, max_iterations=-1, checkpoint=path, resume=True)
+    assert resumed == full
+    assert [decoded for decoded, _ in resumed[:len(saved)]] == [decoded for decoded, _ in saved]
+
+
+def test_first_match_is_checkpointed(encoded, tmp_path):
+    path = str(tmp_path / 'search.json')
+    first = solve_enigma(encoded, 'ENIGMA', rot_in=ROTORS, set_in=RING_SETTINGS, ref_in='B', max_iterations=-1,
+                         checkpoint=path, checkpoint_every=1000)
+    assert len(first) == 1 and 'ENIGMA' in first[0][0]
+    assert json.load(open(path))['complete']
+    assert solve_enigma(encoded, 'ENIGMA', rot_in=ROTORS, set_in=RING_SETTINGS, ref_in='B', max_iterations=-1,
+                        checkpoint=path, resume=True) == first
+
+
+def test_resume_rejects_different_search(encoded, tmp_path):
+    path = str(tmp_path / 'search.json')
+    with pytest.raises(TimeoutError):
+        solve(encoded, max_iterations=2000, checkpoint=path, checkpoint_every=1000)
+    with pytest.raises(ValueError):
+        solve(encoded, crib='EN', max_iterations=-1, checkpoint=path, resume=True)
+
+
+def test_without_resume_checkpoint_is_overwritten(encoded, tmp_path):
+    path = str(tmp_path / 'search.json')
+    with pytest.raises(TimeoutError):
+        solve(encoded, max_iterations=4000, checkpoint=path, checkpoint_every=2000)
+    with pytest.raises(TimeoutError):
+        solve(encoded, max_iterations=2000, checkpoint=path, checkpoint_every=1000)
+    assert json.load(open(path))['cursor'] == 2000
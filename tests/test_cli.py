@@ -0,0 +1,101 @@
+import io
+import json
+
+import pytest
+
+from enigma import Enigma
+from enigma_cli import main, parse_slots
+
+
+MESSAGE = 'THEWEATHERREPORTFORTHENORTHERNSECTORISCLEARWITHLIGHTWINDS'
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_rotors(['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+@pytest.mark.parametrize('options', [[], ['--progress'], ['--deadline', '0'], ['--sliding']],
+                         ids=['search', 'chunked', 'deadline', 'sliding'])
+def test_solve_error_records_read_as_one_sentence(encoded, options):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = main(['solve', '--message', encoded, '--crib', 'WEATHERREPORT', '--max-iterations', '50']
+                  + options, stdout=stdout, stderr=stderr)
+    assert status == 1
+    record = json.loads(stdout.getvalue())
+    assert record['line'] == 0
+    assert 'reached' in record['error']
+    assert '  ' not in record['error']
+
+
+def encode(argv, data):
+    stdout, stderr = io.BytesIO(), io.StringIO()
+    status = main(['encode'] + argv, stdin=io.BytesIO(data), stdout=stdout, stderr=stderr)
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+def test_encode_round_trip_with_config_file(tmp_path):
+    config = tmp_path / 'config.json'
+    config.write_text(json.dumps({'plugboard': ['AZ', 'BY'], 'reflector': 'B',
+                                  'rotors': [['I', 'A', 3], ['III', 'B', 2], ['IV', 'C', 1]]}))
+    data = b'THE WEATHER\nREPORT, 06:00\n' * 50
+    status, encoded, _ = encode(['--config', str(config), '--chunk-size', '7'], data)
+    assert status == 0
+    assert len(encoded) == len(data)
+    letters = b'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    assert encoded.translate(None, letters) == data.translate(None, letters)
+    machine = Enigma()
+    machine.add_plugboard(['AZ', 'BY'])
+    machine.add_rotors(['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1])
+    machine.add_reflector('B')
+    message = bytes(byte for byte in data if byte in letters)
+    assert bytes(byte for byte in encoded if byte in letters) == machine.encode_message(message)
+    assert encode(['--config', str(config)], encoded)[1] == data
+
+    # Flags take precedence over the config file
+    status, flagged, _ = encode(['--config', str(config), '--positions', 'Q', 'B', 'C'], data)
+    assert status == 0 and flagged != encoded
+
+
+def test_encode_rejects_non_letters():
+    status, encoded, stderr = encode(['--rotors', 'I', 'II', 'III', '--reflector', 'B',
+                                      '--non-letters', 'reject'], b'HELLO WORLD')
+    assert status == 2
+    assert encoded == b''
+    assert "Non-letter byte b' ' at offset 5" in stderr
+
+
+def test_solve_reports_each_line(encoded):
+    stdin = io.StringIO('\n'.join([encoded, 'not a message', '', encoded]) + '\n')
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = main(['solve', '--crib', 'WEATHERREPORT', '--rotors', 'I', 'III', 'IV', '--rings', '3', '2', '1',
+                   '--reflector', 'B', '--max-iterations', '-1'], stdin=stdin, stdout=stdout, stderr=stderr)
+    assert status == 0
+    records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [record['line'] for record in records] == [0, 1, 3]
+    assert 'error' in records[1]
+    for record in (records[0], records[2]):
+        assert record['message'] == MESSAGE
+        assert record['config']['rotors'] == [['I', 'A', 3], ['III', 'B', 2], ['IV', 'C', 1]]
+
+
+def test_solve_jobs_match_single_process(encoded):
+    outputs = []
+    for options in ([], ['--jobs', '2'], ['--batch-size', '512']):
+        stdout = io.StringIO()
+        main(['solve', '--message', encoded, '--crib', 'EN', '--all', '--rotors', 'I', 'III', 'IV',
+              '--rings', '3', '2', '1', '--reflector', 'B', '--max-iterations', '-1'] + options,
+             stdout=stdout, stderr=io.StringIO())
+        outputs.append(stdout.getvalue())
+    assert len(outputs[0].splitlines()) > 1
+    assert outputs[1] == outputs[0]
+    assert outputs[2] == outputs[0]
+
+
+def test_parse_slots():
+    assert parse_slots(None) is None
+    assert parse_slots(['I', '?', 'II,IV']) == ['I', None, ['II', 'IV']]
+    assert parse_slots(['1', '?', '2,3'], int) == [1, None, [2, 3]]
@@ -0,0 +1,52 @@
+import pytest
+
+from enigma import Enigma, compile_composite, compile_rotor
+
+from cases import CASES, MESSAGE as LONG_MESSAGE, build
+
+
+MESSAGE = ('THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG' * 8)[:260]
+ROTORS = ['Beta', 'I', 'II', 'III']
+
+
+def four_rotors(positions):
+    machine = Enigma()
+    machine.add_plugboard(['AB'])
+    machine.add_rotors(ROTORS, positions, [4, 2, 7, 12])
+    machine.add_reflector('A')
+    return machine
+
+
+def test_four_rotor_encode_char_matches_encode_message():
+    expected = four_rotors(['B', 'Q', 'E', 'V']).encode_message(MESSAGE)
+    machine = four_rotors(['B', 'Q', 'E', 'V'])
+    assert ''.join(machine.encode_char(char) for char in MESSAGE) == expected
+
+
+def test_static_rotor_change_rebuilds_composite():
+    machine = four_rotors(['B', 'Q', 'E', 'V'])
+    for char in MESSAGE[:30]:
+        machine.encode_char(char)
+    for positions in (['K', 'Q', 'E', 'V'], ['Z', 'A', 'A', 'A']):
+        machine.set_positions(positions)
+        expected = four_rotors(positions).encode_message(MESSAGE)
+        assert ''.join(machine.encode_char(char) for char in MESSAGE) == expected
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_encode_char_matches_baseline(case):
+    machine = build(case)
+    assert ''.join(machine.encode_char(char) for char in LONG_MESSAGE[:200]) == case[-1][:200]
+
+
+def test_composite_rows_match_rotors():
+    table = compile_composite('II', 'V', list(range(26))[::-1])
+    middle_forward, middle_backward, _ = compile_rotor('II', 1)
+    left_forward, left_backward, _ = compile_rotor('V', 1)
+    for middle, left in ((0, 0), (3, 25), (17, 9)):
+        row = table.row(middle, left)
+        for index in range(26):
+            expected = middle_backward[middle][left_backward[left][
+                25 - left_forward[left][middle_forward[middle][index]]]]
+            assert row[index] == expected
+    assert compile_composite('II', 'V', list(range(26))[::-1]) is table
@@ -0,0 +1,65 @@
+import pytest
+
+from enigma import Enigma, Keyspace, SolverStats, crib_positions, search_combinations
+
+
+MESSAGE = 'THEWEATHERREPORTFORTHENORTHERNSECTORISCLEARWITHLIGHTWINDS'
+PLUGBOARD = ['AZ', 'BY', 'CX']
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+@pytest.fixture(scope='module')
+def combinations():
+    return list(Keyspace(['I', 'III', 'IV'], None, [3, 2, 1], 'B'))
+
+
+def test_crib_positions_skip_letters_encoded_to_themselves(encoded):
+    starts = crib_positions(encoded, 'WEATHER')
+    assert MESSAGE.index('WEATHER') in starts
+    for start in range(len(encoded) - len('WEATHER') + 1):
+        clash = any(a == b for a, b in zip('WEATHER', encoded[start:]))
+        assert (start in starts) != clash
+
+
+def test_find_crib_agrees_with_full_decoding(encoded, combinations):
+    indices = [ord(char) - 65 for char in encoded]
+    for crib in ('E', 'TH', 'WEATHER'):
+        crib_indices = [ord(char) - 65 for char in crib]
+        starts = crib_positions(encoded, crib)
+        machine = Enigma()
+        machine.add_plugboard(PLUGBOARD)
+        for comb in combinations[::53]:
+            machine.set_rotors(list(comb[0:3]), list(comb[3:6]), list(comb[6:9]))
+            machine.set_reflector(comb[9])
+            decoded = machine.encode_message(encoded)
+            machine.reset()
+            assert machine.find_crib(indices, crib_indices, starts) == decoded.find(crib)
+
+
+@pytest.mark.parametrize('batch_size', [None, 512])
+def test_known_offset_matches_full_search(encoded, combinations, batch_size):
+    full = search_combinations(encoded, 'TH', PLUGBOARD, combinations, return_first=False, batch_size=batch_size)
+    assert len(full) > 1
+    at_start = search_combinations(encoded, 'TH', PLUGBOARD, combinations, return_first=False,
+                                   batch_size=batch_size, crib_offset=0)
+    assert at_start == [match for match in full if match[0].startswith('TH')]
+    assert (MESSAGE, {'plugboard': PLUGBOARD, 'rotors': [('I', 'A', 3), ('III', 'B', 2), ('IV', 'C', 1)],
+                      'reflector': 'B'}) in at_start
+
+
+@pytest.mark.parametrize('batch_size', [None, 512])
+def test_impossible_crib_decodes_nothing(encoded, combinations, batch_size):
+    # Cribs with no possible start, or an offset that leaves no room for them
+    for crib, crib_offset in ((encoded, None), (MESSAGE + 'S', None), ('TH', len(encoded) - 1), ('TH', -1)):
+        stats = SolverStats()
+        assert search_combinations(encoded, crib, PLUGBOARD, combinations, return_first=False,
+                                   batch_size=batch_size, crib_offset=crib_offset, stats=stats) == []
+        assert stats.setup_time == stats.decrypt_time == 0
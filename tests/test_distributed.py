@@ -0,0 +1,99 @@
+import asyncio
+import json
+import sys
+
+from enigma import Enigma, solve_enigma
+from enigma_distributed import Coordinator, send, solve_local
+import enigma_distributed
+
+
+MESSAGE = 'THESEAREEXAMPLESOFUSINGTHEENIGMASOLVEMETHOD'
+SETTINGS = {'plugboard': ['AZ', 'BY', 'CX'], 'rot_in': ['I', 'III', 'IV'], 'set_in': [3, 2, 1]}
+
+
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(SETTINGS['plugboard'])
+    machine.add_rotors(SETTINGS['rot_in'], ['A', 'B', 'C'], SETTINGS['set_in'])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+def as_lists(matches):
+    return [(decoded, [list(rotor) for rotor in config['rotors']], config['reflector']) for decoded, config in matches]
+
+
+async def start_worker(coordinator):
+    host, port = coordinator.address
+    return await asyncio.create_subprocess_exec(sys.executable, enigma_distributed.__file__, 'worker',
+                                                '--host', host, '--port', str(port))
+
+
+def test_solve_local_finds_every_match():
+    expected = solve_enigma(encoded(), 'EN', SETTINGS['plugboard'], SETTINGS['rot_in'], None, SETTINGS['set_in'],
+                            None, return_first=False, max_iterations=-1)
+    found = asyncio.run(solve_local(encoded(), 'EN', workers=2, return_first=False, lease_size=4000, step=300,
+                                    **SETTINGS))
+    assert len(expected) > 1
+    assert as_lists(found) == as_lists(expected)
+
+
+def test_solve_local_returns_first_match():
+    found = asyncio.run(solve_local(encoded(), 'ENIGMA', workers=2, lease_size=2000, step=200, **SETTINGS))
+    assert found == [(MESSAGE, {'plugboard': ['AZ', 'BY', 'CX'],
+                                'rotors': [['I', 'A', 3], ['III', 'B', 2], ['IV', 'C', 1]], 'reflector': 'B'})]
+
+
+def test_silent_worker_lease_is_reclaimed():
+    async def run():
+        async with Coordinator(encoded(), 'ENIGMA', lease_size=3000, step=300, lease_timeout=0.5,
+                               **SETTINGS) as coordinator:
+            reader, writer = await asyncio.open_connection(*coordinator.address)
+            send(writer, {'type': 'hello'})
+            await writer.drain()
+            await reader.readline()
+            lease = json.loads(await reader.readline())
+            worker = await start_worker(coordinator)
+            found = await coordinator.solve()
+        await worker.wait()
+        writer.close()
+        return lease, found
+
+    lease, found = asyncio.run(run())
+    assert lease['type'] == 'lease' and lease['start'] == 0
+    assert [decoded for decoded, _ in found] == [MESSAGE]
+
+
+def test_malformed_messages_are_rejected():
+    async def run():
+        async with Coordinator(encoded(), 'ENIGMA', lease_size=4000, step=500, **SETTINGS) as coordinator:
+            reader, writer = await asyncio.open_connection(*coordinator.address)
+            send(writer, {'type': 'hello'})
+            await writer.drain()
+            await reader.readline()
+            lease = json.loads(await reader.readline())
+
+            bad_match = ['X', {'rotors': [['V', 'A', 1]] * 3, 'reflector': 'B'}]
+            messages = [b'not json', b'[1, 2]', b'{"type": "progress"}', b'{"type": "nope"}',
+                        json.dumps({'type': 'progress', 'lease': lease['lease'], 'cursor': 'x',
+                                    'matches': []}).encode(),
+                        json.dumps({'type': 'done', 'lease': lease['lease'], 'cursor': lease['stop'],
+                                    'matches': [bad_match]}).encode()]
+            errors = []
+            for message in messages:
+                writer.write(message + b'\n')
+                await writer.drain()
+                errors.append(json.loads(await reader.readline()))
+            state = coordinator.rejected, lease['lease'] in coordinator.leases, len(coordinator.workers)
+
+            worker = await start_worker(coordinator)
+            writer.close()
+            found = await coordinator.solve()
+        await worker.wait()
+        return errors, state, found
+
+    errors, (rejected, leased, workers), found = asyncio.run(run())
+    assert all(error['type'] == 'error' for error in errors)
+    assert 'not in keyspace' in errors[-1]['error']
+    assert rejected == 6 and leased and workers == 1
+    assert [decoded for decoded, _ in found] == [MESSAGE]
@@ -0,0 +1,56 @@
+import random
+
+from enigma import Enigma, encode_batch
+
+
+def records(n, seed):
+    rng = random.Random(seed)
+    configs = [{'plugboard': ['AZ', 'BY'], 'rotors': [('I', 'A', 3), ('III', 'B', 2), ('IV', 'C', 1)],
+                'reflector': 'B'},
+               {'plugboard': None, 'rotors': [('Beta', 'Q', 1), ('V', 'K', 9), ('II', 'E', 4), ('I', 'Z', 26)],
+                'reflector': 'C'},
+               {'plugboard': ['QW', 'ER'], 'rotors': [('II', 'D', 0), ('IV', 'U', 13), ('V', 'A', 7)],
+                'reflector': 'A'}]
+    return [(rng.choice(configs), ''.join(chr(65 + rng.randrange(26)) for _ in range(rng.randint(0, 80))))
+            for _ in range(n)]
+
+
+def expected(records):
+    results = []
+    for config, message in records:
+        machine = Enigma()
+        if config['plugboard']:
+            machine.add_plugboard(config['plugboard'])
+        machine.add_rotors(*[list(column) for column in zip(*config['rotors'])])
+        machine.add_reflector(config['reflector'])
+        results.append(machine.encode_message(message))
+    return results
+
+
+def test_ordered_results_match_machines():
+    batch = records(300, 0)
+    results = list(encode_batch(batch, workers=2, chunk_size=37))
+    assert [index for index, _ in results] == list(range(300))
+    assert [encoded for _, encoded in results] == expected(batch)
+
+
+def test_unordered_results_cover_every_record():
+    batch = records(200, 1)
+    results = list(encode_batch(batch, workers=2, chunk_size=16, ordered=False))
+    assert sorted(index for index, _ in results) == list(range(200))
+    assert [encoded for _, encoded in sorted(results)] == expected(batch)
+
+
+def test_records_are_read_a_few_chunks_at_a_time():
+    batch = records(500, 2)
+    read = []
+
+    def source():
+        for record in batch:
+            read.append(record)
+            yield record
+
+    results = encode_batch(source(), workers=1, chunk_size=10)
+    assert next(results) == (0, expected(batch[:1])[0])
+    assert len(read) <= 30
+    assert len(list(results)) == 499
@@ -0,0 +1,24 @@
+import pytest
+
+from enigma import Enigma
+
+from cases import CASES, MESSAGE, build
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_encode_message_matches_baseline(case):
+    machine = build(case)
+    assert machine.encode_message(MESSAGE) == case[-1]
+    machine.reset()
+    assert machine.encode_message(case[-1]) == MESSAGE
+
+
+def test_rotors_double_step():
+    machine = Enigma()
+    machine.add_rotors(['I', 'II', 'III'], ['A', 'D', 'U'], [1, 1, 1])
+    machine.add_reflector('B')
+    positions = []
+    for char in 'AAAA':
+        machine.encode_char(char)
+        positions.append(''.join(chr(65 + rotor.offset) for rotor in machine.rotors[::-1]))
+    assert positions == ['ADV', 'AEW', 'BFX', 'BFY']
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from enigma import Enigma, equivalent_settings, setting_classes, solve_enigma
+
+
+ROTORS = ['I', 'II', 'III']
+MESSAGE = 'WETTERBERICHT'
+
+
+def encode(positions, ring_settings, message=MESSAGE):
+    machine = Enigma()
+    machine.add_rotors(ROTORS, list(positions), list(ring_settings))
+    machine.add_reflector('B')
+    return machine.encode_message(message)
+
+
+def random_settings(n, seed):
+    rng = random.Random(seed)
+    return [([chr(65 + rng.randrange(26)) for _ in range(3)], [rng.randint(1, 26) for _ in range(3)])
+            for _ in range(n)]
+
+
+@pytest.mark.parametrize('length', [10, 60])
+def test_equivalent_settings_encode_identically(length):
+    message = (MESSAGE * 5)[:length]
+    for positions, ring_settings in random_settings(10, length):
+        members = equivalent_settings(ROTORS, positions, ring_settings, length)
+        assert (tuple(positions), tuple(ring_settings)) in members
+        expected = encode(positions, ring_settings, message)
+        for other_positions, other_ring_settings in members:
+            assert encode(other_positions, other_ring_settings, message) == expected
+
+
+def test_each_class_has_one_representative():
+    representatives = set(setting_classes(ROTORS, len(MESSAGE)))
+    for positions, ring_settings in random_settings(200, 0):
+        members = equivalent_settings(ROTORS, positions, ring_settings, len(MESSAGE))
+        assert len(representatives.intersection(members)) == 1
+
+
+def test_reduce_rings_returns_whole_class():
+    encoded = encode(['A', 'A', 'A'], [1, 1, 1])
+    found = solve_enigma(encoded, MESSAGE, rot_in=ROTORS, ref_in='B', reduce_rings=True,
+                         max_iterations=-1, batch_size=4096)
+    settings = [(tuple(rotor[1] for rotor in config['rotors']), tuple(rotor[2] for rotor in config['rotors']))
+                for decoded, config in found]
+    assert all(decoded == MESSAGE for decoded, config in found)
+    assert all(encode(*setting, message=encoded) == MESSAGE for setting in settings)
+    assert sorted(settings) == sorted(equivalent_settings(ROTORS, *settings[0], len(MESSAGE)))
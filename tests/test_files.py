@@ -0,0 +1,50 @@
+import pytest
+
+from enigma import Enigma
+
+from cases import CASES, MESSAGE, build
+
+
+def test_encode_file_passes_non_letters(tmp_path):
+    source = tmp_path / 'message.txt'
+    target = tmp_path / 'encoded.txt'
+    source.write_bytes(b'\n'.join(MESSAGE[start:start + 60].encode('ascii') for start in range(0, 800, 60)))
+    build(CASES[1]).encode_file(str(source), str(target), block_size=100)
+    assert target.read_bytes().replace(b'\n', b'') == CASES[1][-1].encode('ascii')
+    assert target.read_bytes().count(b'\n') == source.read_bytes().count(b'\n')
+
+
+def test_encode_file_in_place_and_continues(tmp_path):
+    path = tmp_path / 'message.txt'
+    path.write_bytes(MESSAGE[:500].encode('ascii'))
+    machine = build(CASES[2])
+    state = machine.encode_file(str(path), block_size=64)
+    assert path.read_bytes() == CASES[2][-1][:500].encode('ascii')
+
+    other = tmp_path / 'rest.txt'
+    other.write_bytes(MESSAGE[500:].encode('ascii'))
+    machine = Enigma()
+    machine.set_state(state)
+    machine.encode_file(str(other))
+    assert other.read_bytes() == CASES[2][-1][500:].encode('ascii')
+
+
+def test_encode_file_rejects_non_letters_before_writing(tmp_path):
+    source = tmp_path / 'message.txt'
+    target = tmp_path / 'encoded.txt'
+    source.write_bytes(b'HELLO WORLD')
+    machine = build(CASES[0])
+    state = machine.get_state()
+    with pytest.raises(ValueError):
+        machine.encode_file(str(source), str(target), non_letters='reject')
+    assert not target.exists()
+    assert source.read_bytes() == b'HELLO WORLD'
+    assert machine.get_state() == state
+
+
+def test_encode_empty_file(tmp_path):
+    source = tmp_path / 'empty.txt'
+    target = tmp_path / 'encoded.txt'
+    source.write_bytes(b'')
+    build(CASES[0]).encode_file(str(source), str(target))
+    assert target.read_bytes() == b''
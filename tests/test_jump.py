@@ -0,0 +1,40 @@
+import pytest
+
+from enigma import Enigma, step_offsets
+
+from cases import CASES, MESSAGE, build
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_advance_matches_baseline(case, keystream):
+    for n in (0, 1, 25, 26, 333, 676, 799):
+        machine = build(case, keystream)
+        machine.advance(n)
+        assert machine.encode_message(MESSAGE[n:]) == case[-1][n:]
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_decode_range_matches_baseline(case, keystream):
+    machine = build(case, keystream)
+    state = machine.get_state()
+    for start, end in ((0, 10), (17, 90), (400, None), (799, 800), (-30, -5)):
+        assert machine.decode_range(case[-1], start, end) == MESSAGE[start:end]
+    assert machine.get_state() == state
+
+
+@pytest.mark.parametrize('rotors', [['I', 'II', 'III'], ['V', 'IV', 'II'], ['III', 'I', 'V']])
+@pytest.mark.parametrize('positions', [['A', 'A', 'A'], ['A', 'D', 'U'], ['K', 'E', 'V'], ['Z', 'Q', 'Z']])
+def test_step_offsets_matches_stepping(rotors, positions):
+    machine = Enigma()
+    machine.add_rotors(rotors, positions, [1, 1, 1])
+    machine.add_reflector('B')
+    start = tuple(rotor.offset for rotor in machine.rotors)
+    notches = (machine.rotors[0].notch_index, machine.rotors[1].notch_index)
+    for n in range(1, 2000):
+        machine.rotate_rotors()
+        assert step_offsets(start, notches, n) == tuple(rotor.offset for rotor in machine.rotors)
+
+
+def test_step_offsets_wraps_full_cycle():
+    offsets = (3, 5, 0)
+    assert step_offsets(offsets, (21, 4), 26 * 25 * 26) == offsets
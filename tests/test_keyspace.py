@@ -0,0 +1,101 @@
+import io
+import itertools
+
+import pytest
+
+from enigma import Keyspace
+from enigma_cli import main
+
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+@pytest.fixture
+def keyspace():
+    return Keyspace(['I', None, ['IV', 'V']], ['A', None, 'C'], [1, [5, 9], None], ['B', 'C'])
+
+
+def test_len_and_order(keyspace):
+    combinations = list(keyspace)
+    assert len(combinations) == len(keyspace) == 2 * 5 * 26 * 2 * 26 * 2
+    assert combinations == sorted(combinations, key=keyspace.rank)
+    assert combinations[0] == ('I', 'II', 'IV', 'A', 'A', 'C', 1, 5, 1, 'B')
+    assert combinations[-1] == ('I', 'Gamma', 'V', 'A', 'Z', 'C', 1, 9, 26, 'C')
+
+
+def test_order_matches_nested_loops():
+    keyspace = Keyspace(['I', 'II', 'III'], None, None, 'B')
+    nested = (('I', 'II', 'III', p0, p1, p2, s0, s1, s2, 'B') for p0 in LETTERS for p1 in LETTERS
+              for p2 in LETTERS for s0 in range(1, 27) for s1 in range(1, 27) for s2 in range(1, 27))
+    assert list(itertools.islice(keyspace, 50000)) == list(itertools.islice(nested, 50000))
+
+
+def test_rank_and_unrank_round_trip(keyspace):
+    combinations = list(keyspace)
+    for index in range(0, len(keyspace), 97):
+        assert keyspace.unrank(index) == keyspace[index] == combinations[index]
+        assert keyspace.rank(combinations[index]) == index
+    assert keyspace.unrank(-1) == combinations[-1]
+
+
+def test_out_of_range(keyspace):
+    with pytest.raises(IndexError):
+        keyspace.unrank(len(keyspace))
+    with pytest.raises(IndexError):
+        keyspace.unrank(-len(keyspace) - 1)
+    with pytest.raises(ValueError):
+        keyspace.rank(('II', 'I', 'IV', 'A', 'A', 'C', 1, 5, 1, 'B'))
+    with pytest.raises(ValueError):
+        keyspace.rank(('I', 'I', 'IV', 'A', 'A', 'C', 1, 5, 1, 'B'))
+
+
+def test_iterate_ranges(keyspace):
+    combinations = list(keyspace)
+    size = len(keyspace)
+    for start, stop in ((0, 10), (25, 700), (size - 3, None), (size - 5, size + 10), (-10, 4), (50, 50), (60, 40)):
+        expected = combinations[max(start, 0):stop]
+        assert list(keyspace.iterate(start, stop)) == expected
+    assert list(keyspace[100:200]) == combinations[100:200]
+    assert list(keyspace[5:500:7]) == combinations[5:500:7]
+
+
+def test_shards_cover_keyspace(keyspace):
+    shards = [keyspace.shard(index, 7) for index in range(7)]
+    assert sum((list(keyspace.iterate(*shard)) for shard in shards), []) == list(keyspace)
+    with pytest.raises(ValueError):
+        keyspace.shard(7, 7)
+
+
+def test_sample(keyspace):
+    sample = keyspace.sample(30, seed=3)
+    assert len(set(sample)) == 30
+    assert sample == keyspace.sample(30, seed=3)
+    assert all(keyspace[keyspace.rank(combination)] == combination for combination in sample)
+
+
+@pytest.mark.parametrize('settings', [
+    {'rotors': ['I', 'II']},
+    {'rotors': ['I', 'II', 'IX']},
+    {'rotors': ['I', 'I', 'II']},
+    {'rotors': ['I', ['I', 'II'], 'II']},
+    {'rotors': ['I', [], None]},
+    {'positions': ['A', 'b', None]},
+    {'positions': [['A', 'AB'], None, None]},
+    {'ring_settings': [1, [2, 27], None]},
+    {'ring_settings': [1, 'A', None]},
+    {'reflector': 'D'},
+    {'reflector': ['B', 'D']},
+    {'reflector': []},
+])
+def test_invalid_settings(settings):
+    with pytest.raises(ValueError):
+        Keyspace(**settings)
+
+
+def test_cli_reports_impossible_rotors():
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = main(['solve', '--message', 'ABCDEFGHIJ', '--crib', 'EN', '--rotors', 'I', 'I', 'II'],
+                  stdout=stdout, stderr=stderr)
+    assert status == 2
+    assert 'no order of three different rotors' in stderr.getvalue()
+    assert stdout.getvalue() == ''
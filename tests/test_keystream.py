@@ -0,0 +1,46 @@
+import pytest
+
+from enigma import Enigma, KeystreamTable, compile_keystream, keystream_cache_info
+
+from cases import CASES, MESSAGE, build
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_keystream_encode_message_matches_baseline(case):
+    machine = build(case, keystream=True)
+    assert machine.encode_message(MESSAGE) == case[-1]
+    machine.reset()
+    assert machine.encode_message(case[-1]) == MESSAGE
+
+
+def test_successor_follows_rotor_stepping():
+    machine = Enigma()
+    machine.add_rotors(['III', 'II', 'I'], ['A', 'D', 'U'], [5, 1, 20])
+    machine.add_reflector('C')
+    table = machine.keystream_table()
+    state = table.state_of([rotor.offset for rotor in machine.rotors])
+    for _ in range(1000):
+        machine.rotate_rotors()
+        state = table.successor[state]
+        assert table.offsets_of(state) == tuple(rotor.offset for rotor in machine.rotors)
+
+
+def test_permutations_match_scrambler():
+    table = KeystreamTable(['II', 'V', 'I'], [3, 9, 14], 'B')
+    machine = Enigma()
+    machine.add_rotors(['II', 'V', 'I'], ['A', 'A', 'A'], [3, 9, 14])
+    machine.add_reflector('B')
+    for state in (0, 1, 27, 700, 26 ** 3 - 1):
+        for index in range(26):
+            for rotor, offset in zip(machine.rotors, table.offsets_of(state)):
+                rotor.offset = offset
+            expected = machine.encode_indices([index])[0]
+            assert table.permutations[26 * table.successor[state] + index] == expected
+
+
+def test_tables_are_shared():
+    first = compile_keystream(['I', 'II', 'III'], [1, 1, 1], 'B')
+    misses = keystream_cache_info()['misses']
+    assert compile_keystream(['I', 'II', 'III'], [1, 1, 1], 'B') is first
+    assert keystream_cache_info()['misses'] == misses
+    assert compile_keystream(['I', 'II', 'III'], [1, 1, 2], 'B') is not first
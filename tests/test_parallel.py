@@ -0,0 +1,69 @@
+import multiprocessing
+
+import pytest
+
+import enigma
+from enigma import (Enigma, Keyspace, parallel_search, search_combinations, search_pool, solve_enigma,
+                    timed_search)
+
+
+MESSAGE = 'THESEAREEXAMPLESOFUSINGTHEENIGMASOLVEMETHOD'
+PLUGBOARD = ['AZ', 'BY', 'CX']
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+def test_parallel_search_matches_serial_search(encoded):
+    combinations = list(Keyspace(['I', 'III', 'IV'], None, [3, 2, 1], 'B'))
+    serial = search_combinations(encoded, 'EN', PLUGBOARD, combinations, return_first=False)
+    assert len(serial) > 1
+    assert parallel_search(encoded, 'EN', PLUGBOARD, combinations, return_first=False, workers=2) == serial
+
+    first = parallel_search(encoded, 'ENIGMA', PLUGBOARD, combinations, workers=2)
+    assert len(first) == 1 and 'ENIGMA' in first[0][0]
+
+
+def test_shared_pool_serves_searches_after_first_match(encoded):
+    combinations = list(Keyspace(['I', 'III', 'IV'], None, [3, 2, 1], 'B'))
+    executor, stop = pool = search_pool(2)
+    try:
+        first = parallel_search(encoded, 'ENIGMA', PLUGBOARD, combinations, workers=2, pool=pool)
+        assert len(first) == 1 and stop.is_set()
+        found = parallel_search(encoded, 'EN', PLUGBOARD, combinations, return_first=False, workers=2, pool=pool)
+        assert found == search_combinations(encoded, 'EN', PLUGBOARD, combinations, return_first=False)
+    finally:
+        executor.shutdown()
+
+
+def test_running_chunk_stops_when_told(encoded, monkeypatch):
+    combinations = list(Keyspace(['I', 'III', 'IV'], None, [3, 2, 1], 'B'))[:1000]
+    stop = multiprocessing.Event()
+    monkeypatch.setattr(enigma, 'SEARCH_STOP', stop)
+    assert len(timed_search(encoded, 'E', PLUGBOARD, combinations, return_first=False)[0]) > 0
+    stop.set()
+    found, stats = timed_search(encoded, 'E', PLUGBOARD, combinations, return_first=False)
+    assert found == [] and stats.decrypt_time == 0
+
+
+def test_chunked_search_starts_one_pool(encoded, monkeypatch):
+    pools = []
+
+    def counting_pool(workers=None):
+        pools.append(workers)
+        return search_pool(workers)
+
+    monkeypatch.setattr(enigma, 'search_pool', counting_pool)
+    reports = []
+    found = solve_enigma(encoded, 'EN', PLUGBOARD, ['I', 'III', 'IV'], None, [3, 2, 1], 'B', return_first=False,
+                         max_iterations=-1, workers=2, progress=reports.append, progress_every=2000)
+    assert pools == [2]
+    assert len(reports) >= 8
+    assert found == solve_enigma(encoded, 'EN', PLUGBOARD, ['I', 'III', 'IV'], None, [3, 2, 1], 'B',
+                                 return_first=False, max_iterations=-1)
@@ -0,0 +1,47 @@
+import pytest
+
+from enigma import Enigma, PlugboardClimber, solve_plugboard
+
+
+MESSAGE = ('THEWEATHERFORECASTFORTHENORTHSEATODAYISCLEARWITHLIGHTWINDSFROMTHEWESTANDGOODVISIBILITY'
+           'THROUGHOUTTHEDAYSHIPPINGSHOULDEXPECTCALMSEASANDNOSTORMSAREEXPECTEDBEFORETHEWEEKENDWHEN'
+           'ARAINFRONTWILLMOVEINFROMTHEATLANTICBRINGINGSTRONGERWINDSANDHEAVYRAINTOTHECOASTALREGIONS')
+PLUGBOARD = ['AQ', 'BW', 'CE', 'DR', 'TY', 'UI', 'OP', 'LK', 'ZX', 'MN']
+SETTINGS = (['II', 'IV', 'V'], ['B', 'L', 'A'], [2, 5, 9], 'B')
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(*SETTINGS[:3])
+    machine.add_reflector(SETTINGS[3])
+    return machine.encode_message(MESSAGE)
+
+
+def config(rotors, positions, ring_settings, reflector):
+    return {'plugboard': None, 'rotors': list(zip(rotors, positions, ring_settings)), 'reflector': reflector}
+
+
+def test_recovers_ten_pair_plugboard(encoded):
+    wrong = config(['II', 'IV', 'V'], ['C', 'L', 'A'], [2, 5, 9], 'B')
+    results = solve_plugboard(encoded, [wrong, config(*SETTINGS)])
+    decoded, found, score = results[0]
+    assert decoded == MESSAGE
+    assert sorted(found['plugboard']) == sorted(''.join(sorted(pair)) for pair in PLUGBOARD)
+    assert found['rotors'] == list(zip(*SETTINGS[:3]))
+    assert score > results[1][2]
+
+
+@pytest.mark.parametrize('scoring', ['ioc', 'bigram', 'trigram'])
+def test_incremental_score_matches_fresh_score(encoded, scoring):
+    climber = PlugboardClimber(encoded, *SETTINGS, scoring=scoring, max_pairs=6)
+    score = climber.climb()
+    assert len(climber.pairs()) <= 6
+    fresh = PlugboardClimber(encoded, *SETTINGS, scoring=scoring, plugboard=climber.pairs())
+    assert fresh.score == pytest.approx(score)
+
+
+def test_max_pairs_limit(encoded):
+    with pytest.raises(ValueError):
+        PlugboardClimber(encoded, *SETTINGS, max_pairs=11)
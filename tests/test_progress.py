@@ -0,0 +1,61 @@
+import pstats
+
+import pytest
+
+from enigma import Enigma, SolverStats, solve_enigma
+
+
+MESSAGE = 'THESEAREEXAMPLESOFUSINGTHEENIGMASOLVEMETHOD'
+PLUGBOARD = ['AZ', 'BY', 'CX']
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+def solve(encoded, **options):
+    return solve_enigma(encoded, 'EN', PLUGBOARD, rot_in=['I', 'III', 'IV'], set_in=[3, 2, 1], ref_in='B',
+                        return_first=False, max_iterations=-1, **options)
+
+
+def test_progress_reports_every_chunk(encoded):
+    reports = []
+    stats = SolverStats()
+    found = solve(encoded, progress=lambda stats: reports.append(stats.summary()), progress_every=5000,
+                  stats=stats)
+    assert found == solve(encoded)
+    assert [report['searched'] for report in reports] == [5000, 10000, 15000, 26 ** 3]
+    assert all(report['total'] == 26 ** 3 for report in reports)
+    assert reports[-1]['matches'] == len(found)
+    assert reports[-1]['eta'] == 0
+    assert stats.rate() > 0
+    assert stats.setup_time > 0 and stats.decrypt_time > 0 and stats.match_time > 0
+
+
+def test_profile_keeps_pstats(encoded):
+    stats = SolverStats()
+    solve(encoded, profile=True, stats=stats)
+    assert isinstance(stats.profile, pstats.Stats)
+
+
+def test_deadline_stops_search(encoded):
+    with pytest.raises(TimeoutError):
+        solve(encoded, deadline=0, progress_every=1000)
+
+
+def test_rate_and_eta():
+    stats = SolverStats(total=1000)
+    assert stats.rate() == 0.0 and stats.eta() is None
+    stats.searched, stats.skipped, stats.elapsed = 300, 100, 2.0
+    assert stats.rate() == 100.0
+    assert stats.eta() == 7.0
+    other = SolverStats()
+    other.setup_time, other.decrypt_time, other.match_time = 1.0, 2.0, 3.0
+    stats.merge(other)
+    stats.merge(other)
+    assert (stats.setup_time, stats.decrypt_time, stats.match_time) == (2.0, 4.0, 6.0)
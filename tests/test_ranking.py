@@ -0,0 +1,80 @@
+import pytest
+
+import enigma
+from enigma import (Enigma, Keyspace, NgramScorer, coincidence_score, english_scorer, index_of_coincidence,
+                    rank_combinations, solve_enigma)
+
+
+MESSAGE = 'ATTACKATDAWNTHEREINFORCEMENTSWILLARRIVEFROMTHENORTHBEFORENOON'
+PLUGBOARD = ['AZ', 'BY']
+ROTORS = [('II', 'B', 2), ('IV', 'L', 21), ('V', 'A', 12)]
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(['II', 'IV', 'V'], ['B', 'L', 'A'], [2, 21, 12])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+def indices(text):
+    return [ord(char) - 65 for char in text]
+
+
+def test_ngram_scores_prefer_english():
+    for n in (2, 3):
+        scorer = english_scorer(n)
+        assert scorer.score(indices('THEWEATHERISCLEAR')) > scorer.score(indices('QZXJVKQWPXZJQKVXJ'))
+        assert scorer.score(indices('AB'[:n - 1])) == 0
+    custom = NgramScorer.from_text('abcabcabc', 3)
+    assert custom.score(indices('ABCA')) > custom.score(indices('ACBA'))
+
+
+def test_coincidence_score():
+    assert coincidence_score(indices('AABBB')) == 1 + 3
+    assert index_of_coincidence(MESSAGE) > index_of_coincidence('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+
+@pytest.mark.parametrize('scoring', ['trigram', 'bigram'])
+def test_ranking_finds_true_settings(encoded, scoring):
+    ranked = solve_enigma(encoded, None, PLUGBOARD, rot_in=['II', 'IV', 'V'], set_in=[2, 21, 12], ref_in='B',
+                          scoring=scoring, top=3)
+    assert len(ranked) == 3
+    assert ranked[0][0] == MESSAGE and ranked[0][1]['rotors'] == ROTORS
+    assert [score for _, _, score in ranked] == sorted((score for _, _, score in ranked), reverse=True)
+
+
+def test_ranking_keeps_best_and_earliest_ties(encoded):
+    combinations = list(Keyspace(['II', 'IV', 'V'], None, [2, 21, 12], 'B'))[:500]
+    ranked = rank_combinations(encoded, PLUGBOARD, combinations, coincidence_score, top=5)
+    scores = []
+    for comb in combinations:
+        machine = Enigma()
+        machine.add_plugboard(PLUGBOARD)
+        machine.add_rotors(list(comb[0:3]), list(comb[3:6]), list(comb[6:9]))
+        machine.add_reflector(comb[9])
+        scores.append(coincidence_score(indices(machine.encode_message(encoded))))
+    best = sorted(range(len(combinations)), key=lambda number: (-scores[number], number))[:5]
+    assert [score for _, _, score in ranked] == [scores[number] for number in best]
+    assert [config['rotors'] for _, config, _ in ranked] == \
+        [list(zip(combinations[number][0:3], combinations[number][3:6], combinations[number][6:9]))
+         for number in best]
+
+
+def test_top_below_one_is_rejected(encoded):
+    with pytest.raises(ValueError):
+        rank_combinations(encoded, None, [], coincidence_score, top=0)
+
+
+@pytest.mark.parametrize('crib, return_first', [(None, True), ('EN', False)])
+def test_too_many_settings_fail_before_searching(encoded, monkeypatch, crib, return_first):
+    def fail(*args, **kwargs):
+        raise AssertionError('searched')
+
+    monkeypatch.setattr(enigma, 'rank_combinations', fail)
+    monkeypatch.setattr(enigma, 'search_combinations', fail)
+    with pytest.raises(TimeoutError, match='less than the 17576 settings'):
+        solve_enigma(encoded, crib, PLUGBOARD, rot_in=['II', 'IV', 'V'], set_in=[2, 21, 12], ref_in='B',
+                     return_first=return_first, max_iterations=10000)
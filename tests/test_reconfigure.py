@@ -0,0 +1,85 @@
+import pytest
+
+from enigma import Enigma
+
+from cases import CASES, MESSAGE as LONG_MESSAGE, build
+
+
+MESSAGE = 'THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG'
+
+
+def new_machine(plugboard, rotors, positions, ring_settings, reflector):
+    machine = Enigma()
+    if plugboard:
+        machine.add_plugboard(plugboard)
+    machine.add_rotors(rotors, positions, ring_settings)
+    machine.add_reflector(reflector)
+    return machine
+
+
+@pytest.fixture
+def machine():
+    return new_machine(['AZ', 'BY', 'CX'], ['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1], 'B')
+
+
+def test_reconfigured_machine_matches_new_machine(machine):
+    machine.encode_message(MESSAGE)
+    for settings in ((None, ['II', 'IV', 'V'], ['Q', 'E', 'V'], [25, 1, 13], 'C'),
+                     (['AB'], ['Beta', 'I', 'II', 'III'], ['B', 'Q', 'E', 'V'], [4, 2, 7, 12], 'A'),
+                     (['QW', 'ER'], ['I', 'II', 'III'], ['A', 'A', 'A'], [0, 0, 0], 'B')):
+        plugboard, rotors, positions, ring_settings, reflector = settings
+        machine.set_plugboard(plugboard)
+        machine.set_rotors(rotors, positions, ring_settings)
+        machine.set_reflector(reflector)
+        assert machine.encode_message(MESSAGE) == new_machine(*settings).encode_message(MESSAGE)
+
+
+def test_set_positions_and_ring_settings(machine):
+    machine.encode_message(MESSAGE)
+    machine.set_ring_settings([7, 8, 9])
+    machine.set_positions(['X', 'Y', 'Z'])
+    expected = new_machine(['AZ', 'BY', 'CX'], ['I', 'III', 'IV'], ['X', 'Y', 'Z'], [7, 8, 9], 'B')
+    assert machine.encode_message(MESSAGE) == expected.encode_message(MESSAGE)
+
+
+@pytest.mark.parametrize('change', [
+    lambda machine: machine.set_rotors(['I', 'II', 'IX'], ['A', 'A', 'A'], [1, 1, 1]),
+    lambda machine: machine.set_rotors(['I', 'II', 'III'], ['A', 'a', 'A'], [1, 1, 1]),
+    lambda machine: machine.set_rotors(['I', 'II', 'III'], ['A', 'A', 'A'], [1, 1, 27]),
+    lambda machine: machine.set_plugboard(['AB', 'AC']),
+    lambda machine: machine.set_positions(['B', 'C', 'a']),
+    lambda machine: machine.set_positions(['B', 'C', 'AB']),
+    lambda machine: machine.set_positions(['B', 'C']),
+    lambda machine: machine.set_ring_settings([5, 6, -1]),
+    lambda machine: machine.set_ring_settings([5, 6, 'A']),
+    lambda machine: machine.set_ring_settings([5, 6, 1.5]),
+])
+def test_invalid_settings_leave_machine_unchanged(machine, change):
+    machine.encode_message(MESSAGE[:10])
+    state = machine.get_state()
+    with pytest.raises(ValueError):
+        change(machine)
+    assert machine.get_state() == state
+    untouched = new_machine(['AZ', 'BY', 'CX'], ['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1], 'B')
+    untouched.encode_message(MESSAGE[:10])
+    assert machine.encode_message(MESSAGE) == untouched.encode_message(MESSAGE)
+
+
+def test_new_rotors_reject_invalid_settings():
+    machine = Enigma()
+    with pytest.raises(ValueError):
+        machine.add_rotors(['I', 'II', 'III'], ['A', 'B', 'c'], [1, 1, 1])
+    with pytest.raises(ValueError):
+        machine.add_rotors(['I', 'II', 'III'], ['A', 'B', 'C'], [1, 1, 30])
+    assert machine.rotors == []
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_state_round_trip(case):
+    machine = build(case)
+    machine.encode_message(LONG_MESSAGE[:123])
+    state = machine.get_state()
+    other = Enigma()
+    other.set_state(state)
+    assert other.get_state() == state
+    assert other.encode_message(LONG_MESSAGE[123:]) == case[-1][123:]
@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import enigma_server
+from enigma import Enigma, LRUCache, config_key
+from enigma_server import EnigmaClient, EnigmaServer
+
+
+CONFIGS = [
+    {'plugboard': ['AZ', 'BY'], 'rotors': [('I', 'A', 1), ('II', 'B', 2), ('III', 'C', 3)], 'reflector': 'B'},
+    {'plugboard': None, 'rotors': [('IV', 'Q', 5), ('V', 'E', 0), ('II', 'V', 20)], 'reflector': 'C'},
+]
+MESSAGES = ['HELLOWORLD', 'ENIGMA', 'THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG', 'A']
+
+
+def expected(config, message):
+    machine = Enigma()
+    machine.set_config(config)
+    return machine.encode_message(message)
+
+
+def test_concurrent_requests_are_batched():
+    async def run():
+        async with EnigmaServer(batch_window=0.05) as server:
+            async with await EnigmaClient.connect(*server.address) as client:
+                requests = [(config, message) for config in CONFIGS for message in MESSAGES]
+                responses = await asyncio.gather(*[client.encode(config, message) for config, message in requests])
+        return requests, responses
+
+    requests, responses = asyncio.run(run())
+    for (config, message), response in zip(requests, responses):
+        assert response['message'] == expected(config, message)
+        assert response['batch_size'] == len(MESSAGES)
+        assert response['queue_time'] >= 0 and response['process_time'] >= 0
+
+
+def test_decoding_round_trip_over_unix_socket(tmp_path):
+    async def run():
+        async with EnigmaServer(path=str(tmp_path / 'enigma.sock')) as server:
+            async with await EnigmaClient.connect(path=server.address) as client:
+                encoded = await client.encode(CONFIGS[0], 'ATTACKATDAWN')
+                return await client.encode(CONFIGS[0], encoded['message'])
+
+    assert asyncio.run(run())['message'] == 'ATTACKATDAWN'
+
+
+def test_errors_are_answered_per_request():
+    async def run():
+        async with EnigmaServer() as server:
+            async with await EnigmaClient.connect(*server.address) as client:
+                bad_config = dict(CONFIGS[0], reflector='D')
+                responses = await asyncio.gather(client.encode(bad_config, 'HELLO'),
+                                                 client.encode(CONFIGS[0], 'hello'),
+                                                 client.encode(CONFIGS[0], 'HELLO'))
+                reader, writer = await asyncio.open_connection(*server.address)
+                writer.write(b'not json\n')
+                await writer.drain()
+                raw = json.loads(await reader.readline())
+                writer.close()
+        return responses, raw
+
+    responses, raw = asyncio.run(run())
+    assert 'Invalid config' in responses[0]['error']
+    assert 'error' in responses[1]
+    assert responses[2]['message'] == expected(CONFIGS[0], 'HELLO')
+    assert raw['id'] is None and 'Invalid request' in raw['error']
+
+
+def test_pending_requests_and_idle_machines_are_bounded():
+    async def run():
+        server = EnigmaServer(batch_window=0.01, max_batch=1, max_pending=3, max_idle=2)
+        submit = server.submit
+        pending, peak = set(), [0]
+
+        def counting_submit(config, message):
+            future = submit(config, message)
+            pending.add(future)
+            peak[0] = max(peak[0], len(pending))
+            future.add_done_callback(pending.discard)
+            return future
+
+        server.submit = counting_submit
+        async with server:
+            async with await EnigmaClient.connect(*server.address) as client:
+                responses = await asyncio.gather(*[client.encode(CONFIGS[1], 'HELLO') for _ in range(40)])
+            idle = server.machines.get(config_key(CONFIGS[1]), list)
+        return responses, peak[0], len(idle)
+
+    responses, peak, idle = asyncio.run(run())
+    assert all(response['message'] == expected(CONFIGS[1], 'HELLO') for response in responses)
+    assert 1 <= peak <= 3
+    assert 1 <= idle <= 2
+
+
+def test_machines_share_caches_across_threads():
+    # More middle rotor, left rotor and reflector combinations than the
+    # composite cache holds, encoded in several threads at once
+    configs = [{'plugboard': None, 'rotors': [(left, 'A', 1), (middle, 'Y', 2), ('III', 'Z', 3)], 'reflector': reflector}
+               for left, middle in itertools.permutations(['I', 'II', 'IV', 'V', 'Beta', 'Gamma'], 2)
+               for reflector in 'ABC']
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            async with EnigmaServer(max_batch=1, executor=executor) as server:
+                async with await EnigmaClient.connect(*server.address) as client:
+                    return await asyncio.gather(*[client.encode(config, MESSAGES[2] * 3)
+                                                  for _ in range(3) for config in configs])
+
+    responses = asyncio.run(run())
+    assert len(configs) > 64
+    assert [response.get('message') for response in responses] == \
+        [expected(config, MESSAGES[2] * 3) for _ in range(3) for config in configs]
+
+
+def test_cache_is_consistent_across_threads():
+    cache = LRUCache(maxsize=8, sizeof=len)
+    barrier = threading.Barrier(8)
+
+    def build(key):
+        # Let other threads run while the entry is built
+        time.sleep(0)
+        return 'x' * (key + 1)
+
+    def lookups(seed):
+        barrier.wait()
+        for key in range(seed, seed + 2000):
+            assert cache.get(key % 20, lambda: build(key % 20)) == 'x' * (key % 20 + 1)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lookups, range(8)))
+    finally:
+        sys.setswitchinterval(interval)
+
+    info = cache.info()
+    assert info['hits'] + info['misses'] == 8 * 2000
+    assert info['size'] == 8
+    assert info['nbytes'] == sum(len(value) for value in cache.entries.values())
+
+
+def test_failed_message_only_fails_its_request(monkeypatch):
+    encode_message = Enigma.encode_message
+
+    def failing_encode_message(machine, message):
+        if message == 'BOOM':
+            raise RuntimeError('boom')
+        return encode_message(machine, message)
+
+    monkeypatch.setattr(Enigma, 'encode_message', failing_encode_message)
+
+    async def run():
+        async with EnigmaServer(batch_window=0.05) as server:
+            async with await EnigmaClient.connect(*server.address) as client:
+                return await asyncio.gather(*[client.encode(CONFIGS[0], message)
+                                              for message in ['HELLO', 'BOOM', 'hello', 'WORLD']])
+
+    responses = asyncio.run(run())
+    assert all(response['batch_size'] == 4 for response in responses)
+    assert responses[0]['message'] == expected(CONFIGS[0], 'HELLO')
+    assert responses[3]['message'] == expected(CONFIGS[0], 'WORLD')
+    assert 'boom' in responses[1]['error'] and 'message' not in responses[1]
+    assert 'uppercase' in responses[2]['error']
+
+
+def test_main_configures_backpressure(monkeypatch):
+    servers = []
+
+    async def serve(server):
+        servers.append(server)
+
+    monkeypatch.setattr(enigma_server, 'serve', serve)
+    enigma_server.main(['--port', '0', '--max-pending', '16', '--max-idle', '1', '--pool-size', '8'])
+    assert servers[0].max_pending == 16 and servers[0].max_idle == 1 and servers[0].machines.maxsize == 8
+
+    with pytest.raises(SystemExit):
+        enigma_server.main(['--max-pending', '0'])
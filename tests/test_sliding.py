@@ -0,0 +1,45 @@
+import pytest
+
+from enigma import Enigma, solve_enigma
+
+
+MESSAGE = 'THESEAREEXAMPLESOFUSINGTHEENIGMASOLVEMETHOD'
+PLUGBOARD = ['AZ', 'BY', 'CX']
+
+
+@pytest.fixture(scope='module')
+def encoded():
+    machine = Enigma()
+    machine.add_plugboard(PLUGBOARD)
+    machine.add_rotors(['I', 'III', 'IV'], ['A', 'B', 'C'], [3, 2, 1])
+    machine.add_reflector('B')
+    return machine.encode_message(MESSAGE)
+
+
+def solve(encoded, **options):
+    return solve_enigma(encoded, options.pop('crib', 'EN'), PLUGBOARD, rot_in=['I', 'III', 'IV'],
+                        set_in=[3, 2, 1], ref_in=['B', 'C'], max_iterations=-1, **options)
+
+
+def key(match):
+    return match[0], repr(match[1])
+
+
+@pytest.mark.parametrize('crib_offset', [None, MESSAGE.index('ENIGMA')])
+def test_sliding_search_matches_default_search(encoded, crib_offset):
+    default = solve(encoded, return_first=False, crib_offset=crib_offset)
+    sliding = solve(encoded, return_first=False, crib_offset=crib_offset, sliding=True)
+    assert len(default) > 1
+    assert sorted(map(key, sliding)) == sorted(map(key, default))
+
+
+def test_sliding_search_first_match(encoded):
+    first = solve(encoded, crib='ENIGMASOLVE', sliding=True)
+    assert len(first) == 1
+    assert first[0][0] == MESSAGE
+    assert [rotor[1] for rotor in first[0][1]['rotors']] == ['A', 'B', 'C']
+
+
+def test_sliding_search_needs_unknown_positions(encoded):
+    with pytest.raises(ValueError):
+        solve(encoded, pos_in=['A', 'B', 'C'], sliding=True)
@@ -0,0 +1,40 @@
+import pytest
+
+from cases import CASES, MESSAGE, build
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_encode_stream_matches_baseline(case, keystream):
+    machine = build(case, keystream)
+    chunks = [MESSAGE[start:start + 37] for start in range(0, len(MESSAGE), 37)]
+    assert ''.join(machine.encode_stream(chunks, piece_size=5)) == case[-1]
+
+
+def test_encode_stream_is_lazy():
+    machine = build(CASES[1])
+    received = []
+
+    def chunks():
+        for start in range(0, len(MESSAGE), 100):
+            received.append(start)
+            yield MESSAGE[start:start + 100]
+
+    stream = machine.encode_stream(chunks())
+    assert next(stream) == CASES[1][-1][:100]
+    assert received == [0]
+
+
+def test_encode_stream_bytes_chunks():
+    machine = build(CASES[2])
+    chunks = [MESSAGE[:300].encode('ascii'), bytearray(MESSAGE[300:].encode('ascii'))]
+    encoded = list(machine.encode_stream(chunks, piece_size=64))
+    assert all(isinstance(chunk, bytes) for chunk in encoded)
+    assert b''.join(encoded) == CASES[2][-1].encode('ascii')
+
+
+def test_encode_stream_stops_at_invalid_chunk():
+    machine = build(CASES[0])
+    stream = machine.encode_stream([MESSAGE[:50], 'abc', MESSAGE[50:]])
+    assert next(stream) == CASES[0][-1][:50]
+    with pytest.raises(ValueError):
+        next(stream)
@@ -0,0 +1,38 @@
+from enigma import Enigma, LRUCache, WIRING_CACHE, compile_rotor, wiring_cache_info
+
+
+def test_machines_share_compiled_rotors():
+    first, second = Enigma(), Enigma()
+    first.add_rotors(['I', 'II', 'III'], ['A', 'B', 'C'], [1, 5, 9])
+    second.add_rotors(['IV', 'II', 'III'], ['Q', 'R', 'S'], [2, 5, 9])
+    assert first.rotors[0].forward is second.rotors[0].forward
+    assert first.rotors[1].backward is second.rotors[1].backward
+    assert first.rotors[2].forward is not second.rotors[2].forward
+
+
+def test_wiring_cache_counts_hits():
+    WIRING_CACHE.clear()
+    compile_rotor('V', 4)
+    compile_rotor('V', 4)
+    info = wiring_cache_info()
+    assert (info['hits'], info['misses'], info['size']) == (1, 1, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.get('a', lambda: 1)
+    cache.get('b', lambda: 2)
+    cache.get('a', lambda: 3)
+    cache.get('c', lambda: 4)
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.get('b', lambda: 5) == 5
+
+
+def test_cache_evicts_by_size_but_keeps_newest():
+    cache = LRUCache(maxsize=None, maxbytes=10, sizeof=len)
+    cache.get('a', lambda: 'x' * 6)
+    cache.get('b', lambda: 'x' * 6)
+    assert list(cache.entries) == ['b']
+    cache.get('c', lambda: 'x' * 20)
+    assert list(cache.entries) == ['c']
+    assert cache.info()['nbytes'] == 20